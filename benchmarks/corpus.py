@@ -0,0 +1,258 @@
+"""
+Deterministic synthetic corpus for the benchmarks, written with the standard library only.
+
+Every supported input type is produced with realistic structure (OOXML packages,
+a text-bearing PDF, PNG images) so extraction is exercised the same way as on
+real files. The same seed always produces the same corpus.
+"""
+import os
+import csv
+import zlib
+import random
+import struct
+import zipfile
+from xml.sax.saxutils import escape
+
+DEFAULT_MIX = {
+    'txt': 0.30,
+    'md': 0.10,
+    'csv': 0.10,
+    'pdf': 0.10,
+    'docx': 0.10,
+    'xlsx': 0.05,
+    'pptx': 0.05,
+    'png': 0.20,
+}
+
+WORDS = (
+    "invoice report budget quarterly meeting notes project plan design review contract "
+    "travel itinerary recipe garden holiday photo family research paper results analysis "
+    "summary customer order shipment payment receipt schedule agenda proposal draft final "
+    "marketing sales revenue forecast inventory supplier product launch roadmap feedback "
+    "survey lecture homework chapter thesis experiment dataset model training evaluation"
+).split()
+
+def _sentence(rng, num_words):
+    words = [rng.choice(WORDS) for _ in range(num_words)]
+    return ' '.join(words).capitalize() + '.'
+
+def _paragraphs(rng, num_chars):
+    paragraphs = []
+    length = 0
+    while length < num_chars:
+        paragraph = ' '.join(_sentence(rng, rng.randint(6, 16)) for _ in range(rng.randint(2, 6)))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 1
+    return paragraphs
+
+def write_txt(path, rng, num_chars):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n\n'.join(_paragraphs(rng, num_chars)))
+
+def write_md(path, rng, num_chars):
+    paragraphs = _paragraphs(rng, num_chars)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"# {_sentence(rng, 4)[:-1]}\n\n")
+        for i, paragraph in enumerate(paragraphs):
+            if i and i % 3 == 0:
+                f.write(f"## {_sentence(rng, 3)[:-1]}\n\n")
+            f.write(paragraph + '\n\n')
+
+def _rows(rng, num_chars):
+    header = ['date', 'item', 'category', 'quantity', 'price']
+    rows = [header]
+    length = 0
+    while length < num_chars:
+        row = [f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.choice(WORDS), rng.choice(WORDS),
+               str(rng.randint(1, 500)), f"{rng.uniform(1, 1000):.2f}"]
+        rows.append(row)
+        length += sum(len(value) for value in row) + len(row)
+    return rows
+
+def write_csv(path, rng, num_chars):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(_rows(rng, num_chars))
+
+def write_pdf(path, rng, num_chars):
+    """Write a single-page PDF whose text can be extracted."""
+    lines = []
+    for paragraph in _paragraphs(rng, num_chars):
+        while paragraph:
+            lines.append(paragraph[:90])
+            paragraph = paragraph[90:]
+    lines = lines[:60]
+    text_ops = ['BT', '/F1 10 Tf', '12 TL', '50 780 Td']
+    for line in lines:
+        safe = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        text_ops.append(f"({safe}) Tj T*")
+    text_ops.append('ET')
+    content = '\n'.join(text_ops).encode('latin-1', 'replace')
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(content)).encode('ascii') + b" >>\nstream\n" + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode('ascii') + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('ascii')
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode('ascii')
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('ascii')
+    with open(path, 'wb') as f:
+        f.write(out)
+
+_RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_OFFICE_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+def _content_types(overrides):
+    parts = ''.join(f'<Override PartName="{name}" ContentType="{content_type}"/>' for name, content_type in overrides)
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'{parts}</Types>')
+
+def _relationships(rels):
+    items = ''.join(f'<Relationship Id="{rid}" Type="{rel_type}" Target="{target}"/>' for rid, rel_type, target in rels)
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{_RELS_NS}">{items}</Relationships>'
+
+def write_docx(path, rng, num_chars):
+    body = ''.join(f'<w:p><w:r><w:t xml:space="preserve">{escape(paragraph)}</w:t></w:r></w:p>'
+                   for paragraph in _paragraphs(rng, num_chars))
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{body}</w:body></w:document>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _content_types([
+            ('/word/document.xml', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml'),
+        ]))
+        archive.writestr('_rels/.rels', _relationships([('rId1', f'{_OFFICE_REL}/officeDocument', 'word/document.xml')]))
+        archive.writestr('word/document.xml', document)
+
+def write_pptx(path, rng, num_chars):
+    paragraphs = _paragraphs(rng, num_chars)
+    slides = [paragraphs[i:i + 2] for i in range(0, len(paragraphs), 2)]
+    overrides = [('/ppt/presentation.xml', 'application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml')]
+    slide_rels = []
+    slide_ids = []
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for number, slide in enumerate(slides, start=1):
+            text = ''.join(f'<a:p><a:r><a:t>{escape(paragraph)}</a:t></a:r></a:p>' for paragraph in slide)
+            archive.writestr(f'ppt/slides/slide{number}.xml', (
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+                'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">'
+                f'<p:cSld><p:spTree><p:sp><p:txBody>{text}</p:txBody></p:sp></p:spTree></p:cSld></p:sld>'
+            ))
+            overrides.append((f'/ppt/slides/slide{number}.xml', 'application/vnd.openxmlformats-officedocument.presentationml.slide+xml'))
+            slide_rels.append((f'rId{number}', f'{_OFFICE_REL}/slide', f'slides/slide{number}.xml'))
+            slide_ids.append(f'<p:sldId id="{255 + number}" r:id="rId{number}"/>')
+        archive.writestr('[Content_Types].xml', _content_types(overrides))
+        archive.writestr('_rels/.rels', _relationships([('rId1', f'{_OFFICE_REL}/officeDocument', 'ppt/presentation.xml')]))
+        archive.writestr('ppt/_rels/presentation.xml.rels', _relationships(slide_rels))
+        archive.writestr('ppt/presentation.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<p:presentation xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+            f'xmlns:r="{_OFFICE_REL}"><p:sldIdLst>{"".join(slide_ids)}</p:sldIdLst></p:presentation>'
+        ))
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def write_xlsx(path, rng, num_chars):
+    rows = _rows(rng, num_chars)
+    sheet_rows = []
+    for r, row in enumerate(rows, start=1):
+        cells = []
+        for c, value in enumerate(row):
+            ref = f"{_column_letter(c)}{r}"
+            if r > 1 and c >= 3:
+                cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+            else:
+                cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{escape(value)}</t></is></c>')
+        sheet_rows.append(f'<row r="{r}">{"".join(cells)}</row>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _content_types([
+            ('/xl/workbook.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml'),
+            ('/xl/worksheets/sheet1.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'),
+        ]))
+        archive.writestr('_rels/.rels', _relationships([('rId1', f'{_OFFICE_REL}/officeDocument', 'xl/workbook.xml')]))
+        archive.writestr('xl/_rels/workbook.xml.rels', _relationships([('rId1', f'{_OFFICE_REL}/worksheet', 'worksheets/sheet1.xml')]))
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'xmlns:r="{_OFFICE_REL}"><sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        archive.writestr('xl/worksheets/sheet1.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetData>{"".join(sheet_rows)}</sheetData></worksheet>'
+        ))
+
+def write_png(path, rng, side):
+    """Write an RGB PNG of side x side pixels: a gradient with noise, so it compresses like a photo."""
+    base = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    # Pixel (x, y) depends on x + y only, so each row is a window into one strip of 2 * side pixels
+    strip = bytes(
+        (base[channel] + i + rng.randrange(32)) & 0xFF
+        for i in range(2 * side) for channel in range(3)
+    )
+    raw = b''.join(b'\x00' + strip[y * 3:(y + side) * 3] for y in range(side))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', side, side, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(chunk(b'IEND', b''))
+
+WRITERS = {
+    'txt': write_txt,
+    'md': write_md,
+    'csv': write_csv,
+    'pdf': write_pdf,
+    'docx': write_docx,
+    'xlsx': write_xlsx,
+    'pptx': write_pptx,
+    'png': write_png,
+}
+
+def generate_corpus(directory, num_files, mix=None, text_chars=2000, image_side=256, files_per_dir=500, seed=0):
+    """
+    Write num_files synthetic files under directory, spread over subdirectories of
+    files_per_dir files. mix maps extensions to their share of the corpus. Returns
+    a dict of file counts per extension.
+    """
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    total_share = sum(mix.values())
+    extensions = list(mix)
+    counts = {ext: int(num_files * share / total_share) for ext, share in mix.items()}
+    # Give rounding leftovers to the most common type so the total is exact
+    counts[max(mix, key=mix.get)] += num_files - sum(counts.values())
+
+    plan = [ext for ext in extensions for _ in range(counts[ext])]
+    rng.shuffle(plan)
+    for i, ext in enumerate(plan):
+        subdir = os.path.join(directory, f"dir_{i // files_per_dir:04d}")
+        if i % files_per_dir == 0:
+            os.makedirs(subdir, exist_ok=True)
+        name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i:06d}.{ext}"
+        size = image_side if ext == 'png' else max(100, int(rng.gauss(text_chars, text_chars / 4)))
+        WRITERS[ext](os.path.join(subdir, name), rng, size)
+    return counts
@@ -0,0 +1,68 @@
+"""
+Deterministic stand-ins for the model backends, so benchmarks measure the
+organizer rather than the model. Outputs depend only on the prompt, and each
+call sleeps for a configurable latency to model inference time.
+"""
+import json
+import time
+import zlib
+from model_manager import ModelManager, IMAGE_MODEL_PATH, TEXT_MODEL_PATH
+from ollama_stub_server import StubOllamaServer
+from benchmarks.corpus import WORDS
+
+def fake_metadata(key):
+    """Return a deterministic (description, filename, category) for a prompt or path."""
+    seed = zlib.crc32(key.encode('utf-8', 'replace'))
+    words = [WORDS[(seed >> shift) % len(WORDS)] for shift in range(0, 24, 3)]
+    description = f"A document about {' '.join(words[:6])}."
+    filename = '_'.join(words[1:4])
+    category = ' '.join(words[4:6])
+    return description, filename, category
+
+def _usage(prompt, completion):
+    # Roughly four characters per token, close enough for throughput figures
+    return {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(completion) // 4}
+
+class FakeLlama:
+    """Stand-in for llama_cpp.Llama answering both structured and free-form prompts."""
+
+    def __init__(self, model_path='fake-model.gguf', latency=0.0):
+        self.model_path = model_path
+        self.latency = latency
+        self.calls = 0
+
+    def _respond(self, prompt, structured):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        description, filename, category = fake_metadata(prompt)
+        if structured:
+            return json.dumps({'description': description, 'filename': filename, 'category': category})
+        return description
+
+    def create_chat_completion(self, messages, response_format=None, **kwargs):
+        prompt = json.dumps(messages)
+        content = self._respond(prompt, response_format is not None)
+        return {
+            'choices': [{'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': _usage(prompt, content),
+        }
+
+    def create_completion(self, prompt, **kwargs):
+        text = self._respond(prompt, False)
+        return {'choices': [{'text': text, 'finish_reason': 'stop'}], 'usage': _usage(prompt, text)}
+
+class FakeModelManager(ModelManager):
+    """ModelManager whose models are FakeLlama instances with the given latency."""
+
+    def __init__(self, latency=0.0, **kwargs):
+        kwargs.setdefault('silent', True)
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def _load(self, name):
+        return FakeLlama(IMAGE_MODEL_PATH if name == 'image' else TEXT_MODEL_PATH, latency=self.latency)
+
+def start_fake_ollama(latency=0.0, parallel=4):
+    """Start a StubOllamaServer on a free local port."""
+    return StubOllamaServer(latency=latency, parallel=parallel).start()
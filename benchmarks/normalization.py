@@ -0,0 +1,94 @@
+"""
+Microbenchmark of the per-file cleanup of model output into folder and file names.
+
+Compares the original cleanup, which rebuilt the stopword set, the lemmatizer
+and its regexes for every file, against the shared TextNormalizer, one file at
+a time and in a batch. Needs the NLTK stopwords, punkt and wordnet data. Run
+from the repository root:
+
+    python -m benchmarks.normalization --files 5000
+"""
+import os
+import re
+import json
+import time
+import argparse
+import random
+
+from benchmarks.fake_backends import fake_metadata
+from text_normalization import TEXT_NORMALIZER, TEXT_UNWANTED_WORDS, sanitize_filename, stop_words, lemmatize
+
+def finalize_per_call(filename, foldername, description, file_path):
+    """The cleanup as it was before text_normalization: everything is rebuilt on every call."""
+    from nltk.tokenize import word_tokenize
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    all_unwanted_words = set(TEXT_UNWANTED_WORDS).union(set(stopwords.words('english')))
+    lemmatizer = WordNetLemmatizer()
+
+    def clean_ai_output(text, max_words):
+        text = re.sub(r'[^\w\s]', ' ', text)
+        text = re.sub(r'\d+', '', text)
+        text = text.strip()
+        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+        words = [word.lower() for word in word_tokenize(text) if word.isalpha()]
+        words = [lemmatizer.lemmatize(word) for word in words]
+        filtered_words = []
+        seen = set()
+        for word in words:
+            if word not in all_unwanted_words and word not in seen:
+                filtered_words.append(word)
+                seen.add(word)
+        return '_'.join(filtered_words[:max_words])
+
+    filename = clean_ai_output(filename, max_words=3) or clean_ai_output(description, max_words=3)
+    if not filename:
+        filename = 'document_' + os.path.splitext(os.path.basename(file_path))[0]
+    foldername = clean_ai_output(foldername, max_words=2) or clean_ai_output(description, max_words=2) or 'documents'
+    return sanitize_filename(foldername, max_words=2), sanitize_filename(filename, max_words=3), description
+
+def _per_file_microseconds(func, items, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(items)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return round(best / len(items) * 1e6, 2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cleanup of model output into file and folder names.")
+    parser.add_argument('--files', type=int, default=5000, help="Model outputs to clean")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per variant; the fastest is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    items = []
+    for index in range(args.files):
+        file_path = f"/corpus/doc_{rng.randrange(10 ** 9):09d}.txt"
+        description, filename, category = fake_metadata(file_path)
+        items.append((filename, category, description, file_path))
+
+    # Load the corpora up front so neither variant is charged for the first read from disk
+    stop_words()
+    finalize_per_call(*items[0])
+    results = {
+        'files': args.files,
+        'per_call_us': _per_file_microseconds(lambda batch: [finalize_per_call(*item) for item in batch], items, args.repeat),
+        'shared_us': _per_file_microseconds(lambda batch: [TEXT_NORMALIZER.finalize(*item) for item in batch], items, args.repeat),
+        'batch_us': _per_file_microseconds(TEXT_NORMALIZER.finalize_batch, items, args.repeat),
+        'lemma_cache': lemmatize.cache_info()._asdict(),
+    }
+    print(f"Per-file cleanup of {args.files} model outputs:")
+    print(f"  rebuilt per call: {results['per_call_us']:>9.2f} us")
+    print(f"  shared:           {results['shared_us']:>9.2f} us")
+    print(f"  batch:            {results['batch_us']:>9.2f} us")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+End-to-end benchmark of the organizer's stages on a synthetic corpus.
+
+Times scan, extract, infer, sanitize, compute_operations and execute_operations
+at each requested corpus size with deterministic fake model backends, and writes
+the results as JSON. Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 100000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import config
+from file_utils import collect_file_paths, separate_files_by_type
+from extraction_pipeline import ExtractionPipeline
+from data_processing_common import compute_operations, execute_operations
+from text_data_processing import process_text_files, finalize_text_metadata
+from image_data_processing import process_image_files
+from metrics import metrics
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_backends import FakeModelManager, start_fake_ollama, fake_metadata
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _timed(results, stage, func, items=None):
+    """Run one stage, recording its duration and throughput; a failing stage records its error."""
+    start = time.perf_counter()
+    try:
+        value = func()
+        error = None
+    except Exception as e:
+        value = None
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    count = items(value) if items is not None and value is not None else None
+    record = {'stage': stage, 'seconds': round(seconds, 4)}
+    if count is not None:
+        record['items'] = count
+        record['items_per_second'] = round(count / seconds, 1) if seconds > 0 else None
+    if error is not None:
+        record['error'] = error
+    results.append(record)
+    return value
+
+def run_size(num_files, work_dir, args):
+    """Benchmark every stage on a fresh corpus of num_files files."""
+    corpus_dir = os.path.join(work_dir, f"corpus_{num_files}")
+    output_dir = os.path.join(work_dir, f"organized_{num_files}")
+    log_file = os.path.join(work_dir, f"log_{num_files}.jsonl")
+    config.THUMBNAIL_CACHE_DIR = os.path.join(work_dir, f"thumbnails_{num_files}")
+
+    start = time.perf_counter()
+    counts = generate_corpus(corpus_dir, num_files, text_chars=args.text_chars, image_side=args.image_side, seed=args.seed)
+    corpus_seconds = time.perf_counter() - start
+
+    metrics.reset()
+    results = []
+    scanned = _timed(results, 'scan', lambda: separate_files_by_type(collect_file_paths(corpus_dir)),
+                     items=lambda value: len(value[0]) + len(value[1]))
+    image_files, text_files = scanned or ([], [])
+    if args.infer_limit is not None:
+        image_files = image_files[:args.infer_limit]
+        text_files = text_files[:args.infer_limit]
+
+    text_tuples = _timed(results, 'extract', lambda: list(ExtractionPipeline(text_files, silent=True, log_file=log_file).start()),
+                         items=len) or []
+
+    def infer():
+        if args.backend == 'ollama':
+            from ollama_data_processing import process_image_files_ollama, process_text_files_ollama
+            server = start_fake_ollama(latency=args.latency, parallel=args.ollama_parallel)
+            config.OLLAMA_HOST = server.url
+            try:
+                data = process_image_files_ollama(image_files, silent=True, log_file=log_file)
+                data += process_text_files_ollama(text_tuples, silent=True, log_file=log_file)
+            finally:
+                server.stop()
+            # The Ollama results use the keys expected by the Ollama output path
+            return [{'file_path': d['file_path'], 'foldername': d['category'], 'filename': d['new_filename'],
+                     'description': d['summary']} for d in data]
+        models = FakeModelManager(latency=args.latency, log_file=log_file)
+        with models.phase('images', release=('image',)):
+            data = process_image_files(image_files, models.image, models.text, silent=True, log_file=log_file)
+        with models.phase('text'):
+            data += process_text_files(text_tuples, models.text, silent=True, log_file=log_file)
+        return data
+
+    data_list = _timed(results, 'infer', infer, items=len)
+
+    raw = [(file_path, fake_metadata(file_path)) for file_path in image_files + [fp for fp, _ in text_tuples]]
+    _timed(results, 'sanitize',
+           lambda: [finalize_text_metadata(filename, category, description, file_path)
+                    for file_path, (description, filename, category) in raw],
+           items=len)
+    if data_list is None:
+        # Inference failed (e.g. missing NLTK data); keep measuring the later stages on synthetic metadata
+        data_list = [{'file_path': file_path, 'foldername': category.replace(' ', '_'), 'filename': filename,
+                      'description': description} for file_path, (description, filename, category) in raw]
+
+    operations = _timed(results, 'compute_operations', lambda: compute_operations(data_list, output_dir, set(), set()),
+                        items=len) or []
+    _timed(results, 'execute_operations',
+           lambda: execute_operations(operations, dry_run=False, silent=True, log_file=log_file), items=len)
+
+    if not args.keep_corpus:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        shutil.rmtree(config.THUMBNAIL_CACHE_DIR, ignore_errors=True)
+    return {
+        'files': num_files,
+        'corpus': counts,
+        'corpus_seconds': round(corpus_seconds, 3),
+        'stages': results,
+        'metrics': metrics.snapshot() if metrics.enabled else None,
+    }
+
+def print_summary(run):
+    print(f"\n{run['files']} files (corpus generated in {run['corpus_seconds']:.1f}s)")
+    print(f"{'Stage':<22}{'Seconds':>10}{'Items':>10}{'Items/s':>12}")
+    for record in run['stages']:
+        if 'error' in record:
+            error = ' '.join(record['error'].split())[:120]
+            print(f"{record['stage']:<22}{record['seconds']:>10.3f}  failed: {error}")
+            continue
+        rate = record.get('items_per_second')
+        print(f"{record['stage']:<22}{record['seconds']:>10.3f}{record.get('items', ''):>10}{rate if rate is not None else '':>12}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the organizer stages on a synthetic corpus.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Corpus sizes in files")
+    parser.add_argument('--backend', choices=('local', 'ollama'), default='local', help="Fake backend to run inference against")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds per fake model call")
+    parser.add_argument('--ollama-parallel', type=int, default=4, help="Parallel slots of the fake Ollama server")
+    parser.add_argument('--infer-limit', type=int, default=None, help="Only run inference on this many files of each kind")
+    parser.add_argument('--text-chars', type=int, default=2000, help="Average characters of text per document")
+    parser.add_argument('--image-side', type=int, default=256, help="Side of the generated images in pixels")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--metrics', action='store_true', help="Also record the organizer's own spans and counters")
+    parser.add_argument('--work-dir', default=None, help="Where to generate corpora (default: a temporary directory)")
+    parser.add_argument('--keep-corpus', action='store_true', help="Keep generated corpora and output after the run")
+    parser.add_argument('--output', default=None, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    # Benchmarks must not read or pollute the user's persistent caches
+    config.CACHE_ENABLED = False
+    metrics.enabled = args.metrics
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='organizer_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    timestamp = datetime.now(timezone.utc)
+    report = {
+        'timestamp': timestamp.isoformat(),
+        'git_commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'work_dir')},
+        'runs': [],
+    }
+    try:
+        for num_files in args.sizes:
+            run = run_size(num_files, work_dir, args)
+            report['runs'].append(run)
+            print_summary(run)
+    finally:
+        if args.work_dir is None and not args.keep_corpus:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"bench-{timestamp.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Startup budget check: how long the organizer takes until its main menu appears.
+
+Starts main.py the way a user does, answers the silent-mode prompt and times
+the run until the main menu is printed. It also reports the slowest imports,
+as -X importtime does, and checks that no heavy backend or document reader is
+imported before it is needed. Exits with status 1 when the budget is exceeded
+or a heavy module is imported at startup, so it can run alongside tests.
+Run from the repository root:
+
+    python -m benchmarks.startup --budget-ms 500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MENU_MARKER = b'Main Menu:'
+# Only needed by the modes or readers that use them, so none may load before the menu
+HEAVY_MODULES = ('llama_cpp', 'ollama', 'httpx', 'watchdog', 'nltk', 'pandas', 'openpyxl', 'fitz', 'pymupdf',
+                 'pytesseract', 'numpy', 'PIL', 'rich', 'tqdm')
+
+def time_to_menu():
+    """Seconds from starting main.py until the main menu is printed."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-u', 'main.py'], cwd=REPO_ROOT, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        process.stdin.write(b'no\n')
+        process.stdin.flush()
+        output = b''
+        while MENU_MARKER not in output:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError(f"main.py exited before showing the menu: {output.decode(errors='replace')[-500:]}")
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+def import_report():
+    """Return (per-module import times in microseconds, heavy modules loaded) for importing main."""
+    check = f"import sys, json, main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', check], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({'module': name.strip(), 'self_us': int(self_us), 'cumulative_us': int(cumulative_us)})
+    return modules, json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the organizer's time until the main menu against a budget.")
+    parser.add_argument('--budget-ms', type=float, default=500.0, help="Largest acceptable median time until the menu")
+    parser.add_argument('--runs', type=int, default=5, help="Startups to time; the median is compared to the budget")
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    parser.add_argument('--output', default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    timings = [time_to_menu() for _ in range(args.runs)]
+    median_ms = statistics.median(timings) * 1000
+    modules, heavy_loaded = import_report()
+    main_import = next((m for m in modules if m['module'] == 'main'), None)
+
+    print(f"Time until the main menu: median {median_ms:.0f} ms over {args.runs} runs "
+          f"(best {min(timings) * 1000:.0f} ms, budget {args.budget_ms:.0f} ms)")
+    if main_import is not None:
+        print(f"Importing main: {main_import['cumulative_us'] / 1000:.1f} ms")
+    print("Slowest imports (cumulative):")
+    for module in sorted(modules, key=lambda m: -m['cumulative_us'])[:args.top]:
+        print(f"  {module['cumulative_us'] / 1000:>8.1f} ms  {module['module']}")
+    if heavy_loaded:
+        print(f"Imported at startup but only needed later: {', '.join(heavy_loaded)}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'median_ms': round(median_ms, 1), 'timings_ms': [round(t * 1000, 1) for t in timings],
+                       'budget_ms': args.budget_ms, 'heavy_loaded': heavy_loaded, 'imports': modules}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    ok = median_ms <= args.budget_ms and not heavy_loaded
+    print("Within budget." if ok else "Over budget.")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
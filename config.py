@@ -1,6 +1,7 @@
 """
 Configuration settings for the file organizer.
 """
+import os
 
 # Model paths
 IMAGE_MODEL_PATH = "llava-v1.6-vicuna-7b:q4_0"
@@ -11,12 +12,97 @@ DEFAULT_TEMPERATURE = 0.3
 MAX_NEW_TOKENS = 3000
 TOP_K = 3
 TOP_P = 0.2
+STRUCTURED_OUTPUT = True  # Generate description, filename and category in one JSON completion per file
 
 # File organizing modes
 CONTENT_MODE = 'content'
 DATE_MODE = 'date'
 TYPE_MODE = 'type'
+INCREMENTAL_MODE = True  # Skip files already organized into the output directory and unchanged since
 
 # Logging
-LOG_FILE = 'operation_log.txt'
+LOG_FILE = 'operation_log.jsonl'  # Silent mode writes one JSON record per line here
 SILENT_MODE = False
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate the log file once it grows past this size
+LOG_BACKUP_COUNT = 3  # Rotated files kept as operation_log.jsonl.1, .2, ...
+LOG_QUEUE_SIZE = 10000  # Records waiting for the writer thread before callers block
+LOG_FLUSH_INTERVAL = 0.2  # Seconds between writes of queued records to disk
+
+# Metadata cache
+CACHE_ENABLED = True
+CACHE_DB_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'local_file_organizer', 'metadata_cache.sqlite3')
+CACHE_MAX_ENTRIES = 200000
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+PROMPT_VERSION = 1  # Bump whenever prompts change so stale cached metadata is ignored
+
+# Local models
+MODEL_USE_MMAP = True  # Map model weights from disk instead of reading them into memory
+MODEL_USE_MLOCK = False  # Pin model weights in RAM so they are never paged out
+MODEL_UNLOAD_BETWEEN_PHASES = True  # Release the vision model before the text phase
+MODEL_PHASE_HISTORY = 256  # Most recent phase timings kept in memory by the model manager
+WATCH_KEEP_MODELS_LOADED = True  # Keep both models warm in watch mode instead of reloading them for every batch
+
+# File operations
+LINK_TYPE = 'hardlink'  # 'hardlink' (copied across filesystems), 'symlink' or 'move'
+EXECUTE_WORKERS = 8  # Threads creating links at once; more help most on network filesystems
+
+# Resumable runs
+JOURNAL_ENABLED = True  # Journal one-time runs in the output directory so an interrupted run can resume
+JOURNAL_COMMIT_EVERY = 64  # Records per journal transaction
+JOURNAL_COMMIT_INTERVAL = 5.0  # Seconds at most between journal transactions while records arrive
+
+# Text extraction
+MAX_EXTRACT_CHARS = 3000  # Characters of text read from each document for the prompt
+SPREADSHEET_HEAD_ROWS = 20  # Rows read from the top of each sheet or CSV
+SPREADSHEET_STRIDED_ROWS = 10  # Extra rows sampled evenly through large CSVs; 0 disables
+EXTRACTION_WORKERS = None  # Worker processes for reading files; None uses all CPU cores
+EXTRACTION_QUEUE_SIZE = 32  # Files extracted or waiting for inference at any one time
+
+# Image preprocessing
+IMAGE_PREPROCESSING = True  # Send models a downscaled JPEG copy instead of the original image
+IMAGE_MAX_SIDE = 672  # Longest side in pixels; vision encoders work at 336-672 pixels
+IMAGE_JPEG_QUALITY = 85
+IMAGE_PREPROCESS_WORKERS = None  # Processes preparing images; None uses one per CPU
+THUMBNAIL_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'local_file_organizer', 'thumbnails')
+THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently used thumbnails are removed beyond this; None disables pruning
+
+# Duplicate detection
+HASH_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'local_file_organizer', 'hash_index.sqlite3')
+WATCH_CHECK_DUPLICATES = True  # Report whether files arriving in watch mode duplicate already indexed files
+IMAGE_HASH_SIZE = 8  # Perceptual hashes are IMAGE_HASH_SIZE x IMAGE_HASH_SIZE bits
+IMAGE_SIMILARITY_MAX_DISTANCE = 6  # Largest Hamming distance between hashes of similar images
+TEXT_SHINGLE_SIZE = 3  # Words per shingle when comparing documents
+TEXT_MINHASH_PERMUTATIONS = 128  # MinHash signature length
+TEXT_LSH_BANDS = 16  # LSH bands; more bands find less similar candidates
+TEXT_SIMILARITY_THRESHOLD = 0.8  # Estimated Jaccard similarity for documents to count as near-duplicates
+
+# Ollama
+OLLAMA_HOST = 'http://localhost:11434'
+OLLAMA_CONCURRENCY = 4  # Requests in flight at once; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_REQUEST_TIMEOUT = 300.0  # Seconds before a single request attempt is abandoned
+OLLAMA_MAX_RETRIES = 3  # Further attempts after a timeout, dropped connection or server error
+OLLAMA_RETRY_BACKOFF = 1.0  # Seconds before the first retry, doubled for each further one
+
+# Daemon
+DAEMON_SOCKET_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'local_file_organizer', 'organizer.sock')
+DAEMON_BATCH_SIZE = 8  # Files per turn on the shared models before another client's job gets a turn
+DAEMON_KEEP_MODELS_LOADED = True  # Keep both models warm between jobs instead of releasing them between phases
+
+# Text normalization
+LEMMA_CACHE_SIZE = 65536  # Lemmatized words memoized across files
+NLTK_DOWNLOAD_MISSING = True  # Download missing NLTK data when a local model is first used; set False on hosts without network access
+
+# Metrics
+METRICS_ENABLED = False  # Time each stage and count files, bytes, tokens and cache hits
+METRICS_JSON_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'local_file_organizer', 'metrics.json')
+METRICS_PROMETHEUS_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'local_file_organizer', 'metrics.prom')
+METRICS_EXPORT_INTERVAL = 60  # Seconds between metric exports in watch mode
+
+# Watch mode
+WATCH_WORKERS = 1  # Worker threads draining the watch queue; local models are not thread-safe
+WATCH_BATCH_SIZE = 16  # Files handed to a worker at once
+WATCH_SETTLE_SECONDS = 1.0  # Size and mtime must stay unchanged this long before a file is processed
+WATCH_POLL_INTERVAL = 0.5  # Seconds between stability checks
+WATCH_STATUS_INTERVAL = 30  # Seconds between queue status reports while files are queued
+WATCH_SNAPSHOT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'local_file_organizer', 'watch_snapshot.sqlite3')
+WATCH_CATCH_UP = True  # On start, organize files that arrived or changed while the watcher was not running
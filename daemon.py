@@ -0,0 +1,349 @@
+import os
+import sys
+import json
+import time
+import socket
+import itertools
+import threading
+import socketserver
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque
+import config
+from file_utils import collect_file_paths
+from data_processing_common import process_files_by_date, process_files_by_type, execute_operations
+from organize_files import organize_files_with_ai
+from duplicate_finder import find_duplicates
+from hash_index import HashIndex
+from model_manager import ModelManager
+from name_index import NameIndex
+from metrics import metrics
+from log_writer import log_message, flush_logs
+
+JOB_KINDS = ('organize', 'dry-run', 'duplicates', 'status')
+
+class Job:
+    """A client request, with the connection its results are streamed back on."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, request, wfile):
+        self.id = next(self._ids)
+        self.kind = request['job']
+        self.client = request.get('client') or f"job-{self.id}"
+        self.input_path = request.get('input_path')
+        self.output_path = request.get('output_path')
+        self.mode = request.get('mode', config.CONTENT_MODE)
+        self.dry_run = self.kind == 'dry-run'
+        self.remaining_batches = 0
+        self.files_done = 0
+        self.cancelled = False
+        self.done = threading.Event()
+        self.started_at = time.time()
+        # Shared by all batches of the job, so a dry run never proposes the same destination twice
+        self.name_index = NameIndex()
+        self._wfile = wfile
+        self._send_lock = threading.Lock()
+
+    def send(self, event, **fields):
+        """Stream one JSON line to the client; a client that went away cancels the job."""
+        line = json.dumps(dict(fields, event=event, job=self.id)) + '\n'
+        with self._send_lock:
+            try:
+                self._wfile.write(line.encode('utf-8'))
+                self._wfile.flush()
+            except OSError:
+                self.cancelled = True
+
+    def send_operations(self, operations, completed=None):
+        """Report the outcome for each file of a batch."""
+        organized = None if completed is None else {id(operation) for operation in completed}
+        for operation in operations:
+            if organized is None:
+                status = 'proposed'
+            else:
+                status = 'organized' if id(operation) in organized else 'failed'
+            self.send('file', status=status, source=operation['source'],
+                      destination=operation['destination'], link_type=operation['link_type'])
+        self.files_done += len(operations)
+
+    def finish(self, **fields):
+        self.send('done', files=self.files_done, seconds=round(time.time() - self.started_at, 3), **fields)
+        self.done.set()
+
+class FairJobQueue:
+    """Queue of model work that takes turns between clients.
+
+    Each job is split into batches. get() serves one batch from the client at the
+    head of the rotation and moves that client to the back, so a client with a
+    huge job cannot starve one that submitted a few files.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._clients = OrderedDict()  # client -> deque of (job, batch)
+        self._stopped = False
+
+    def put(self, job, batches):
+        with self._condition:
+            job.remaining_batches += len(batches)
+            queue = self._clients.setdefault(job.client, deque())
+            queue.extend((job, batch) for batch in batches)
+            self._condition.notify()
+
+    def get(self):
+        """Return the next (job, batch), or None once the queue is stopped."""
+        with self._condition:
+            while not self._clients and not self._stopped:
+                self._condition.wait()
+            if self._stopped:
+                return None
+            client, queue = next(iter(self._clients.items()))
+            item = queue.popleft()
+            del self._clients[client]
+            if queue:
+                self._clients[client] = queue
+            return item
+
+    def depth(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._clients.values())
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+class OrganizerDaemon:
+    """Long-running organizer that keeps the local models warm and serves jobs over a Unix socket.
+
+    Clients send one JSON line describing a job and receive JSON lines back: a
+    'queued' event, one 'file' event per organized or proposed file, and a final
+    'done' or 'error' event. Content-mode jobs share the loaded models through a
+    single worker fed by a FairJobQueue. Date and type jobs and duplicate scans do
+    not need the models and run on the connection's own thread.
+    """
+
+    def __init__(self, socket_path=None, batch_size=None, log_file=None):
+        self.socket_path = socket_path or config.DAEMON_SOCKET_PATH
+        self.batch_size = batch_size or config.DAEMON_BATCH_SIZE
+        self.log_file = log_file or config.LOG_FILE
+        self.models = ModelManager(
+            unload_between_phases=not config.DAEMON_KEEP_MODELS_LOADED,
+            silent=True,
+            log_file=self.log_file
+        )
+        self.queue = FairJobQueue()
+        self.hash_index = HashIndex()
+        self.extraction_executor = self._new_extraction_executor()
+        self.jobs_completed = 0
+        self.started_at = time.time()
+        self._server = None
+        self._worker = None
+
+    @staticmethod
+    def _new_extraction_executor():
+        """
+        The extraction pool shared by every job. Its workers are started by a
+        forkserver rather than forked from this process, which holds threads and models.
+        """
+        workers = config.EXTRACTION_WORKERS if config.EXTRACTION_WORKERS is not None else os.cpu_count() or 1
+        context = multiprocessing.get_context('forkserver') if 'forkserver' in multiprocessing.get_all_start_methods() else None
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context) if workers > 0 else None
+
+    def _healthy_extraction_executor(self):
+        """Return the shared extraction pool, replacing it if a worker died while reading an earlier batch."""
+        if self.extraction_executor is None:
+            return None
+        try:
+            # Submitting fails straight away once the pool is broken
+            self.extraction_executor.submit(os.getpid)
+        except BrokenProcessPool:
+            log_message("An extraction worker died; starting a new extraction pool", True, self.log_file, level='error')
+            self.extraction_executor.shutdown(wait=False)
+            self.extraction_executor = self._new_extraction_executor()
+        return self.extraction_executor
+
+    def handle(self, request, wfile):
+        """Run or queue one job and block until its results have been streamed."""
+        kind = request.get('job')
+        if kind not in JOB_KINDS:
+            wfile.write((json.dumps({'event': 'error', 'message': f"Unknown job {kind!r}; expected one of {', '.join(JOB_KINDS)}"}) + '\n').encode('utf-8'))
+            return
+        job = Job(request, wfile)
+        try:
+            if kind == 'status':
+                job.finish(**self.status())
+            elif kind == 'duplicates':
+                self.run_duplicate_scan(job)
+            elif job.mode == config.CONTENT_MODE:
+                self.queue_content_job(job)
+                job.done.wait()
+            else:
+                self.run_rule_based_job(job)
+        except Exception as e:
+            job.send('error', message=str(e))
+            job.done.set()
+        self.jobs_completed += 1
+        metrics.increment('jobs_completed', kind=kind)
+        metrics.export()
+
+    def _check_input(self, job):
+        if not job.input_path or not os.path.exists(job.input_path):
+            raise ValueError(f"Input path {job.input_path} does not exist.")
+        if job.kind != 'duplicates' and not job.output_path:
+            raise ValueError("An output_path is required.")
+
+    def queue_content_job(self, job):
+        self._check_input(job)
+        with metrics.span('scan', mode='daemon'):
+            file_paths = collect_file_paths(job.input_path)
+        batches = [file_paths[i:i + self.batch_size] for i in range(0, len(file_paths), self.batch_size)]
+        if not batches:
+            job.finish()
+            return
+        job.send('queued', files=len(file_paths), batches=len(batches), queue_depth=self.queue.depth())
+        self.queue.put(job, batches)
+
+    def run_rule_based_job(self, job):
+        self._check_input(job)
+        file_paths = collect_file_paths(job.input_path)
+        job.send('started', files=len(file_paths))
+        if job.mode == config.DATE_MODE:
+            operations = process_files_by_date(file_paths, job.output_path, dry_run=job.dry_run, silent=True, log_file=self.log_file)
+        elif job.mode == config.TYPE_MODE:
+            operations = process_files_by_type(file_paths, job.output_path, dry_run=job.dry_run, silent=True, log_file=self.log_file)
+        else:
+            raise ValueError(f"Unknown mode {job.mode!r}")
+        completed = None
+        if not job.dry_run:
+            completed = execute_operations(operations, dry_run=False, silent=True, log_file=self.log_file)
+        job.send_operations(operations, completed)
+        job.finish()
+
+    def run_duplicate_scan(self, job):
+        self._check_input(job)
+        job.send('started')
+        stats = {}
+        duplicate_sets = find_duplicates(job.input_path, stats=stats, index=self.hash_index)
+        job.send('duplicates', sets=duplicate_sets, stats=stats)
+        job.finish()
+
+    def _work(self):
+        """Serve model batches from the fair queue until the daemon stops."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            job, batch = item
+            if not job.cancelled:
+                try:
+                    operations = organize_files_with_ai(batch, job.output_path, 'local', self.models, None, True, self.log_file,
+                                                        name_index=job.name_index, extraction_executor=self._healthy_extraction_executor())
+                    completed = None
+                    if not job.dry_run:
+                        completed = execute_operations(operations, dry_run=False, silent=True, log_file=self.log_file)
+                    job.send_operations(operations, completed)
+                except Exception as e:
+                    job.send('error', message=f"Batch failed: {e}", files=batch)
+            job.remaining_batches -= 1
+            if job.remaining_batches == 0:
+                job.finish()
+
+    def status(self):
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'queue_depth': self.queue.depth(),
+            'jobs_completed': self.jobs_completed,
+            'models_loaded': self.models.loaded(),
+            'metrics': metrics.snapshot() if metrics.enabled else None,
+        }
+
+    def serve_forever(self):
+        """Listen on the socket until interrupted."""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    self.wfile.write(b'{"event": "error", "message": "Request must be one JSON object per line"}\n')
+                    return
+                daemon.handle(request, self.wfile)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            # A socket left behind by a daemon that did not shut down cleanly
+            os.unlink(self.socket_path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+        print(f"Organizer daemon listening on {self.socket_path}. Press Ctrl+C to stop.")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.queue.stop()
+        if self._server is not None:
+            self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.models.unload_all()
+        if self.extraction_executor is not None:
+            self.extraction_executor.shutdown(wait=False, cancel_futures=True)
+        self.hash_index.close()
+        metrics.export()
+        flush_logs()
+
+def submit_job(request, socket_path=None):
+    """Send a job to a running daemon and yield its events as they arrive."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path or config.DAEMON_SOCKET_PATH)
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with sock.makefile('rb') as responses:
+            for line in responses:
+                yield json.loads(line)
+
+USAGE = """Usage:
+  python daemon.py serve
+  python daemon.py organize <input_path> <output_path> [content|date|type]
+  python daemon.py dry-run <input_path> <output_path> [content|date|type]
+  python daemon.py duplicates <directory>
+  python daemon.py status"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if not args:
+        print(USAGE)
+        sys.exit(1)
+    command = args[0]
+    if command == 'serve':
+        from main import ensure_nltk_data
+        ensure_nltk_data()
+        OrganizerDaemon().serve_forever()
+        sys.exit(0)
+
+    if command in ('organize', 'dry-run') and len(args) in (3, 4):
+        request = {'job': command, 'input_path': os.path.abspath(args[1]), 'output_path': os.path.abspath(args[2]),
+                   'mode': args[3] if len(args) == 4 else config.CONTENT_MODE}
+    elif command == 'duplicates' and len(args) == 2:
+        request = {'job': command, 'input_path': os.path.abspath(args[1])}
+    elif command == 'status' and len(args) == 1:
+        request = {'job': command}
+    else:
+        print(USAGE)
+        sys.exit(1)
+    request['client'] = f"cli-{os.getpid()}"
+    for event in submit_job(request):
+        print(json.dumps(event))
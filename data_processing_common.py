@@ -1,36 +1,53 @@
 import os
 import re
+import json
 import datetime  # Import datetime for date operations
-from rich.progress import Progress, TextColumn, BarColumn, TimeElapsedColumn
-
-def sanitize_filename(name, max_length=50, max_words=5):
-    """Sanitize the filename by removing unwanted words and characters."""
-    # Remove file extension if present
-    name = os.path.splitext(name)[0]
-    # Remove unwanted words and data type words
-    name = re.sub(
-        r'\b(jpg|jpeg|png|gif|bmp|txt|md|pdf|docx|xls|xlsx|csv|ppt|pptx|image|picture|photo|this|that|these|those|here|there|'
-        r'please|note|additional|notes|folder|name|sure|heres|a|an|the|and|of|in|'
-        r'to|for|on|with|your|answer|should|be|only|summary|summarize|text|category)\b',
-        '',
-        name,
-        flags=re.IGNORECASE
-    )
-    # Remove non-word characters except underscores
-    sanitized = re.sub(r'[^\w\s]', '', name).strip()
-    # Replace multiple underscores or spaces with a single underscore
-    sanitized = re.sub(r'[\s_]+', '_', sanitized)
-    # Convert to lowercase
-    sanitized = sanitized.lower()
-    # Remove leading/trailing underscores
-    sanitized = sanitized.strip('_')
-    # Split into words and limit the number of words
-    words = sanitized.split('_')
-    limited_words = [word for word in words if word]  # Remove empty strings
-    limited_words = limited_words[:max_words]
-    limited_name = '_'.join(limited_words)
-    # Limit length
-    return limited_name[:max_length] if limited_name else 'untitled'
+from concurrent.futures import ThreadPoolExecutor
+import config
+from metrics import metrics
+from log_writer import log_message
+from placement import Placer
+from name_index import NameIndex
+from text_normalization import sanitize_filename
+
+EXECUTE_CHUNK_SIZE = 512  # Operations handed to the link pool between progress updates
+
+# JSON schema for single-call structured metadata generation
+METADATA_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "description": {"type": "string"},
+        "filename": {"type": "string"},
+        "category": {"type": "string"}
+    },
+    "required": ["description", "filename", "category"]
+}
+
+def parse_metadata_json(text):
+    """Parse a structured model response into a dict with description, filename and category.
+
+    Returns None if the response is not a JSON object with non-empty string values for all three keys.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    # Models sometimes wrap JSON in code fences or add a short preamble
+    match = re.search(r'\{.*\}', text, flags=re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    result = {}
+    for key in ('description', 'filename', 'category'):
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        result[key] = value.strip()
+    return result
 
 def process_files_by_date(file_paths, output_path, dry_run=False, silent=False, log_file=None):
     """Process files to organize them by date."""
@@ -47,8 +64,8 @@ def process_files_by_date(file_paths, output_path, dry_run=False, silent=False,
         # Prepare new file path
         new_file_name = os.path.basename(file_path)
         new_file_path = os.path.join(dir_path, new_file_name)
-        # Decide whether to use hardlink or symlink
-        link_type = 'hardlink'  # Assume hardlink for now
+        # Hardlink, symlink or move; the placer picks how to carry it out
+        link_type = config.LINK_TYPE
         # Record the operation
         operation = {
             'source': file_path,
@@ -108,8 +125,8 @@ def process_files_by_type(file_paths, output_path, dry_run=False, silent=False,
         # Prepare new file path
         new_file_name = os.path.basename(file_path)
         new_file_path = os.path.join(dir_path, new_file_name)
-        # Decide whether to use hardlink or symlink
-        link_type = 'hardlink'  # Assume hardlink for now
+        # Hardlink, symlink or move; the placer picks how to carry it out
+        link_type = config.LINK_TYPE
         # Record the operation
         operation = {
             'source': file_path,
@@ -120,8 +137,17 @@ def process_files_by_type(file_paths, output_path, dry_run=False, silent=False,
 
     return operations
 
-def compute_operations(data_list, new_path, renamed_files, processed_files):
-    """Compute the file operations based on generated metadata."""
+def compute_operations(data_list, new_path, renamed_files, processed_files, name_index=None):
+    """Compute the file operations based on generated metadata.
+
+    Name clashes, with each other and with files already in the output
+    directory, get a _1, _2, ... suffix from a NameIndex. Paths in renamed_files
+    are treated as taken, and every planned destination is added to it.
+    """
+    if name_index is None:
+        name_index = NameIndex()
+    for file_path in renamed_files:
+        name_index.reserve(file_path)
     operations = []
     for data in data_list:
         file_path = data['file_path']
@@ -129,24 +155,14 @@ def compute_operations(data_list, new_path, renamed_files, processed_files):
             continue
         processed_files.add(file_path)
 
-        # Prepare folder name and file name
+        # Prepare folder name and a file name not yet taken in that folder
         folder_name = data['foldername']
-        new_file_name = data['filename'] + os.path.splitext(file_path)[1]
-
-        # Prepare new file path
         dir_path = os.path.join(new_path, folder_name)
+        new_file_name = name_index.claim(dir_path, data['filename'], os.path.splitext(file_path)[1])
         new_file_path = os.path.join(dir_path, new_file_name)
 
-        # Handle duplicates
-        counter = 1
-        original_new_file_name = new_file_name
-        while new_file_path in renamed_files:
-            new_file_name = f"{data['filename']}_{counter}" + os.path.splitext(file_path)[1]
-            new_file_path = os.path.join(dir_path, new_file_name)
-            counter += 1
-
-        # Decide whether to use hardlink or symlink
-        link_type = 'hardlink'  # Assume hardlink for now
+        # Hardlink, symlink or move; the placer picks how to carry it out
+        link_type = config.LINK_TYPE
 
         # Record the operation
         operation = {
@@ -161,44 +177,100 @@ def compute_operations(data_list, new_path, renamed_files, processed_files):
 
     return operations  # Return the list of operations for display or further processing
 
-def execute_operations(operations, dry_run=False, silent=False, log_file=None):
-    """Execute the file operations."""
-    total_operations = len(operations)
+def place_operation(placer, operation):
+    """Carry out one operation; return None on success or the exception it raised."""
+    try:
+        operation['strategy'] = placer.place(operation['source'], operation['destination'], operation['link_type'])
+    except (OSError, ValueError) as e:
+        metrics.increment('link_errors', link_type=operation['link_type'])
+        return e
+    return None
 
-    with Progress(
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TimeElapsedColumn(),
-        transient=True
-    ) as progress:
-        task = progress.add_task("Organizing Files...", total=total_operations)
+def summarize_failures(failures, examples=3):
+    """Group (operation, error) pairs by error and return report lines with a few example files each."""
+    groups = {}
+    for operation, error in failures:
+        reason = f"{type(error).__name__}: {error.strerror}" if getattr(error, 'strerror', None) else f"{type(error).__name__}: {error}"
+        groups.setdefault(reason, []).append(operation)
+    lines = []
+    for reason, operations in sorted(groups.items(), key=lambda item: -len(item[1])):
+        lines.append(f"  {len(operations)} x {reason}")
+        for operation in operations[:examples]:
+            lines.append(f"      {operation['source']} -> {operation['destination']}")
+        if len(operations) > examples:
+            lines.append(f"      ... and {len(operations) - examples} more")
+    return lines
+
+def execute_operations(operations, dry_run=False, silent=False, log_file=None, max_workers=None, journal=None):
+    """Execute the file operations and return the ones that completed successfully, in input order.
+
+    Every destination directory is created once up front, then the links are
+    placed on a pool of max_workers threads with the cheapest strategy that works
+    (see Placer). Failures are collected and reported once, grouped by error,
+    instead of one line per file. Each placed operation is recorded in journal,
+    if given, as soon as it completes.
+    """
+    if dry_run:
         for operation in operations:
-            source = operation['source']
-            destination = operation['destination']
-            link_type = operation['link_type']
-            dir_path = os.path.dirname(destination)
+            message = f"Dry run: would create {operation['link_type']} from '{operation['source']}' to '{operation['destination']}'"
+            log_message(message, silent, log_file, source=operation['source'], destination=operation['destination'],
+                        link_type=operation['link_type'], dry_run=True)
+        return []
 
-            if dry_run:
-                message = f"Dry run: would create {link_type} from '{source}' to '{destination}'"
-            else:
-                # Ensure the directory exists before performing the operation
-                os.makedirs(dir_path, exist_ok=True)
+    from rich.progress import Progress, TextColumn, BarColumn, TimeElapsedColumn
+    max_workers = max_workers or config.EXECUTE_WORKERS
+    failures = []
 
-                try:
-                    if link_type == 'hardlink':
-                        os.link(source, destination)
-                    else:
-                        os.symlink(source, destination)
-                    message = f"Created {link_type} from '{source}' to '{destination}'"
-                except Exception as e:
-                    message = f"Error creating {link_type} from '{source}' to '{destination}': {e}"
+    # One makedirs per unique directory instead of one per file
+    directory_errors = {}
+    for dir_path in sorted({os.path.dirname(operation['destination']) for operation in operations}):
+        try:
+            os.makedirs(dir_path, exist_ok=True)
+        except OSError as e:
+            directory_errors[dir_path] = e
+    pending = []
+    for operation in operations:
+        error = directory_errors.get(os.path.dirname(operation['destination']))
+        if error is not None:
+            failures.append((operation, error))
+        else:
+            pending.append(operation)
 
-            progress.advance(task)
+    placer = Placer()
+    completed = []
+    with Progress(
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TimeElapsedColumn(),
+        transient=True,
+        disable=silent
+    ) as progress, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        task = progress.add_task("Organizing Files...", total=len(operations))
+        progress.advance(task, len(failures))
+        for start in range(0, len(pending), EXECUTE_CHUNK_SIZE):
+            chunk = pending[start:start + EXECUTE_CHUNK_SIZE]
+            for operation, error in zip(chunk, executor.map(lambda operation: place_operation(placer, operation), chunk)):
+                if error is None:
+                    completed.append(operation)
+                    if journal is not None:
+                        journal.record_placed(operation)
+                    if silent:
+                        log_message(f"Placed '{operation['source']}' at '{operation['destination']}' ({operation['strategy']})",
+                                    silent, log_file, source=operation['source'], destination=operation['destination'],
+                                    link_type=operation['link_type'], strategy=operation['strategy'])
+                else:
+                    failures.append((operation, error))
+            progress.advance(task, len(chunk))
 
-            # Silent mode handling
+    message = f"Placed {len(completed)} of {len(operations)} files"
+    if completed:
+        message += ':\n' + '\n'.join(placer.format_stats())
+    if failures:
+        message += f"\n{len(failures)} failed:\n" + '\n'.join(summarize_failures(failures))
+        for operation, error in failures:
             if silent:
-                if log_file:
-                    with open(log_file, 'a') as f:
-                        f.write(message + '\n')
-            else:
-                print(message)
\ No newline at end of file
+                log_message(f"Error placing '{operation['source']}' at '{operation['destination']}': {error}",
+                            silent, log_file, level='error', source=operation['source'], destination=operation['destination'],
+                            link_type=operation['link_type'], error=str(error))
+    log_message(message, silent, log_file, level='error' if failures else 'info', completed=len(completed), failed=len(failures))
+    return completed
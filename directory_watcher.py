@@ -0,0 +1,139 @@
+import os
+import time
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+import config
+from data_processing_common import execute_operations, process_files_by_date, process_files_by_type
+from organize_files import organize_files_with_ai
+from file_utils import separate_files_by_type
+from hash_index import HashIndex
+from work_queue import DebouncedWorkQueue
+from watch_snapshot import WatchSnapshot, format_catch_up
+from metrics import metrics
+from log_writer import log_message
+
+class WatcherEventHandler(FileSystemEventHandler):
+    def __init__(self, output_path, mode, silent_mode, log_file, ai_backend=None, client_or_model=None, model_name=None):
+        self.output_path = os.path.abspath(output_path)
+        self.mode = mode
+        self.silent_mode = silent_mode
+        self.log_file = log_file
+        self.ai_backend = ai_backend
+        self.client_or_model = client_or_model
+        self.model_name = model_name
+        self.hash_index = HashIndex() if config.WATCH_CHECK_DUPLICATES else None
+        self.snapshot = WatchSnapshot() if config.WATCH_CATCH_UP else None
+        # Events only enqueue paths; files are organized by the queue's workers once they stop changing
+        self.work_queue = DebouncedWorkQueue(self.organize_batch)
+
+    def log(self, message):
+        log_message(message, self.silent_mode, self.log_file)
+
+    def enqueue(self, path):
+        # The output directory may be inside the watched tree; never re-organize its links
+        if not os.path.abspath(path).startswith(os.path.join(self.output_path, '')):
+            self.work_queue.submit(path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.enqueue(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.enqueue(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.work_queue.discard(event.src_path)
+            if self.snapshot is not None:
+                self.snapshot.remove(event.src_path)
+            self.enqueue(event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.work_queue.discard(event.src_path)
+            if self.snapshot is not None:
+                self.snapshot.remove(event.src_path)
+            if self.hash_index is not None:
+                self.hash_index.remove_path(event.src_path)
+
+    def catch_up(self, input_path):
+        """Queue files that arrived or changed while the watcher was not running."""
+        if self.snapshot is None:
+            return
+        with metrics.span('scan', mode='watch'):
+            file_paths, stats = self.snapshot.reconcile(input_path, recursive=True, exclude=[self.output_path])
+        self.log(format_catch_up(stats))
+        for file_path in file_paths:
+            self.enqueue(file_path)
+
+    def organize_batch(self, file_paths):
+        """Organize a micro-batch of files that have finished arriving."""
+        metrics.increment('files_detected', len(file_paths), mode='watch')
+        for file_path in file_paths:
+            self.log(f"New file detected: {file_path}")
+            if self.hash_index is not None:
+                duplicates = self.hash_index.find_duplicates_of(file_path)
+                if duplicates:
+                    self.log(f"{file_path} duplicates: {', '.join(duplicates)}")
+        operations = []
+        if self.mode == config.CONTENT_MODE:
+            operations = organize_files_with_ai(
+                file_paths,
+                self.output_path,
+                self.ai_backend,
+                self.client_or_model,
+                self.model_name,
+                self.silent_mode,
+                self.log_file
+            )
+        elif self.mode == config.DATE_MODE:
+            operations = process_files_by_date(file_paths, self.output_path, dry_run=False, silent=self.silent_mode, log_file=self.log_file)
+        elif self.mode == config.TYPE_MODE:
+            operations = process_files_by_type(file_paths, self.output_path, dry_run=False, silent=self.silent_mode, log_file=self.log_file)
+
+        completed = execute_operations(operations, dry_run=False, silent=self.silent_mode, log_file=self.log_file)
+        for operation in completed:
+            self.log(f"Organized {operation['source']}")
+        if self.snapshot is not None:
+            # Files whose placement failed stay out of the snapshot, so the next catch-up retries them
+            self.snapshot.record([operation['source'] for operation in completed] + self.skipped_files(file_paths, operations))
+
+    def skipped_files(self, file_paths, operations):
+        """Files the mode deliberately leaves alone, as opposed to files it failed to organize."""
+        planned = {operation['source'] for operation in operations}
+        skipped = [file_path for file_path in file_paths if file_path not in planned]
+        if self.mode == config.CONTENT_MODE:
+            # Supported files without an operation could not be read or described; only unsupported types are skipped
+            image_files, text_files = separate_files_by_type(skipped)
+            supported = set(image_files) | set(text_files)
+            skipped = [file_path for file_path in skipped if file_path not in supported]
+        return skipped
+
+def start_watching(input_path, output_path, mode, silent_mode, log_file, ai_backend=None, client_or_model=None, model_name=None):
+    """Start watching a directory for new files."""
+    event_handler = WatcherEventHandler(output_path, mode, silent_mode, log_file, ai_backend, client_or_model, model_name)
+    event_handler.work_queue.start()
+    observer = Observer()
+    observer.schedule(event_handler, input_path, recursive=True)
+    observer.start()
+    # Start observing first so nothing arriving during the catch-up scan is missed
+    event_handler.catch_up(input_path)
+    event_handler.log(f"Watching directory: {input_path}")
+    last_status = last_export = time.monotonic()
+    try:
+        while True:
+            time.sleep(1)
+            if time.monotonic() - last_status >= config.WATCH_STATUS_INTERVAL:
+                last_status = time.monotonic()
+                if event_handler.work_queue.stats()['depth']:
+                    event_handler.log(event_handler.work_queue.format_stats())
+            if time.monotonic() - last_export >= config.METRICS_EXPORT_INTERVAL:
+                last_export = time.monotonic()
+                metrics.export()
+    except KeyboardInterrupt:
+        observer.stop()
+    observer.join()
+    event_handler.work_queue.stop()
+    event_handler.log(event_handler.work_queue.format_stats())
+    metrics.export()
@@ -1,34 +1,213 @@
 import os
+import stat
+import time
 import hashlib
+import threading
 from collections import defaultdict
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
+from metrics import metrics
 
-def find_duplicates(directory):
+PARTIAL_BLOCK_SIZE = 64 * 1024  # Bytes hashed from each end of a file in the partial stage
+CHUNK_SIZE = 1024 * 1024  # Bytes read per call when hashing a whole file
+
+class _ScanStats:
+    """Thread-safe counters for a duplicate scan."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files_scanned = 0
+        self.total_bytes = 0
+        self.bytes_read = 0
+        self.already_linked = 0
+        self.partial_hashed = 0
+        self.full_hashed = 0
+
+    def add_read(self, num_bytes):
+        with self._lock:
+            self.bytes_read += num_bytes
+
+    def as_dict(self):
+        return {
+            'files_scanned': self.files_scanned,
+            'total_bytes': self.total_bytes,
+            'bytes_read': self.bytes_read,
+            'already_linked': self.already_linked,
+            'partial_hashed': self.partial_hashed,
+            'full_hashed': self.full_hashed,
+        }
+
+class DisjointSet:
+    """Union-find used to merge pairwise matches into duplicate groups."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.parent = {item: item for item in self.items}
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def groups(self):
+        """Return groups of two or more items, each listed in insertion order."""
+        groups = {}
+        for item in self.items:
+            groups.setdefault(self.find(item), []).append(item)
+        return [group for group in groups.values() if len(group) > 1]
+
+def partial_hash(path, size, scan_stats=None):
+    """Hash the first and last PARTIAL_BLOCK_SIZE bytes of a file, together with its size."""
+    digest = hashlib.sha256(str(size).encode('ascii'))
+    with open(path, 'rb') as f:
+        head = f.read(PARTIAL_BLOCK_SIZE)
+        digest.update(head)
+        read = len(head)
+        if size > 2 * PARTIAL_BLOCK_SIZE:
+            f.seek(-PARTIAL_BLOCK_SIZE, os.SEEK_END)
+            tail = f.read(PARTIAL_BLOCK_SIZE)
+            digest.update(tail)
+            read += len(tail)
+        elif size > PARTIAL_BLOCK_SIZE:
+            rest = f.read()
+            digest.update(rest)
+            read += len(rest)
+    if scan_stats is not None:
+        scan_stats.add_read(read)
+    return digest.hexdigest()
+
+def full_hash(path, scan_stats=None):
+    """Hash a whole file in fixed-size chunks so memory use does not grow with file size."""
+    digest = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    read = 0
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+            read += n
+    if scan_stats is not None:
+        scan_stats.add_read(read)
+    return digest.hexdigest()
+
+def _group_by_hash(paths, hash_func, max_workers, desc):
+    """Hash paths on a worker pool and return groups of two or more paths with equal digests."""
+    from tqdm import tqdm
+    groups = defaultdict(list)
+
+    def safe_hash(path):
+        try:
+            return path, hash_func(path)
+        except (IOError, OSError):
+            return path, None
+
+    with metrics.span('hash', stage=desc), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path, digest in tqdm(executor.map(safe_hash, paths), total=len(paths), desc=desc, unit=" file"):
+            if digest is not None:
+                groups[digest].append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+def find_duplicates(directory, max_workers=None, stats=None, index=None):
     """
-    Finds duplicate files in a given directory based on file size and hash.
+    Finds duplicate files in a given directory in stages: file size, a partial hash
+    of the first and last blocks, then a full streaming hash.
+
+    Paths that share a (device, inode) are hard links to the same data; only the first
+    of them is hashed and reported. If stats is a dict it is filled with scan counters,
+    including bytes read versus total bytes. If a HashIndex is given, digests of files
+    unchanged since an earlier scan are taken from it instead of being recomputed.
     """
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+    scan_stats = _ScanStats()
+
+    # Stage 1: group regular files by size, collapsing hard links to one representative
     file_sizes = defaultdict(list)
+    file_stats = {}
+    seen_inodes = set()
+    scan_id = index.begin_scan() if index is not None else None
+    scan_start = time.perf_counter()
     for dirpath, _, filenames in os.walk(directory):
         for filename in filenames:
             path = os.path.join(dirpath, filename)
-            if os.path.isfile(path):
-                size = os.path.getsize(path)
-                file_sizes[size].append(path)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            scan_stats.files_scanned += 1
+            if index is not None:
+                index.record(path, st, scan_id)
+            inode_key = (st.st_dev, st.st_ino)
+            if inode_key in seen_inodes:
+                scan_stats.already_linked += 1
+                continue
+            seen_inodes.add(inode_key)
+            scan_stats.total_bytes += st.st_size
+            file_sizes[st.st_size].append(path)
+            file_stats[path] = st
+    metrics.observe('scan', time.perf_counter() - scan_start, mode='duplicates')
 
     duplicates = []
-    for size in tqdm(file_sizes, desc="Finding duplicates", unit=" group"):
-        if len(file_sizes[size]) > 1:
-            file_hashes = defaultdict(list)
-            for path in file_sizes[size]:
-                try:
-                    with open(path, 'rb') as f:
-                        file_hash = hashlib.sha256(f.read()).hexdigest()
-                        file_hashes[file_hash].append(path)
-                except (IOError, OSError):
-                    continue
-
-            for file_hash in file_hashes:
-                if len(file_hashes[file_hash]) > 1:
-                    duplicates.append(file_hashes[file_hash])
-
-    return duplicates
\ No newline at end of file
+    partial_candidates = []
+    small_candidates = []
+    for size, paths in file_sizes.items():
+        if len(paths) < 2:
+            continue
+        if size == 0:
+            # Empty files are identical without reading them
+            duplicates.append(paths)
+        elif size <= 2 * PARTIAL_BLOCK_SIZE:
+            # The partial hash already covers the whole file
+            small_candidates.append(paths)
+        else:
+            partial_candidates.append((size, paths))
+
+    # Stage 2: partial hash of the first and last blocks
+    def hash_partial(path):
+        if index is not None:
+            return index.partial_hash(path, file_stats[path], scan_stats)
+        return partial_hash(path, file_stats[path].st_size, scan_stats)
+
+    def hash_full(path):
+        if index is not None:
+            return index.full_hash(path, file_stats[path], scan_stats)
+        return full_hash(path, scan_stats)
+
+    small_paths = [path for paths in small_candidates for path in paths]
+    scan_stats.partial_hashed += len(small_paths)
+    if small_paths:
+        duplicates.extend(_group_by_hash(small_paths, hash_partial, max_workers, "Hashing small files"))
+
+    full_candidates = []
+    partial_paths = [path for _, paths in partial_candidates for path in paths]
+    scan_stats.partial_hashed += len(partial_paths)
+    if partial_paths:
+        full_candidates = _group_by_hash(partial_paths, hash_partial, max_workers, "Hashing file ends")
+
+    # Stage 3: full streaming hash of files whose ends match
+    full_paths = [path for paths in full_candidates for path in paths]
+    scan_stats.full_hashed = len(full_paths)
+    if full_paths:
+        duplicates.extend(_group_by_hash(full_paths, hash_full, max_workers, "Hashing full files"))
+
+    if index is not None:
+        index.finish_scan(directory, scan_id)
+    metrics.increment('files_scanned', scan_stats.files_scanned, mode='duplicates')
+    metrics.increment('bytes_scanned', scan_stats.total_bytes, mode='duplicates')
+    metrics.increment('bytes_read', scan_stats.bytes_read, mode='duplicates')
+    if stats is not None:
+        stats.update(scan_stats.as_dict())
+        if index is not None:
+            stats['index_hits'] = index.hits
+            stats['index_misses'] = index.misses
+    return duplicates
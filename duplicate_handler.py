@@ -1,9 +1,10 @@
 import os
 import shutil
-from tqdm import tqdm
+from log_writer import log_message
 
 def handle_duplicates_delete_all(duplicate_sets, silent=False, log_file=None):
     """Deletes all duplicate files, keeping one original from each set."""
+    from tqdm import tqdm
     if not silent:
         print("Deleting duplicate files...")
     for file_set in tqdm(duplicate_sets, desc="Deleting duplicates", disable=silent):
@@ -12,21 +13,14 @@ def handle_duplicates_delete_all(duplicate_sets, silent=False, log_file=None):
             try:
                 os.remove(file_to_delete)
                 message = f"Deleted duplicate: {file_to_delete}"
-                if silent and log_file:
-                    with open(log_file, 'a') as f:
-                        f.write(message + '\n')
-                elif not silent:
-                    print(message)
+                log_message(message, silent, log_file, action='delete', path=file_to_delete)
             except OSError as e:
                 message = f"Error deleting file {file_to_delete}: {e}"
-                if silent and log_file:
-                    with open(log_file, 'a') as f:
-                        f.write(message + '\n')
-                else:
-                    print(message)
+                log_message(message, silent, log_file, level='error', action='delete', path=file_to_delete)
 
 def handle_duplicates_move_all(duplicate_sets, move_to_folder, silent=False, log_file=None):
     """Moves all duplicate files to a specified folder."""
+    from tqdm import tqdm
     if not os.path.exists(move_to_folder):
         os.makedirs(move_to_folder)
 
@@ -39,18 +33,10 @@ def handle_duplicates_move_all(duplicate_sets, move_to_folder, silent=False, log
             try:
                 shutil.move(file_to_move, os.path.join(move_to_folder, os.path.basename(file_to_move)))
                 message = f"Moved duplicate: {file_to_move}"
-                if silent and log_file:
-                    with open(log_file, 'a') as f:
-                        f.write(message + '\n')
-                elif not silent:
-                    print(message)
+                log_message(message, silent, log_file, action='move', path=file_to_move)
             except (IOError, OSError) as e:
                 message = f"Error moving file {file_to_move}: {e}"
-                if silent and log_file:
-                    with open(log_file, 'a') as f:
-                        f.write(message + '\n')
-                else:
-                    print(message)
+                log_message(message, silent, log_file, level='error', action='move', path=file_to_move)
 
 def handle_individual_duplicate(file_set, action, index_to_keep, silent=False, log_file=None):
     """Handles a single set of duplicates based on user's choice."""
@@ -60,15 +46,7 @@ def handle_individual_duplicate(file_set, action, index_to_keep, silent=False, l
                 try:
                     os.remove(file_path)
                     message = f"Deleted duplicate: {file_path}"
-                    if silent and log_file:
-                        with open(log_file, 'a') as f:
-                            f.write(message + '\n')
-                    elif not silent:
-                        print(message)
+                    log_message(message, silent, log_file, action='delete', path=file_path)
                 except OSError as e:
                     message = f"Error deleting file {file_path}: {e}"
-                    if silent and log_file:
-                        with open(log_file, 'a') as f:
-                            f.write(message + '\n')
-                    else:
-                        print(message)
\ No newline at end of file
+                    log_message(message, silent, log_file, level='error', action='delete', path=file_path)
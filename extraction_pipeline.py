@@ -0,0 +1,181 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+from file_utils import read_file_data
+from metrics import metrics
+from log_writer import log_message
+
+def read_file_timed(file_path):
+    """Extract one file and return (text, seconds spent); text is None if the file cannot be read."""
+    start = time.perf_counter()
+    try:
+        text = read_file_data(file_path)
+    except Exception:
+        text = None
+    return text, time.perf_counter() - start
+
+class ExtractionPipeline:
+    """Read text files in a process pool and yield (file_path, text) as soon as each one is ready.
+
+    At most max_queue_size files are being extracted or waiting to be consumed at
+    any time, so memory stays flat no matter how many files are queued up. Files
+    that cannot be read are logged and skipped. A long-running caller can pass
+    its own executor, which is then shared and left running on close().
+
+    If a worker dies, the files it and its siblings were extracting are reported
+    unreadable. An owned pool is then replaced and extraction continues; with a
+    shared pool the remaining files are reported unreadable too, and the owner is
+    expected to replace the pool.
+    """
+
+    def __init__(self, file_paths, max_workers=None, max_queue_size=None, silent=False, log_file=None, executor=None):
+        self.file_paths = list(file_paths)
+        self.max_workers = config.EXTRACTION_WORKERS if max_workers is None else max_workers
+        if self.max_workers is None:
+            self.max_workers = os.cpu_count() or 1
+        self.max_queue_size = config.EXTRACTION_QUEUE_SIZE if max_queue_size is None else max_queue_size
+        self.silent = silent
+        self.log_file = log_file
+
+        self._ready = queue.Queue()
+        self._slots = threading.Semaphore(self.max_queue_size)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._futures = set()
+        self._producer = None
+
+        # Per-stage depth counters
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.max_ready = 0
+        self.extracted = 0
+        self.unreadable = 0
+        self.producer_wait = 0.0
+        self.consumer_wait = 0.0
+
+    def start(self):
+        """Start extracting in the background; iteration starts it automatically if needed."""
+        if self._producer is not None:
+            return self
+        if self._owns_executor and self.max_workers > 0 and len(self.file_paths) > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._producer = threading.Thread(target=self._produce, daemon=True)
+        self._producer.start()
+        return self
+
+    def _produce(self):
+        """Submit files for extraction, blocking while the pipeline is full."""
+        for file_path in self.file_paths:
+            wait_start = time.perf_counter()
+            self._slots.acquire()
+            self.producer_wait += time.perf_counter() - wait_start
+            if self._stop.is_set():
+                return
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self._executor is None:
+                self._on_extracted(file_path, *read_file_timed(file_path))
+                continue
+            try:
+                future = self._submit(file_path)
+            except Exception as e:
+                # Every file must reach the ready queue, or the consumer waits forever
+                log_message(f"Could not extract {file_path}: {e}", self.silent, self.log_file, level='error')
+                self._on_extracted(file_path, None, 0.0)
+                continue
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(lambda f, fp=file_path: self._on_extracted(fp, *((None, 0.0) if f.cancelled() or f.exception() else f.result()), future=f))
+
+    def _submit(self, file_path):
+        """Submit one file, replacing an owned pool whose workers have died."""
+        try:
+            return self._executor.submit(read_file_timed, file_path)
+        except BrokenProcessPool:
+            if not self._owns_executor:
+                raise
+        log_message("An extraction worker died; starting a new extraction pool", self.silent, self.log_file, level='error')
+        with self._lock:
+            broken, self._executor = self._executor, ProcessPoolExecutor(max_workers=self.max_workers)
+        broken.shutdown(wait=False)
+        return self._executor.submit(read_file_timed, file_path)
+
+    def _on_extracted(self, file_path, text, seconds, future=None):
+        """Move a finished file from the extraction stage to the ready queue."""
+        metrics.observe('extract', seconds)
+        with self._lock:
+            self.in_flight -= 1
+            self._futures.discard(future)
+        self._ready.put((file_path, text))
+        self.max_ready = max(self.max_ready, self._ready.qsize())
+
+    def __iter__(self):
+        self.start()
+        try:
+            for _ in range(len(self.file_paths)):
+                wait_start = time.perf_counter()
+                file_path, text = self._ready.get()
+                self.consumer_wait += time.perf_counter() - wait_start
+                self._slots.release()
+                if text is None:
+                    self.unreadable += 1
+                    metrics.increment('files_unreadable')
+                    message = f"Unsupported or unreadable text file format: {file_path}"
+                    log_message(message, self.silent, self.log_file)
+                    continue
+                self.extracted += 1
+                metrics.increment('files_extracted')
+                metrics.increment('chars_extracted', len(text))
+                yield file_path, text
+        finally:
+            self.close()
+
+    def __len__(self):
+        return len(self.file_paths)
+
+    def close(self):
+        """Stop submitting work and shut the worker pool down."""
+        self._stop.set()
+        # Wake the producer if it is blocked waiting for a free slot
+        self._slots.release()
+        if self._executor is None:
+            return
+        if self._owns_executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        else:
+            # A shared pool keeps running; only this pipeline's queued files are dropped
+            with self._lock:
+                futures = list(self._futures)
+            for future in futures:
+                future.cancel()
+
+    def stats(self):
+        """Return per-stage queue depth and wait-time counters."""
+        return {
+            'files': len(self.file_paths),
+            'extracted': self.extracted,
+            'unreadable': self.unreadable,
+            'extracting': self.in_flight,
+            'max_extracting': self.max_in_flight,
+            'ready': self._ready.qsize(),
+            'max_ready': self.max_ready,
+            'producer_wait_seconds': self.producer_wait,
+            'consumer_wait_seconds': self.consumer_wait,
+        }
+
+    def report(self):
+        """Log a one-line summary of queue depths and stage wait times."""
+        stats = self.stats()
+        message = (f"Extraction pipeline: {stats['extracted']} extracted, {stats['unreadable']} unreadable, "
+                   f"peak extracting {stats['max_extracting']}, peak ready {stats['max_ready']}, "
+                   f"inference waited {stats['consumer_wait_seconds']:.2f}s, "
+                   f"extraction blocked {stats['producer_wait_seconds']:.2f}s")
+        log_message(message, self.silent, self.log_file)
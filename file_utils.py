@@ -1,16 +1,17 @@
+import io
 import os
+import csv
 import re
 import shutil
-from PIL import Image
-import pytesseract
-import fitz  # PyMuPDF
-import docx
-import pandas as pd  # Import pandas to read Excel and CSV files
-from pptx import Presentation  # Import Presentation for PPT files
-
-def read_text_file(file_path):
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+import config
+from data_processing_common import sanitize_filename
+
+def read_text_file(file_path, max_chars=None):
     """Read text content from a text file."""
-    max_chars = 3000  # Limit processing time
+    max_chars = max_chars or config.MAX_EXTRACT_CHARS  # Limit processing time
     try:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
             text = file.read(max_chars)
@@ -19,18 +20,62 @@ def read_text_file(file_path):
         print(f"Error reading text file {file_path}: {e}")
         return None
 
-def read_docx_file(file_path):
-    """Read text content from a .docx or .doc file."""
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+PRESENTATION_NS = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+RELATIONSHIP_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_RELATIONSHIP_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+def _stream_xml_text(stream, paragraph_tag, text_tag, budget, line_break_tags=(), tab_tag=None):
+    """Collect paragraph text from an XML stream until budget characters have been read.
+
+    Elements are parsed incrementally and cleared once handled, so memory use
+    depends on the budget rather than on the size of the part.
+    """
+    paragraphs = []
+    current = []
+    collected = 0
+    for _, elem in ET.iterparse(stream, events=('end',)):
+        tag = elem.tag
+        if tag == text_tag:
+            if elem.text:
+                current.append(elem.text)
+                collected += len(elem.text)
+                if collected >= budget:
+                    break
+        elif tag == tab_tag:
+            current.append('\t')
+        elif tag in line_break_tags:
+            current.append('\n')
+        elif tag == paragraph_tag:
+            paragraphs.append(''.join(current))
+            current = []
+            collected += 1
+            elem.clear()
+            if collected >= budget:
+                break
+    if current:
+        paragraphs.append(''.join(current))
+    return '\n'.join(paragraphs)
+
+def read_docx_file(file_path, max_chars=None):
+    """Read up to max_chars of text from a .docx file by streaming word/document.xml."""
+    max_chars = max_chars or config.MAX_EXTRACT_CHARS
     try:
-        doc = docx.Document(file_path)
-        full_text = [para.text for para in doc.paragraphs]
-        return '\n'.join(full_text)
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open('word/document.xml') as stream:
+                text = _stream_xml_text(
+                    stream, WORD_NS + 'p', WORD_NS + 't', max_chars,
+                    line_break_tags=(WORD_NS + 'br', WORD_NS + 'cr'), tab_tag=WORD_NS + 'tab'
+                )
+        return text[:max_chars]
     except Exception as e:
         print(f"Error reading DOCX file {file_path}: {e}")
         return None
 
 def read_pdf_file(file_path):
     """Read text content from a PDF file."""
+    import fitz  # PyMuPDF
     try:
         doc = fitz.open(file_path)
         # Read only the first few pages to speed up processing
@@ -45,29 +90,196 @@ def read_pdf_file(file_path):
         print(f"Error reading PDF file {file_path}: {e}")
         return None
 
-def read_spreadsheet_file(file_path):
-    """Read text content from an Excel or CSV file."""
+def _summarize_table(name, df, row_count, exact):
+    """Describe a sampled table as its schema, row count and a few sample rows."""
+    if row_count is None:
+        rows = "unknown number of rows"
+    else:
+        rows = f"{'' if exact else 'about '}{row_count} rows"
+    lines = [f"Sheet: {name} ({rows} x {len(df.columns)} columns)"]
+    lines.append("Columns: " + ', '.join(f"{column} ({dtype})" for column, dtype in df.dtypes.items()))
+    if not df.empty:
+        lines.append("Sample rows:")
+        lines.append(df.to_string(index=False, max_colwidth=40))
+    return '\n'.join(lines)
+
+def _read_csv_record(f):
+    """Read one CSV record, which spans several lines when a quoted field contains newlines.
+
+    Returns (record bytes, number of lines); the record is empty at the end of the file.
+    """
+    record = f.readline()
+    lines = 1
+    # An odd number of quotes means a quoted field is still open; escaped quotes come in pairs
+    while record.count(b'"') % 2:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+        lines += 1
+    if record and not record.endswith(b'\n'):
+        record += b'\n'
+    return record, lines
+
+def _is_single_record(line, columns):
+    """Whether line parses as exactly one CSV record with the given number of fields."""
+    if line.count(b'"') % 2:
+        return False
+    rows = list(csv.reader(io.StringIO(line.decode('utf-8', 'replace'))))
+    return len(rows) == 1 and len(rows[0]) == columns
+
+def _sample_csv(file_path, head_rows, strided_rows):
+    """Read the header, the first rows and evenly spaced rows of a CSV without parsing the whole file.
+
+    Records are read whole, so quoted fields spanning several lines stay intact.
+    Strided rows are taken from the line after a seek and are only used when the
+    file has no multi-line records near the top and every sampled line parses as
+    one record; otherwise they are dropped rather than feeding fragments to the
+    model, and the row count is estimated from the head or reported as unknown.
+    """
+    import pandas as pd
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        header, header_lines = _read_csv_record(f)
+        columns = len(next(csv.reader(io.StringIO(header.decode('utf-8', 'replace'))), []))
+        head_records = []
+        multiline = header_lines > 1
+        for _ in range(head_rows):
+            record, lines = _read_csv_record(f)
+            if not record:
+                break
+            head_records.append(record)
+            multiline = multiline or lines > 1
+        head_end = f.tell()
+        exact = head_end >= size
+        sampled_lines = []
+        if not exact and strided_rows and not multiline:
+            # Seek to evenly spaced offsets, skip the partial line and keep the next full one
+            for i in range(1, strided_rows + 1):
+                f.seek(head_end + (size - head_end) * i // (strided_rows + 1))
+                f.readline()
+                line = f.readline()
+                if not line.strip():
+                    continue
+                line = line if line.endswith(b'\n') else line + b'\n'
+                if not _is_single_record(line, columns):
+                    sampled_lines = None
+                    break
+                sampled_lines.append(line)
+
+    row_count = None
+    if sampled_lines:
+        try:
+            df = pd.read_csv(io.BytesIO(header + b''.join(head_records + sampled_lines)), encoding_errors='replace')
+        except (ValueError, pd.errors.ParserError):
+            sampled_lines = None
+        else:
+            # Strided rows come from across the file, so they give a more representative row size
+            average_row_bytes = sum(len(line) for line in sampled_lines) / len(sampled_lines)
+            row_count = int((size - len(header)) / average_row_bytes)
+    if not sampled_lines:
+        df = pd.read_csv(io.BytesIO(header + b''.join(head_records)), encoding_errors='replace')
+        if exact:
+            row_count = len(head_records)
+        elif sampled_lines is not None and head_records:
+            average_row_bytes = (head_end - len(header)) / len(head_records)
+            row_count = int((size - len(header)) / average_row_bytes)
+    return df, row_count, exact
+
+def _sample_xlsx(file_path, head_rows):
+    """Yield (sheet name, sample frame, row count) for each sheet using openpyxl's read-only streaming mode."""
+    import openpyxl
+    import pandas as pd
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
     try:
-        if file_path.lower().endswith('.csv'):
-            df = pd.read_csv(file_path)
+        for sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+            rows = list(sheet.iter_rows(max_row=head_rows + 1, values_only=True))
+            if rows:
+                columns = [str(value) if value is not None else f"column_{i + 1}" for i, value in enumerate(rows[0])]
+                df = pd.DataFrame(rows[1:], columns=columns).infer_objects()
+            else:
+                df = pd.DataFrame()
+            # max_row comes from the sheet dimension record, so it is cheap but may be an estimate
+            row_count = max((sheet.max_row or len(rows)) - 1, 0)
+            yield sheet_name, df, row_count
+    finally:
+        workbook.close()
+
+def read_spreadsheet_file(file_path, max_chars=None):
+    """Read a bounded summary of an Excel or CSV file: schema, row count and sampled rows."""
+    max_chars = max_chars or config.MAX_EXTRACT_CHARS
+    head_rows = config.SPREADSHEET_HEAD_ROWS
+    try:
+        summaries = []
+        lower_path = file_path.lower()
+        if lower_path.endswith('.csv'):
+            df, row_count, exact = _sample_csv(file_path, head_rows, config.SPREADSHEET_STRIDED_ROWS)
+            summaries.append(_summarize_table(os.path.basename(file_path), df, row_count, exact))
+        elif lower_path.endswith('.xlsx'):
+            for sheet_name, df, row_count in _sample_xlsx(file_path, head_rows):
+                summaries.append(_summarize_table(sheet_name, df, row_count, exact=False))
+                if sum(len(summary) for summary in summaries) >= max_chars:
+                    break
         else:
-            df = pd.read_excel(file_path)
-        text = df.to_string()
-        return text
+            import pandas as pd
+            with pd.ExcelFile(file_path) as workbook:
+                for sheet_name in workbook.sheet_names:
+                    df = workbook.parse(sheet_name, nrows=head_rows)
+                    # Legacy .xls workbooks are read by xlrd, which records each sheet's row count
+                    row_count = max(workbook.book.sheet_by_name(sheet_name).nrows - 1, 0)
+                    summaries.append(_summarize_table(sheet_name, df, row_count, exact=True))
+                    if sum(len(summary) for summary in summaries) >= max_chars:
+                        break
+        return '\n\n'.join(summaries)[:max_chars]
     except Exception as e:
         print(f"Error reading spreadsheet file {file_path}: {e}")
         return None
 
-def read_ppt_file(file_path):
-    """Read text content from a PowerPoint file."""
+def _ordered_slide_parts(archive):
+    """Return slide part names in presentation order."""
+    names = set(archive.namelist())
+    try:
+        with archive.open('ppt/_rels/presentation.xml.rels') as stream:
+            rels = ET.parse(stream).getroot()
+        targets = {
+            rel.get('Id'): posixpath.normpath(posixpath.join('ppt', rel.get('Target')))
+            for rel in rels.iter(PACKAGE_RELATIONSHIP_NS + 'Relationship')
+        }
+        with archive.open('ppt/presentation.xml') as stream:
+            presentation = ET.parse(stream).getroot()
+        ordered = []
+        for slide_id in presentation.iter(PRESENTATION_NS + 'sldId'):
+            part = targets.get(slide_id.get(RELATIONSHIP_NS + 'id'))
+            if part in names:
+                ordered.append(part)
+        if ordered:
+            return ordered
+    except (KeyError, ET.ParseError):
+        pass
+    # Fall back to the numeric order of the slide part names
+    slides = [name for name in names if re.match(r'ppt/slides/slide\d+\.xml$', name)]
+    return sorted(slides, key=lambda name: int(re.search(r'(\d+)\.xml$', name).group(1)))
+
+def read_ppt_file(file_path, max_chars=None):
+    """Read up to max_chars of text from a .pptx file by streaming the slide XML parts."""
+    max_chars = max_chars or config.MAX_EXTRACT_CHARS
     try:
-        prs = Presentation(file_path)
         full_text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    full_text.append(shape.text)
-        return '\n'.join(full_text)
+        remaining = max_chars
+        with zipfile.ZipFile(file_path) as archive:
+            for part in _ordered_slide_parts(archive):
+                with archive.open(part) as stream:
+                    slide_text = _stream_xml_text(
+                        stream, DRAWING_NS + 'p', DRAWING_NS + 't', remaining,
+                        line_break_tags=(DRAWING_NS + 'br',)
+                    )
+                if slide_text.strip():
+                    full_text.append(slide_text)
+                    remaining -= len(slide_text) + 1
+                if remaining <= 0:
+                    break
+        return '\n'.join(full_text)[:max_chars]
     except Exception as e:
         print(f"Error reading PowerPoint file {file_path}: {e}")
         return None
@@ -88,6 +300,22 @@ def read_file_data(file_path):
     else:
         return None  # Unsupported file type
 
+def get_new_filename(summary, file_path):
+    """Derive a folder category and a new filename from a free-form model summary."""
+    category_match = re.search(r'category\W*[:\-]\s*(.+)', summary, flags=re.IGNORECASE)
+    filename_match = re.search(r'file\s*name\W*[:\-]\s*(.+)', summary, flags=re.IGNORECASE)
+    if category_match:
+        category = sanitize_filename(category_match.group(1), max_words=2)
+    else:
+        category = sanitize_filename(summary, max_words=2)
+    if filename_match:
+        new_filename = sanitize_filename(filename_match.group(1), max_words=3)
+    else:
+        new_filename = sanitize_filename(summary, max_words=3)
+    if new_filename == 'untitled':
+        new_filename = sanitize_filename(os.path.basename(file_path), max_words=3)
+    return category, new_filename
+
 def display_directory_tree(path):
     """Display the directory tree in a format similar to the 'tree' command, including the full path."""
     def tree(dir_path, prefix=''):
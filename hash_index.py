@@ -0,0 +1,180 @@
+import os
+import stat
+import sqlite3
+import threading
+import config
+from metrics import metrics
+from duplicate_finder import partial_hash, full_hash, PARTIAL_BLOCK_SIZE
+
+class HashIndex:
+    """Persistent index of file digests keyed by (dev, inode, size, mtime_ns).
+
+    A stored digest is reused while the file's size and modification time are
+    unchanged, so repeated duplicate scans only hash files that changed. The
+    index also records the size of every scanned file, which lets watch mode
+    check a newly arrived file for duplicates with a single lookup.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.HASH_INDEX_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS hashes ('
+            'dev INTEGER NOT NULL, '
+            'inode INTEGER NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'mtime_ns INTEGER NOT NULL, '
+            'path TEXT NOT NULL, '
+            'partial TEXT, '
+            'full TEXT, '
+            'scan_id INTEGER NOT NULL DEFAULT 0, '
+            'PRIMARY KEY (dev, inode))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS hashes_size ON hashes (size)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS hashes_path ON hashes (path)')
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def begin_scan(self):
+        """Start a scan; files recorded during it are tagged so vanished ones can be pruned afterwards."""
+        with self._lock:
+            row = self._conn.execute('SELECT COALESCE(MAX(scan_id), 0) FROM hashes').fetchone()
+        return row[0] + 1
+
+    def _upsert(self, path, st, scan_id=None):
+        """Insert or refresh a row, clearing stored digests if the file changed since they were computed."""
+        scan_update = ', scan_id = excluded.scan_id' if scan_id is not None else ''
+        self._conn.execute(
+            'INSERT INTO hashes (dev, inode, size, mtime_ns, path, scan_id) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (dev, inode) DO UPDATE SET '
+            'partial = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns THEN partial END, '
+            'full = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns THEN full END, '
+            'size = excluded.size, mtime_ns = excluded.mtime_ns, path = excluded.path' + scan_update,
+            (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, os.path.abspath(path), scan_id or 0)
+        )
+
+    def record(self, path, st, scan_id=None):
+        """Record a file's identity, tagging it with scan_id when called during a scan."""
+        with self._lock:
+            self._upsert(path, st, scan_id)
+
+    def finish_scan(self, directory, scan_id):
+        """Drop entries under directory that were not seen by the scan and commit."""
+        prefix = os.path.join(os.path.abspath(directory), '')
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM hashes WHERE scan_id != ? AND substr(path, 1, ?) = ?",
+                (scan_id, len(prefix), prefix)
+            )
+            self._conn.commit()
+
+    def _cached_digest(self, column, st):
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {column} FROM hashes WHERE dev = ? AND inode = ? AND size = ? AND mtime_ns = ?',
+                (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+            ).fetchone()
+        if row is not None and row[0] is not None:
+            self.hits += 1
+            metrics.increment('cache_hits', cache='hash_index')
+            return row[0]
+        self.misses += 1
+        metrics.increment('cache_misses', cache='hash_index')
+        return None
+
+    def _store_digest(self, column, path, st, digest):
+        with self._lock:
+            self._upsert(path, st)
+            self._conn.execute(
+                f'UPDATE hashes SET {column} = ? WHERE dev = ? AND inode = ?',
+                (digest, st.st_dev, st.st_ino)
+            )
+
+    def partial_hash(self, path, st, scan_stats=None):
+        """Return the partial digest of a file, computing and storing it only if the file changed."""
+        digest = self._cached_digest('partial', st)
+        if digest is None:
+            digest = partial_hash(path, st.st_size, scan_stats)
+            self._store_digest('partial', path, st, digest)
+        return digest
+
+    def full_hash(self, path, st, scan_stats=None):
+        """Return the full digest of a file, computing and storing it only if the file changed."""
+        if st.st_size <= 2 * PARTIAL_BLOCK_SIZE:
+            # The partial digest already covers the whole file
+            return self.partial_hash(path, st, scan_stats)
+        digest = self._cached_digest('full', st)
+        if digest is None:
+            digest = full_hash(path, scan_stats)
+            self._store_digest('full', path, st, digest)
+        return digest
+
+    def update_path(self, path):
+        """Record a new or modified file, e.g. from a watch-mode event. Returns its stat result or None."""
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        self.record(path, st)
+        self.commit()
+        return st
+
+    def remove_path(self, path):
+        """Forget a file that was deleted or moved away."""
+        with self._lock:
+            self._conn.execute('DELETE FROM hashes WHERE path = ?', (os.path.abspath(path),))
+            self._conn.commit()
+
+    def find_duplicates_of(self, path):
+        """Return the indexed files with the same content as path, without scanning any directory."""
+        st = self.update_path(path)
+        if st is None:
+            return []
+        with self._lock:
+            candidates = self._conn.execute(
+                'SELECT path FROM hashes WHERE size = ? AND NOT (dev = ? AND inode = ?)',
+                (st.st_size, st.st_dev, st.st_ino)
+            ).fetchall()
+        if not candidates:
+            return []
+
+        try:
+            digest = self.partial_hash(path, st)
+        except (IOError, OSError):
+            return []
+        matches = []
+        full_digest = None
+        for (candidate,) in candidates:
+            try:
+                candidate_st = os.lstat(candidate)
+                if candidate_st.st_size != st.st_size:
+                    self.record(candidate, candidate_st)
+                    continue
+                if self.partial_hash(candidate, candidate_st) != digest:
+                    continue
+                if full_digest is None:
+                    full_digest = self.full_hash(path, st)
+                if self.full_hash(candidate, candidate_st) == full_digest:
+                    matches.append(candidate)
+            except (IOError, OSError):
+                self.remove_path(candidate)
+        self.commit()
+        return matches
+
+    def commit(self):
+        """Write pending changes to disk."""
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        """Commit and close the index."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
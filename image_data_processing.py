@@ -2,11 +2,14 @@ import re
 import os
 import time
 import pathlib # Added for file URI
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from rich.progress import Progress, TextColumn, BarColumn, TimeElapsedColumn
-from data_processing_common import sanitize_filename  # Import sanitize_filename
+import config
+from data_processing_common import parse_metadata_json, METADATA_JSON_SCHEMA
+from text_normalization import IMAGE_NORMALIZER
+from metadata_cache import get_model_name
+from metrics import metrics
+from log_writer import log_message
+from image_preprocessing import preprocess_images
 
 # def get_text_from_generator(generator):
 #     """Extract text from the generator response."""
@@ -23,29 +26,52 @@ from data_processing_common import sanitize_filename  # Import sanitize_filename
 #         pass
 #     return response_text
 
-def process_single_image(image_path, image_inference, text_inference, silent=False, log_file=None):
-    """Process a single image file to generate metadata."""
+def process_single_image(image_path, image_inference, text_inference, silent=False, log_file=None, cache=None, prepared_path=None):
+    """Process a single image file to generate metadata, sending the model prepared_path if given."""
     start_time = time.time()
 
-    # Create a Progress instance for this file
-    with Progress(
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TimeElapsedColumn()
-    ) as progress:
-        task_id = progress.add_task(f"Processing {os.path.basename(image_path)}", total=1.0)
-        foldername, filename, description = generate_image_metadata(image_path, progress, task_id, image_inference, text_inference)
-    
+    structured = config.STRUCTURED_OUTPUT
+    method = 'structured' if structured else 'three-step'
+
+    # Reuse metadata generated for identical content on a previous run
+    cache_key = None
+    cached = None
+    if cache is not None:
+        model_name = f"{get_model_name(image_inference)}+{get_model_name(text_inference)}"
+        task = 'image-json' if structured else 'image'
+        cache_key = cache.make_key(image_path, 'gguf', model_name, task)
+        cached = cache.get(cache_key)
+
+    if cached is not None:
+        foldername, filename, description = cached['foldername'], cached['filename'], cached['description']
+        method = 'cached'
+    else:
+        # Create a Progress instance for this file
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TimeElapsedColumn()
+        ) as progress:
+            task_id = progress.add_task(f"Processing {os.path.basename(image_path)}", total=1.0)
+            result = None
+            if structured:
+                result = generate_image_metadata_structured(image_path, progress, task_id, image_inference, prepared_path)
+                if result is None:
+                    # The JSON response could not be parsed; fall back to one call per field
+                    method = 'three-step fallback'
+                    progress.update(task_id, completed=0)
+            if result is None:
+                result = generate_image_metadata(image_path, progress, task_id, image_inference, text_inference, prepared_path)
+            foldername, filename, description = result
+        if cache is not None:
+            cache.put(cache_key, description, foldername, filename)
+
     end_time = time.time()
     time_taken = end_time - start_time
 
-    message = f"File: {image_path}\nTime taken: {time_taken:.2f} seconds\nDescription: {description}\nFolder name: {foldername}\nGenerated filename: {filename}\n"
-    if silent:
-        if log_file:
-            with open(log_file, 'a') as f:
-                f.write(message + '\n')
-    else:
-        print(message)
+    message = f"File: {image_path}\nTime taken: {time_taken:.2f} seconds ({method})\nDescription: {description}\nFolder name: {foldername}\nGenerated filename: {filename}\n"
+    log_message(message, silent, log_file, file_path=image_path, seconds=round(time_taken, 3), method=method,
+                description=description, foldername=foldername, filename=filename)
     return {
         'file_path': image_path,
         'foldername': foldername,
@@ -53,15 +79,64 @@ def process_single_image(image_path, image_inference, text_inference, silent=Fal
         'description': description
     }
 
-def process_image_files(image_paths, image_inference, text_inference, silent=False, log_file=None):
-    """Process image files sequentially."""
+def process_image_files(image_paths, image_inference, text_inference, silent=False, log_file=None, cache=None, on_result=None):
+    """Process image files sequentially while the next images are downscaled in the background.
+
+    on_result(data) is called as soon as each image has been described.
+    """
     data_list = []
-    for image_path in image_paths:
-        data = process_single_image(image_path, image_inference, text_inference, silent=silent, log_file=log_file)
+    for image_path, prepared_path in preprocess_images(image_paths):
+        data = process_single_image(image_path, image_inference, text_inference, silent=silent, log_file=log_file, cache=cache, prepared_path=prepared_path)
         data_list.append(data)
+        if on_result is not None:
+            on_result(data)
     return data_list
 
-def generate_image_metadata(image_path, progress, task_id, image_inference, text_inference):
+def generate_image_metadata_structured(image_path, progress, task_id, image_inference, prepared_path=None):
+    """Generate description, folder name, and filename for an image file with a single JSON completion.
+
+    Returns None if the response cannot be parsed, so the caller can fall back to generate_image_metadata.
+    """
+    prompt = """Describe this image and respond with a JSON object with these keys:
+"description": a detailed description of the image, focusing on the main subject and any important details.
+"filename": a specific and descriptive filename of at most 3 words. Use nouns, avoid starting with verbs like 'depicts', 'shows', 'presents', and do not include data type words like 'image', 'jpg', 'png'. Connect words with underscores.
+"category": a general category or theme of at most 2 words that best represents the main subject, used as the folder name. Use nouns and avoid generic terms like 'untitled' or 'unknown'.
+
+Example:
+{"description": "A photo of a sunset over the mountains.", "filename": "sunset_over_mountains", "category": "landscapes"}"""
+
+    image_uri = pathlib.Path(prepared_path or image_path).as_uri()
+    messages = [
+        {"role": "system", "content": "You are an assistant who describes images."},
+        {
+            "role": "user",
+            "content": [
+                {"type": "image_url", "image_url": {"url": image_uri}},
+                {"type": "text", "text": prompt}
+            ]
+        }
+    ]
+    with metrics.span('llm_call', model=get_model_name(image_inference)) as span:
+        response = image_inference.create_chat_completion(
+            messages=messages,
+            response_format={"type": "json_object", "schema": METADATA_JSON_SCHEMA},
+            temperature=0.3,
+            max_tokens=512,
+            top_k=3,
+            top_p=0.2
+        )
+        span.record_usage(response)
+    progress.update(task_id, advance=1.0)
+    try:
+        content = response['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError):
+        return None
+    parsed = parse_metadata_json(content)
+    if parsed is None:
+        return None
+    return finalize_image_metadata(parsed['filename'], parsed['category'], parsed['description'], image_path)
+
+def generate_image_metadata(image_path, progress, task_id, image_inference, text_inference, prepared_path=None):
     """Generate description, folder name, and filename for an image file."""
 
     # Total steps in processing an image
@@ -71,7 +146,7 @@ def generate_image_metadata(image_path, progress, task_id, image_inference, text
     description_prompt = "Please provide a detailed description of this image, focusing on the main subject and any important details."
 
     # Convert image_path to a file:// URI
-    image_uri = pathlib.Path(image_path).as_uri()
+    image_uri = pathlib.Path(prepared_path or image_path).as_uri()
 
     # Create the messages list for create_chat_completion
     messages = [
@@ -86,14 +161,16 @@ def generate_image_metadata(image_path, progress, task_id, image_inference, text
     ]
 
     # Call image_inference.create_chat_completion
-    response = image_inference.create_chat_completion(
-        messages=messages,
-        temperature=0.3,
-        max_tokens=3000,
-        top_k=3,
-        top_p=0.2,
-        stop=[]
-    )
+    with metrics.span('llm_call', model=get_model_name(image_inference)) as span:
+        response = image_inference.create_chat_completion(
+            messages=messages,
+            temperature=0.3,
+            max_tokens=3000,
+            top_k=3,
+            top_p=0.2,
+            stop=[]
+        )
+        span.record_usage(response)
     description = response['choices'][0]['message']['content'].strip()
     progress.update(task_id, advance=1 / total_steps)
 
@@ -113,7 +190,9 @@ Now generate the filename.
 Output only the filename, without any additional text.
 
 Filename:"""
-    filename_response = text_inference.create_completion(filename_prompt)
+    with metrics.span('llm_call', model=get_model_name(text_inference)) as span:
+        filename_response = text_inference.create_completion(filename_prompt)
+        span.record_usage(filename_response)
     if filename_response['choices'] and filename_response['choices'][0]['text']:
         filename = filename_response['choices'][0]['text'].strip()
     else:
@@ -144,7 +223,9 @@ Now generate the category.
 Output only the category, without any additional text.
 
 Category:"""
-    foldername_response = text_inference.create_completion(foldername_prompt)
+    with metrics.span('llm_call', model=get_model_name(text_inference)) as span:
+        foldername_response = text_inference.create_completion(foldername_prompt)
+        span.record_usage(foldername_response)
     if foldername_response['choices'] and foldername_response['choices'][0]['text']:
         foldername = foldername_response['choices'][0]['text'].strip()
     else:
@@ -153,61 +234,9 @@ Category:"""
     foldername = re.sub(r'^Category:\s*', '', foldername, flags=re.IGNORECASE).strip()
     progress.update(task_id, advance=1 / total_steps)
 
-    # Remove any unwanted words and stopwords
-    unwanted_words = set([
-        'the', 'and', 'based', 'generated', 'this', 'is', 'filename', 'file', 'image', 'picture', 'photo',
-        'folder', 'category', 'output', 'only', 'below', 'text', 'jpg', 'png', 'jpeg', 'gif', 'bmp', 'svg',
-        'logo', 'in', 'on', 'of', 'with', 'by', 'for', 'to', 'from', 'a', 'an', 'as', 'at', 'red', 'blue',
-        'green', 'color', 'colors', 'colored', 'text', 'graphic', 'graphics', 'main', 'subject', 'important',
-        'details', 'description', 'depicts', 'show', 'shows', 'display', 'illustrates', 'presents', 'features',
-        'provides', 'covers', 'includes', 'demonstrates', 'describes'
-    ])
-    stop_words = set(stopwords.words('english'))
-    all_unwanted_words = unwanted_words.union(stop_words)
-    lemmatizer = WordNetLemmatizer()
-
-    # Function to clean and process the AI output
-    def clean_ai_output(text, max_words):
-        # Remove file extensions and special characters
-        text = re.sub(r'\.\w{1,4}$', '', text)  # Remove file extensions like .jpg, .png
-        text = re.sub(r'[^\w\s]', ' ', text)  # Remove special characters
-        text = re.sub(r'\d+', '', text)  # Remove digits
-        text = text.strip()
-        # Split concatenated words (e.g., 'GoogleChrome' -> 'Google Chrome')
-        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
-        # Tokenize and lemmatize words
-        words = word_tokenize(text)
-        words = [word.lower() for word in words if word.isalpha()]
-        words = [lemmatizer.lemmatize(word) for word in words]
-        # Remove unwanted words and duplicates
-        filtered_words = []
-        seen = set()
-        for word in words:
-            if word not in all_unwanted_words and word not in seen:
-                filtered_words.append(word)
-                seen.add(word)
-        # Limit to max words
-        filtered_words = filtered_words[:max_words]
-        return '_'.join(filtered_words)
-
-    # Process filename
-    filename = clean_ai_output(filename, max_words=3)
-    if not filename or filename.lower() in ('untitled', ''):
-        # Use keywords from the description
-        filename = clean_ai_output(description, max_words=3)
-    if not filename:
-        filename = 'image_' + os.path.splitext(os.path.basename(image_path))[0]
-
-    sanitized_filename = sanitize_filename(filename, max_words=3)
-
-    # Process foldername
-    foldername = clean_ai_output(foldername, max_words=2)
-    if not foldername or foldername.lower() in ('untitled', ''):
-        # Attempt to extract keywords from the description
-        foldername = clean_ai_output(description, max_words=2)
-        if not foldername:
-            foldername = 'images'
-
-    sanitized_foldername = sanitize_filename(foldername, max_words=2)
-
-    return sanitized_foldername, sanitized_filename, description
+    return finalize_image_metadata(filename, foldername, description, image_path)
+
+@metrics.timed('sanitize')
+def finalize_image_metadata(filename, foldername, description, image_path):
+    """Clean raw model output into a sanitized folder name and filename."""
+    return IMAGE_NORMALIZER.finalize(filename, foldername, description, image_path)
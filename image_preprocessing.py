@@ -0,0 +1,160 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+import config
+from metadata_cache import hash_file_content
+
+# Bytes in each thumbnail cache directory as this process last knew them; scanned once, then kept up to date
+_cache_bytes = {}
+_cache_bytes_lock = threading.Lock()
+
+def thumbnail_path(image_path, max_side, quality, cache_dir):
+    """Return where the prepared copy of an image is cached, keyed by its content and the output settings."""
+    digest = hash_file_content(image_path)
+    if digest is None:
+        return None
+    return os.path.join(cache_dir, digest[:2], f"{digest}-{max_side}-q{quality}.jpg")
+
+def prepare_image(image_path, max_side=None, quality=None, cache_dir=None):
+    """
+    Decode an image, apply its EXIF orientation, shrink it to fit within max_side
+    pixels and save it as a compact JPEG in the thumbnail cache. Returns the path of
+    the prepared copy, or the original path if the image cannot be prepared.
+    """
+    return _prepare_image(image_path, max_side, quality, cache_dir)[0]
+
+def _prepare_image(image_path, max_side=None, quality=None, cache_dir=None):
+    """prepare_image, also returning the number of bytes it added to the thumbnail cache."""
+    max_side = max_side or config.IMAGE_MAX_SIDE
+    quality = quality or config.IMAGE_JPEG_QUALITY
+    cache_dir = cache_dir or config.THUMBNAIL_CACHE_DIR
+    try:
+        target = thumbnail_path(image_path, max_side, quality, cache_dir)
+        if target is None:
+            return image_path, 0
+        if os.path.exists(target):
+            # Refresh the mtime so pruning treats the thumbnail as recently used
+            os.utime(target)
+            return target, 0
+
+        with Image.open(image_path) as img:
+            # Let the JPEG decoder downscale while decoding instead of producing full-size pixels
+            img.draft('RGB', (max_side, max_side))
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+                rgba = img.convert('RGBA')
+                img = Image.new('RGB', rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel('A'))
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Write to a temporary file first so concurrent workers never see a partial thumbnail
+            fd, temp_path = tempfile.mkstemp(prefix='.', suffix='.jpg', dir=os.path.dirname(target))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    img.save(f, 'JPEG', quality=quality, optimize=True)
+                    written = f.tell()
+                os.replace(temp_path, target)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        return target, written
+    except Exception:
+        return image_path, 0
+
+def _scan_cache(cache_dir):
+    """Return (total bytes, [(mtime_ns, size, path)]) for the thumbnails in cache_dir."""
+    entries = []
+    total = 0
+    for directory, _, names in os.walk(cache_dir):
+        for name in names:
+            # Temporary files of thumbnails still being written start with a dot
+            if name.startswith('.'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+            total += st.st_size
+    return total, entries
+
+def prune_thumbnail_cache(cache_dir=None, max_bytes=None):
+    """
+    Remove the least recently used thumbnails, oldest mtime first, until the cache
+    fits within max_bytes. Returns the number of bytes removed.
+    """
+    cache_dir = cache_dir or config.THUMBNAIL_CACHE_DIR
+    max_bytes = config.THUMBNAIL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total, entries = _scan_cache(cache_dir)
+    removed = 0
+    if total > max_bytes:
+        entries.sort()
+        for _, size, path in entries:
+            if total - removed <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            removed += size
+    with _cache_bytes_lock:
+        _cache_bytes[cache_dir] = total - removed
+    return removed
+
+def _account_thumbnails(written, cache_dir=None):
+    """
+    Add newly written thumbnail bytes to the running total of the cache and prune
+    it once the total passes THUMBNAIL_CACHE_MAX_BYTES. The cache directory is only
+    scanned the first time in a process and when it is pruned, not for every batch.
+    """
+    cache_dir = cache_dir or config.THUMBNAIL_CACHE_DIR
+    max_bytes = config.THUMBNAIL_CACHE_MAX_BYTES
+    if max_bytes is None:
+        return
+    with _cache_bytes_lock:
+        known = _cache_bytes.get(cache_dir)
+        if known is not None:
+            known += written
+            _cache_bytes[cache_dir] = known
+    if known is None:
+        # First batch in this process; the scan includes what it just wrote
+        known, _ = _scan_cache(cache_dir)
+        with _cache_bytes_lock:
+            _cache_bytes[cache_dir] = known
+    if known > max_bytes:
+        prune_thumbnail_cache(cache_dir, max_bytes)
+
+def preprocess_images(image_paths, max_workers=None):
+    """
+    Yield (image_path, prepared_path) in input order. Images are prepared on a process
+    pool, so later images are decoded and resized while earlier ones are in inference.
+    When preprocessing is disabled, prepared_path is the original path. The thumbnail
+    cache is pruned once the bytes written to it pass THUMBNAIL_CACHE_MAX_BYTES.
+    """
+    image_paths = list(image_paths)
+    if not config.IMAGE_PREPROCESSING:
+        for image_path in image_paths:
+            yield image_path, image_path
+        return
+    written = 0
+    try:
+        if len(image_paths) < 2:
+            for image_path in image_paths:
+                prepared_path, size = _prepare_image(image_path)
+                written += size
+                yield image_path, prepared_path
+            return
+        max_workers = max_workers or config.IMAGE_PREPROCESS_WORKERS
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for image_path, (prepared_path, size) in zip(image_paths, executor.map(_prepare_image, image_paths)):
+                written += size
+                yield image_path, prepared_path
+    finally:
+        if image_paths:
+            _account_thumbnails(written)
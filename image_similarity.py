@@ -0,0 +1,138 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+import config
+from file_utils import collect_file_paths, separate_files_by_type
+from duplicate_finder import DisjointSet
+
+def _load_grayscale(image_path, size):
+    """Decode an image as grayscale, letting JPEG decoders downscale while decoding."""
+    with Image.open(image_path) as img:
+        img.draft('L', (size[0] * 4, size[1] * 4))
+        return np.asarray(img.convert('L').resize(size, Image.Resampling.BILINEAR), dtype=np.float32)
+
+def _bits_to_int(bits):
+    """Pack a boolean array into an integer, most significant bit first."""
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+def dhash(image_path, hash_size=8):
+    """Difference hash: compares horizontally adjacent pixels of a downscaled grayscale image."""
+    pixels = _load_grayscale(image_path, (hash_size + 1, hash_size))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+_dct_matrices = {}
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II matrix of size n x n."""
+    if n not in _dct_matrices:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+        matrix[0] /= np.sqrt(2.0)
+        _dct_matrices[n] = matrix
+    return _dct_matrices[n]
+
+def phash(image_path, hash_size=8, highfreq_factor=4):
+    """Perceptual hash: compares low-frequency DCT coefficients with their median."""
+    size = hash_size * highfreq_factor
+    pixels = _load_grayscale(image_path, (size, size))
+    matrix = _dct_matrix(size)
+    coefficients = matrix @ pixels @ matrix.T
+    low = coefficients[:hash_size, :hash_size]
+    # The DC term only reflects overall brightness, so leave it out of the median
+    median = np.median(low.ravel()[1:])
+    return _bits_to_int(low > median)
+
+HASH_FUNCTIONS = {'dhash': dhash, 'phash': phash}
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes for Hamming-radius queries."""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        """Insert a hash together with the item it belongs to."""
+        node = [value, [item], {}]
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming_distance(value, current[0])
+            if distance == 0:
+                current[1].append(item)
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, radius):
+        """Return (distance, item) pairs for every stored hash within radius of value."""
+        results = []
+        if self.root is None:
+            return results
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= radius:
+                results.extend((distance, item) for item in items)
+            # Triangle inequality: only subtrees at distance d with |d - distance| <= radius can match
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return results
+
+def _hash_image(args):
+    image_path, method, hash_size = args
+    try:
+        return image_path, HASH_FUNCTIONS[method](image_path, hash_size)
+    except Exception:
+        return image_path, None
+
+def compute_image_hashes(image_paths, method='dhash', hash_size=None, max_workers=None):
+    """Hash images on a process pool and return {path: hash}, skipping unreadable images."""
+    hash_size = hash_size or config.IMAGE_HASH_SIZE
+    tasks = [(path, method, hash_size) for path in image_paths]
+    hashes = {}
+    if len(tasks) < 2:
+        for path, value in map(_hash_image, tasks):
+            if value is not None:
+                hashes[path] = value
+        return hashes
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for path, value in executor.map(_hash_image, tasks, chunksize=32):
+            if value is not None:
+                hashes[path] = value
+    return hashes
+
+def find_similar_images(directory, max_distance=None, method='dhash', max_workers=None):
+    """
+    Finds groups of visually similar images (re-encoded, resized or re-saved copies)
+    by perceptual hash. Each image is looked up in a BK-tree of the images before it,
+    so the search stays well below quadratic for small distances.
+    """
+    max_distance = config.IMAGE_SIMILARITY_MAX_DISTANCE if max_distance is None else max_distance
+    image_paths, _ = separate_files_by_type(collect_file_paths(directory))
+    hashes = compute_image_hashes(image_paths, method=method, max_workers=max_workers)
+
+    # Merge images linked by a near match; hashes keeps the walk order for each group
+    clusters = DisjointSet(hashes)
+    tree = BKTree()
+    for path, value in hashes.items():
+        for _, other in tree.search(value, max_distance):
+            clusters.union(path, other)
+        tree.add(value, path)
+    return clusters.groups()
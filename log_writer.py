@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from datetime import datetime, timezone
+import config
+
+_STOP = object()
+
+class LogWriter:
+    """Appends JSON-lines records to one log file from a single background thread.
+
+    Callers only append a record to a queue; every flush_interval seconds the
+    writer thread drains everything that has queued up, writes it and flushes,
+    so a busy run costs a few writes per interval instead of an open/write/close
+    per message. The file is rotated to
+    path.1, path.2, ... once it grows past max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=None, backup_count=None, queue_size=None, flush_interval=None):
+        self.path = path
+        self.max_bytes = config.LOG_MAX_BYTES if max_bytes is None else max_bytes
+        self.backup_count = config.LOG_BACKUP_COUNT if backup_count is None else backup_count
+        self.queue_size = config.LOG_QUEUE_SIZE if queue_size is None else queue_size
+        self.flush_interval = config.LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.pid = os.getpid()
+        self.dropped = 0
+        # deque.append is atomic, so callers never take a lock; the writer drains it in batches
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._file = None
+        self._size = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        if self._closed:
+            self.dropped += 1
+            return
+        self._pending.append(record)
+        if len(self._pending) >= self.queue_size:
+            # Writer is falling behind; wait for it rather than growing memory without limit
+            self.flush()
+
+    def flush(self, timeout=None):
+        """Block until every record queued so far is on disk."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._pending.append(done)
+        self._wakeup.set()
+        done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Write out queued records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.append(_STOP)
+        self._wakeup.set()
+        self._thread.join(timeout)
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                older = f"{self.path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write_lines(self, lines):
+        if self._file is None:
+            self._open()
+        for line in lines:
+            if self.max_bytes and self._size and self._size + len(line) > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._size += len(line)
+        self._file.flush()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            lines = []
+            waiters = []
+            stop = False
+            while self._pending:
+                item = self._pending.popleft()
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    lines.append(_format_record(item))
+            if lines:
+                try:
+                    self._write_lines(lines)
+                except OSError:
+                    self.dropped += len(lines)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                return
+
+def _format_record(record):
+    record = dict(record)
+    record['time'] = datetime.fromtimestamp(record['time'], timezone.utc).isoformat(timespec='milliseconds')
+    return (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+_writers = {}  # path as given and absolute path -> LogWriter
+_writers_lock = threading.Lock()
+_pid = os.getpid()
+
+def _after_fork():
+    global _pid
+    _pid = os.getpid()
+
+os.register_at_fork(after_in_child=_after_fork)
+
+def get_log_writer(path):
+    """Return the shared writer for a log file, starting it on first use."""
+    writer = _writers.get(path)
+    if writer is not None and writer.pid == _pid:
+        return writer
+    with _writers_lock:
+        writer = _writers.get(path)
+        # A forked worker inherits the parent's writer without its thread; give it its own
+        if writer is None or writer.pid != os.getpid():
+            # Spellings of the same file share one writer so records are never interleaved
+            key = os.path.abspath(path)
+            writer = _writers.get(key)
+            if writer is None or writer.pid != os.getpid():
+                writer = LogWriter(path)
+                _writers[key] = writer
+            _writers[path] = writer
+        return writer
+
+def log_message(message, silent=False, log_file=None, level='info', **fields):
+    """Print a message, or in silent mode append it to log_file as a JSON record with any extra fields."""
+    if not silent:
+        print(message)
+        return
+    if log_file:
+        get_log_writer(log_file).write({'time': time.time(), 'level': level, 'message': message, **fields})
+
+def flush_logs(timeout=None):
+    """Block until every queued record of every log file is on disk."""
+    for writer in set(_writers.values()):
+        if writer.pid == os.getpid():
+            writer.flush(timeout)
+
+def close_logs(timeout=5.0):
+    """Write out all queued records and stop the writer threads; runs automatically at exit."""
+    with _writers_lock:
+        writers = {writer for writer in _writers.values() if writer.pid == os.getpid()}
+        _writers.clear()
+    for writer in writers:
+        writer.close(timeout)
+
+atexit.register(close_logs)
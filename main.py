@@ -4,80 +4,73 @@ import config
 from file_utils import (
     display_directory_tree,
     collect_file_paths,
+    separate_files_by_type,
 )
 from data_processing_common import (
     execute_operations,
     process_files_by_date,
     process_files_by_type,
 )
-from text_data_processing import process_text_files
-from image_data_processing import process_image_files
-from ollama_data_processing import process_text_files_ollama, process_image_files_ollama
-from output_filter import filter_specific_output
-from llama_cpp import Llama
-from llama_cpp.llama_chat_format import Llava15ChatHandler
+from model_manager import ModelManager
 from ui import (
     get_yes_no, get_mode_selection, get_paths, print_simulated_tree,
-    get_backend_selection, get_main_menu_selection, display_duplicates,
-    get_duplicate_handling_choice, get_individual_duplicate_action
+    get_main_menu_selection, get_ai_backend_selection, display_duplicates,
+    get_duplicate_handling_choice, get_individual_duplicate_action, get_directory_path
 )
-from watch_mode import start_watching
 from duplicate_finder import find_duplicates
+from hash_index import HashIndex
 from duplicate_handler import (
     handle_duplicates_delete_all, handle_duplicates_move_all,
     handle_individual_duplicate
 )
-from output_filter import filter_specific_output
-from llama_cpp import Llama
-from llama_cpp.llama_chat_format import Llava15ChatHandler
-from ui import get_yes_no, get_mode_selection, get_paths, print_simulated_tree, get_main_menu_selection, get_ai_backend_selection
-from organize_files import organize_files_with_ai
-from ollama import Client
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from metadata_cache import get_metadata_cache
+from extraction_pipeline import ExtractionPipeline
+from manifest import FileManifest, remove_previous_outputs
+from name_index import NameIndex
+from run_journal import RunJournal
+from metrics import metrics
+from log_writer import log_message, close_logs
 
-def ensure_nltk_data():
-    """Ensure that NLTK data is downloaded efficiently and quietly."""
-    import nltk
-    nltk.download('stopwords', quiet=True)
-    nltk.download('punkt', quiet=True)
-    nltk.download('wordnet', quiet=True)
+# NLTK data used to clean model output, by name and path in the NLTK data directories
+NLTK_RESOURCES = {'stopwords': 'corpora/stopwords', 'wordnet': 'corpora/wordnet'}
 
-# Initialize models
-image_inference = None
-text_inference = None
+def ensure_nltk_data(silent_mode=False, log_file=None):
+    """Check the local NLTK data directories for the data used to clean model output.
 
-def initialize_local_models():
-    """Initialize the local GGUF models if they haven't been initialized yet."""
-    global image_inference, text_inference
+    Nothing touches the network unless data is missing and config.NLTK_DOWNLOAD_MISSING
+    is set. Returns the names of resources that are still missing.
+    """
+    import nltk
+    missing = []
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    if missing and config.NLTK_DOWNLOAD_MISSING:
+        missing = [name for name in missing if not nltk.download(name, quiet=True)]
+    if missing:
+        message = (f"Missing NLTK data: {', '.join(missing)}. Names are cleaned without stopword removal or "
+                   f"lemmatization until it is installed with: python -m nltk.downloader {' '.join(missing)}")
+        log_message(message, silent_mode, log_file, level='warning')
+    return missing
 
-    if image_inference is None or text_inference is None:
-        model_path = "llava-v1.6-vicuna-7b:q4_0"
-        model_path_text = "Llama3.2-3B-Instruct:q3_K_M"
+# Local models are loaded on first use by the model manager
+model_manager = None
 
-        base_model_name = model_path.split(':')[0]
-        model_path_llava_mmproj = f"{base_model_name}-mmproj.gguf"
+def initialize_local_models(silent_mode=False, log_file=None, unload_between_phases=None):
+    """
+    Return the shared model manager; each local GGUF model is loaded when first needed.
+    unload_between_phases, if given, overrides config.MODEL_UNLOAD_BETWEEN_PHASES.
+    """
+    global model_manager
 
-        with filter_specific_output():
-            chat_handler_llava = Llava15ChatHandler(clip_model_path=model_path_llava_mmproj, verbose=True)
-            image_inference = Llama(
-                model_path=model_path,
-                chat_handler=chat_handler_llava,
-                n_ctx=2048,
-                n_gpu_layers=0,
-                verbose=True
-            )
-            text_inference = Llama(
-                model_path=model_path_text,
-                n_ctx=2048,
-                n_gpu_layers=0,
-                verbose=True
-            )
-        print("**----------------------------------------------**")
-        print("**       Image inference model initialized      **")
-        print("**       Text inference model initialized       **")
-        print("**----------------------------------------------**")
-    return {'image': image_inference, 'text': text_inference}
+    if model_manager is None:
+        ensure_nltk_data(silent_mode, log_file)
+        model_manager = ModelManager(silent=silent_mode, log_file=log_file)
+    if unload_between_phases is not None:
+        model_manager.unload_between_phases = unload_between_phases
+    return model_manager
 
 def simulate_directory_tree(operations, base_path):
     """Simulate the directory tree based on the proposed operations."""
@@ -98,14 +91,12 @@ def one_time_organization(silent_mode, log_file):
     """Handle one-time file organization."""
     input_path, output_path = get_paths(silent_mode, log_file)
     start_time = time.time()
-    file_paths = collect_file_paths(input_path)
+    with metrics.span('scan', mode='organize'):
+        file_paths = collect_file_paths(input_path)
+    metrics.increment('files_scanned', len(file_paths), mode='organize')
     end_time = time.time()
     message = f"Time taken to load file paths: {end_time - start_time:.2f} seconds"
-    if silent_mode:
-        with open(log_file, 'a') as f:
-            f.write(message + '\n')
-    else:
-        print(message)
+    log_message(message, silent_mode, log_file)
 
     if not silent_mode:
         print("-" * 50)
@@ -113,200 +104,178 @@ def one_time_organization(silent_mode, log_file):
         display_directory_tree(input_path)
         print("*" * 50)
 
-    while True:
-        mode = get_mode_selection()
-        if mode == config.CONTENT_MODE:
-            backend = get_backend_selection()
-            if backend == 'local':
-                if not silent_mode:
-                    print("Checking if the model is already downloaded. If not, downloading it now.")
-                initialize_models()
-                if not silent_mode:
-                    print("*" * 50)
-                    print("The file upload was successful. Processing may take a few minutes.")
-                    print("*" * 50)
-                image_files, text_files = separate_files_by_type(file_paths)
-                text_tuples = []
-                for fp in text_files:
-                    text_content = read_file_data(fp)
-                    if text_content is None:
-                        message = f"Unsupported or unreadable text file format: {fp}"
-                        if silent_mode:
-                            with open(log_file, 'a') as f:
-                                f.write(message + '\n')
-                        else:
-                            print(message)
-                        continue
-                    text_tuples.append((fp, text_content))
-                data_images = process_image_files(image_files, image_inference, text_inference, silent=silent_mode, log_file=log_file)
-                data_texts = process_text_files(text_tuples, text_inference, silent=silent_mode, log_file=log_file)
+    manifest = FileManifest(output_path) if config.INCREMENTAL_MODE else None
 
-            elif backend == 'ollama':
-                image_files, text_files = separate_files_by_type(file_paths)
-                text_tuples = []
-                for fp in text_files:
-                    text_content = read_file_data(fp)
-                    if text_content is None:
-                        message = f"Unsupported or unreadable text file format: {fp}"
-                        if silent_mode:
-                            with open(log_file, 'a') as f:
-                                f.write(message + '\n')
-                        else:
-                            print(message)
-                        continue
-                    text_tuples.append((fp, text_content))
-                data_images = process_image_files_ollama(image_files, silent=silent_mode, log_file=log_file)
-                data_texts = process_text_files_ollama(text_tuples, silent=silent_mode, log_file=log_file)
-            all_data = data_images + data_texts
-            operations = compute_operations(all_data, output_path, set(), set())
-        elif mode == config.DATE_MODE:
-            operations = process_files_by_date(file_paths, output_path, dry_run=False, silent=silent_mode, log_file=log_file)
-        elif mode == config.TYPE_MODE:
-            operations = process_files_by_type(file_paths, output_path, dry_run=False, silent=silent_mode, log_file=log_file)
-        else:
-            print("Invalid mode selected.")
-            return
+    journal = None
+    try:
+        while True:
+            mode = get_mode_selection()
+            mode_file_paths = file_paths
+            previous_destinations = {}
+            if manifest is not None:
+                mode_file_paths, unchanged = manifest.filter_changed(file_paths, mode)
+                message = f"Incremental mode: {len(mode_file_paths)} new or modified files, {unchanged} unchanged files skipped"
+                log_message(message, silent_mode, log_file)
+                # Modified files replace what the last run placed for them rather than getting a second name
+                previous_destinations = manifest.previous_destinations(mode_file_paths, mode)
 
-        print("-" * 50)
-        message = "Proposed directory structure:"
-        if silent_mode:
-            with open(log_file, 'a') as f:
-                f.write(message + '\n')
-        else:
-            print(message)
-            print(os.path.abspath(output_path))
-            simulated_tree = simulate_directory_tree(operations, output_path)
-            print_simulated_tree(simulated_tree)
-            print("-" * 50)
+            if journal is not None:
+                journal.close()
+            journal = RunJournal(output_path, mode) if config.JOURNAL_ENABLED else None
+            if journal is not None:
+                described, placed = journal.counts()
+                if described or placed:
+                    message = f"Resuming an interrupted {mode} run: {described} files already described, {placed} already placed"
+                    log_message(message, silent_mode, log_file)
+                    placed_sources = journal.placed_sources()
+                    mode_file_paths = [file_path for file_path in mode_file_paths if file_path not in placed_sources]
 
-    if not silent_mode:
-        print("-" * 50)
-        print("Directory tree before organizing:")
-        display_directory_tree(input_path)
-        print("*" * 50)
+            if mode == config.CONTENT_MODE:
+                ai_backend = get_ai_backend_selection()
+                client_or_model = None
+                model_name = None
+                if ai_backend == 'Ollama':
+                    from ollama_async import AsyncOllamaRunner
+                    client_or_model = AsyncOllamaRunner()
+                    model_name = 'moondream'
+                else:
+                    if not silent_mode:
+                        print("Checking if the model is already downloaded. If not, downloading it now.")
+                    client_or_model = initialize_local_models(silent_mode, log_file)
 
-    while True:
-        mode = get_mode_selection()
-        if mode == config.CONTENT_MODE:
-            ai_backend = get_ai_backend_selection()
-            client_or_model = None
-            model_name = None
-            if ai_backend == 'Ollama':
-                client_or_model = Client(host='http://localhost:11434')
-                model_name = 'moondream'
-            else:
                 if not silent_mode:
-                    print("Checking if the model is already downloaded. If not, downloading it now.")
-                client_or_model = initialize_local_models()
-
-            if not silent_mode:
-                print("*" * 50)
-                print("The file upload was successful. Processing may take a few minutes.")
-                print("*" * 50)
+                    print("*" * 50)
+                    print("The file upload was successful. Processing may take a few minutes.")
+                    print("*" * 50)
 
-            operations = organize_files_with_ai(
-                file_paths,
-                output_path,
-                ai_backend,
-                client_or_model,
-                model_name,
-                silent_mode,
-                log_file
-            )
-        elif mode == config.DATE_MODE:
-            operations = process_files_by_date(file_paths, output_path, dry_run=False, silent=silent_mode, log_file=log_file)
-        elif mode == config.TYPE_MODE:
-            operations = process_files_by_type(file_paths, output_path, dry_run=False, silent=silent_mode, log_file=log_file)
-        else:
-            print("Invalid mode selected.")
-            return
+                from organize_files import organize_files_with_ai
+                name_index = NameIndex()
+                for destination in previous_destinations.values():
+                    name_index.release(destination)
+                operations = organize_files_with_ai(
+                    mode_file_paths,
+                    output_path,
+                    ai_backend,
+                    client_or_model,
+                    model_name,
+                    silent_mode,
+                    log_file,
+                    journal=journal,
+                    name_index=name_index
+                )
+                cache = get_metadata_cache()
+                if cache is not None:
+                    stats = cache.stats()
+                    message = f"Metadata cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries"
+                    log_message(message, silent_mode, log_file)
+            elif mode == config.DATE_MODE:
+                operations = process_files_by_date(mode_file_paths, output_path, dry_run=False, silent=silent_mode, log_file=log_file)
+            elif mode == config.TYPE_MODE:
+                operations = process_files_by_type(mode_file_paths, output_path, dry_run=False, silent=silent_mode, log_file=log_file)
+            else:
+                print("Invalid mode selected.")
+                return
 
-        print("-" * 50)
-        message = "Proposed directory structure:"
-        if silent_mode:
-            with open(log_file, 'a') as f:
-                f.write(message + '\n')
-        else:
-            print(message)
-            print(os.path.abspath(output_path))
-            simulated_tree = simulate_directory_tree(operations, output_path)
-            print_simulated_tree(simulated_tree)
             print("-" * 50)
-
-        proceed = get_yes_no("Would you like to proceed with these changes? (yes/no): ")
-        if proceed:
-            os.makedirs(output_path, exist_ok=True)
-            message = "Performing file operations..."
+            message = "Proposed directory structure:"
             if silent_mode:
-                with open(log_file, 'a') as f:
-                    f.write(message + '\n')
+                log_message(message, silent_mode, log_file)
             else:
                 print(message)
-            execute_operations(operations, dry_run=False, silent=silent_mode, log_file=log_file)
-            message = "The files have been organized successfully."
-            if silent_mode:
-                with open(log_file, 'a') as f:
-                    f.write("-" * 50 + '\n' + message + '\n' + "-" * 50 + '\n')
-            else:
+                print(os.path.abspath(output_path))
+                simulated_tree = simulate_directory_tree(operations, output_path)
+                print_simulated_tree(simulated_tree)
                 print("-" * 50)
-                print(message)
-                print("-" * 50)
-            break
-        else:
-            another_sort = get_yes_no("Would you like to choose another sorting method? (yes/no): ")
-            if not another_sort:
-                print("Operation canceled by the user.")
+
+            proceed = get_yes_no("Would you like to proceed with these changes? (yes/no): ")
+            if proceed:
+                os.makedirs(output_path, exist_ok=True)
+                message = "Performing file operations..."
+                log_message(message, silent_mode, log_file)
+                if previous_destinations:
+                    removed = remove_previous_outputs(operations, previous_destinations)
+                    log_message(f"Replacing {removed} outputs of modified files", silent_mode, log_file)
+                completed = execute_operations(operations, dry_run=False, silent=silent_mode, log_file=log_file, journal=journal)
+                if manifest is not None:
+                    # Include files placed before the run was interrupted
+                    manifest.record_operations(journal.placed_operations() if journal is not None else completed, mode)
+                if journal is not None:
+                    journal.finish()
+                message = "The files have been organized successfully."
+                if silent_mode:
+                    log_message(message, silent_mode, log_file, completed=len(completed), proposed=len(operations))
+                else:
+                    print("-" * 50)
+                    print(message)
+                    print("-" * 50)
                 break
+            else:
+                another_sort = get_yes_no("Would you like to choose another sorting method? (yes/no): ")
+                if not another_sort:
+                    print("Operation canceled by the user.")
+                    break
+    finally:
+        if journal is not None:
+            journal.close()
 
-class WatcherEventHandler(FileSystemEventHandler):
-    def __init__(self, output_path, mode, silent_mode, log_file, ai_backend=None, client_or_model=None, model_name=None):
-        self.output_path = output_path
-        self.mode = mode
-        self.silent_mode = silent_mode
-        self.log_file = log_file
-        self.ai_backend = ai_backend
-        self.client_or_model = client_or_model
-        self.model_name = model_name
+    if manifest is not None:
+        manifest.close()
+    metrics.export()
 
-    def on_created(self, event):
-        if not event.is_directory:
-            print(f"New file detected: {event.src_path}")
-            file_path = [event.src_path]
-            operations = []
-            if self.mode == config.CONTENT_MODE:
-                operations = organize_files_with_ai(
-                    file_path,
-                    self.output_path,
-                    self.ai_backend,
-                    self.client_or_model,
-                    self.model_name,
-                    self.silent_mode,
-                    self.log_file
-                )
-            elif self.mode == config.DATE_MODE:
-                operations = process_files_by_date(file_path, self.output_path, dry_run=False, silent=self.silent_mode, log_file=self.log_file)
-            elif self.mode == config.TYPE_MODE:
-                operations = process_files_by_type(file_path, self.output_path, dry_run=False, silent=self.silent_mode, log_file=self.log_file)
+def find_and_handle_duplicates(silent_mode, log_file):
+    """Find duplicate files in a directory and handle them as the user chooses."""
+    directory = get_directory_path("Enter the path of the directory to scan for duplicates: ")
+    stats = {}
+    index = HashIndex()
+    duplicate_sets = find_duplicates(directory, stats=stats, index=index)
+    index.close()
+    message = (f"Scanned {stats['files_scanned']} files: read {stats['bytes_read'] / 2**20:.1f} MiB "
+               f"of {stats['total_bytes'] / 2**20:.1f} MiB, {stats['already_linked']} hard links skipped, "
+               f"{stats['index_hits']} digests reused from the index")
+    log_message(message, silent_mode, log_file)
 
-            execute_operations(operations, dry_run=False, silent=self.silent_mode, log_file=self.log_file)
-            print(f"Organized {event.src_path}")
+    display_duplicates(duplicate_sets)
+    handle_duplicate_sets(duplicate_sets, silent_mode, log_file)
 
-def start_watching(input_path, output_path, mode, silent_mode, log_file, ai_backend=None, client_or_model=None, model_name=None):
-    """Start watching a directory for new files."""
-    event_handler = WatcherEventHandler(output_path, mode, silent_mode, log_file, ai_backend, client_or_model, model_name)
-    observer = Observer()
-    observer.schedule(event_handler, input_path, recursive=True)
-    observer.start()
-    print(f"Watching directory: {input_path}")
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+    if get_yes_no("Would you like to look for visually similar images (resized or re-encoded copies)? (yes/no): "):
+        from image_similarity import find_similar_images
+        similar_sets = find_similar_images(directory)
+        display_duplicates(similar_sets, kind="similar images")
+        handle_duplicate_sets(similar_sets, silent_mode, log_file, similar=True)
+
+    if get_yes_no("Would you like to look for near-duplicate documents (revisions or exports of the same text)? (yes/no): "):
+        _, text_files = separate_files_by_type(collect_file_paths(directory))
+        text_tuples = ExtractionPipeline(text_files, silent=silent_mode, log_file=log_file)
+        from text_similarity import find_similar_documents
+        similar_sets = find_similar_documents(text_tuples)
+        display_duplicates(similar_sets, kind="similar documents")
+        handle_duplicate_sets(similar_sets, silent_mode, log_file, similar=True)
+    metrics.export()
+
+def handle_duplicate_sets(duplicate_sets, silent_mode, log_file, similar=False):
+    """Ask the user how to handle the displayed sets and apply the choice.
+
+    Sets of similar rather than identical files can only be moved or reviewed set by set.
+    """
+    if not duplicate_sets:
+        return
+
+    choice = get_duplicate_handling_choice(allow_delete_all=not similar)
+    if choice == 'delete_all':
+        handle_duplicates_delete_all(duplicate_sets, silent=silent_mode, log_file=log_file)
+    elif choice == 'move_all':
+        move_to_folder = input("Enter the folder to move duplicates to: ").strip()
+        handle_duplicates_move_all(duplicate_sets, move_to_folder, silent=silent_mode, log_file=log_file)
+    elif choice == 'decide_each':
+        for file_set in duplicate_sets:
+            action, index_to_keep = get_individual_duplicate_action(file_set)
+            if action == 'skip_all':
+                break
+            if action == 'skip':
+                continue
+            handle_individual_duplicate(file_set, action, index_to_keep, silent=silent_mode, log_file=log_file)
 
 def main():
-    ensure_nltk_data()
     print("-" * 50)
     print("**NOTE: Silent mode logs all outputs to a text file instead of displaying them in the terminal.")
     silent_mode = get_yes_no("Would you like to enable silent mode? (yes/no): ")
@@ -330,15 +299,24 @@ def main():
             if mode == config.CONTENT_MODE:
                 ai_backend = get_ai_backend_selection()
                 if ai_backend == 'Ollama':
-                    client_or_model = Client(host='http://localhost:11434')
+                    from ollama_async import AsyncOllamaRunner
+                    client_or_model = AsyncOllamaRunner()
                     model_name = 'moondream'
                 else:
-                    client_or_model = initialize_local_models()
+                    # Batches arrive every few seconds, so reloading the models for each one costs more than it saves
+                    client_or_model = initialize_local_models(
+                        silent_mode, log_file, unload_between_phases=not config.WATCH_KEEP_MODELS_LOADED)
 
+            from directory_watcher import start_watching
             start_watching(input_path, output_path, mode, silent_mode, log_file, ai_backend, client_or_model, model_name)
             break
+        elif main_menu_selection == 'duplicates':
+            find_and_handle_duplicates(silent_mode, log_file)
         elif main_menu_selection == 'exit':
             break
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        close_logs()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import time
+
+MANIFEST_FILENAME = '.organizer_manifest.sqlite3'
+
+class FileManifest:
+    """Record of the files organized into an output directory and the operation produced for each.
+
+    Files are identified by path and organizing mode, and considered unchanged
+    while their size, modification time and inode match the recorded values.
+    The manifest is a hidden file so it is never picked up as input itself.
+    """
+
+    def __init__(self, output_path):
+        os.makedirs(output_path, exist_ok=True)
+        self.db_path = os.path.join(output_path, MANIFEST_FILENAME)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT NOT NULL, '
+            'mode TEXT NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'mtime_ns INTEGER NOT NULL, '
+            'inode INTEGER NOT NULL, '
+            'destination TEXT NOT NULL, '
+            'link_type TEXT NOT NULL, '
+            'organized_at REAL NOT NULL, '
+            'PRIMARY KEY (path, mode))'
+        )
+        self._conn.commit()
+
+    def filter_changed(self, file_paths, mode):
+        """Split file_paths into files that are new or modified for this mode and a count of unchanged ones."""
+        recorded = {
+            path: (size, mtime_ns, inode)
+            for path, size, mtime_ns, inode in self._conn.execute(
+                'SELECT path, size, mtime_ns, inode FROM files WHERE mode = ?', (mode,)
+            )
+        }
+        changed = []
+        unchanged = 0
+        for file_path in file_paths:
+            previous = recorded.get(os.path.abspath(file_path))
+            if previous is not None:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                if previous == (st.st_size, st.st_mtime_ns, st.st_ino):
+                    unchanged += 1
+                    continue
+            changed.append(file_path)
+        return changed, unchanged
+
+    def previous_destinations(self, file_paths, mode):
+        """
+        Map each of file_paths organized by an earlier run in this mode to the
+        output placed for it then. Moved files are left out: their old output is
+        the only copy of the earlier contents, not a stale link to replace.
+        """
+        recorded = dict(self._conn.execute(
+            "SELECT path, destination FROM files WHERE mode = ? AND link_type != 'move'", (mode,)
+        ))
+        previous = {}
+        for file_path in file_paths:
+            destination = recorded.get(os.path.abspath(file_path))
+            if destination is not None:
+                previous[file_path] = destination
+        return previous
+
+    def record_operations(self, operations, mode):
+        """Record completed operations so their sources are skipped on the next run."""
+        rows = []
+        now = time.time()
+        for operation in operations:
+            source = operation['source']
+            try:
+                st = os.stat(source)
+            except OSError:
+                continue
+            rows.append((
+                os.path.abspath(source), mode, st.st_size, st.st_mtime_ns, st.st_ino,
+                os.path.abspath(operation['destination']), operation['link_type'], now
+            ))
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO files (path, mode, size, mtime_ns, inode, destination, link_type, organized_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        self._conn.commit()
+        return len(rows)
+
+    def close(self):
+        """Close the manifest database."""
+        self._conn.close()
+
+def remove_previous_outputs(operations, previous):
+    """
+    Remove the outputs an earlier run placed for the sources of operations, as
+    returned by FileManifest.previous_destinations, so modified files can be
+    placed again instead of failing on their old destination. Returns the
+    number of outputs removed.
+    """
+    removed = 0
+    for operation in operations:
+        destination = previous.get(operation['source'])
+        if destination is None or os.path.abspath(destination) == os.path.abspath(operation['source']):
+            continue
+        try:
+            os.unlink(destination)
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
@@ -0,0 +1,196 @@
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+import config
+from metrics import metrics
+
+HASH_CHUNK_SIZE = 1024 * 1024  # Read files in 1 MiB chunks when hashing
+TOUCH_BATCH_SIZE = 256  # Cache hits whose access times are written in one statement
+EVICT_BATCH_SIZE = 64  # Least recently used entries read at a time when evicting
+
+def hash_file_content(file_path):
+    """Return the SHA-256 hex digest of a file's content, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except (IOError, OSError):
+        return None
+    return digest.hexdigest()
+
+def get_model_name(model):
+    """Return a stable name for a local model object or an Ollama model string."""
+    if model is None:
+        return 'none'
+    if isinstance(model, str):
+        return model
+    model_path = getattr(model, 'model_path', None)
+    if model_path:
+        return os.path.basename(model_path)
+    return type(model).__name__
+
+class MetadataCache:
+    """On-disk cache of AI-generated metadata keyed by content hash, backend, model and prompt version.
+
+    Entries are evicted in least-recently-used order once either the entry
+    count or the total stored size exceeds its limit.
+    """
+
+    def __init__(self, db_path, max_entries=None, max_bytes=None, prompt_version=None):
+        self.db_path = db_path
+        self.max_entries = config.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_bytes = config.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.prompt_version = config.PROMPT_VERSION if prompt_version is None else prompt_version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS metadata ('
+            'key TEXT PRIMARY KEY, '
+            'description TEXT, '
+            'foldername TEXT, '
+            'filename TEXT, '
+            'size INTEGER NOT NULL, '
+            'last_access REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS metadata_last_access ON metadata (last_access)')
+        self._conn.commit()
+        # Kept up to date on every put and eviction, so checking the limits never scans the table
+        self._count, self._bytes = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM metadata').fetchone()
+        # Access times of hits not yet written; LRU order only needs to be roughly current
+        self._touched = {}
+
+    def make_key(self, file_path, backend, model_name, task):
+        """Build the cache key for a file, or return None if its content cannot be hashed."""
+        content_hash = hash_file_content(file_path)
+        if content_hash is None:
+            return None
+        raw_key = '|'.join([content_hash, backend, model_name, task, str(self.prompt_version)])
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return a dict with description, foldername and filename, or None on a miss."""
+        if key is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT description, foldername, filename FROM metadata WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                metrics.increment('cache_misses', cache='metadata')
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._write_touched()
+                self._conn.commit()
+            self.hits += 1
+        metrics.increment('cache_hits', cache='metadata')
+        return {'description': row[0], 'foldername': row[1], 'filename': row[2]}
+
+    def put(self, key, description, foldername, filename):
+        """Store generated metadata and evict old entries if the cache is over its limits."""
+        if key is None:
+            return
+        description = description or ''
+        foldername = foldername or ''
+        filename = filename or ''
+        size = len(key) + len(description.encode('utf-8')) + len(foldername.encode('utf-8')) + len(filename.encode('utf-8'))
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM metadata WHERE key = ?', (key,)).fetchone()
+            if old is not None:
+                self._count -= 1
+                self._bytes -= old[0]
+            self._touched.pop(key, None)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO metadata (key, description, foldername, filename, size, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, description, foldername, filename, size, time.time())
+            )
+            self._count += 1
+            self._bytes += size
+            self._evict()
+            self._conn.commit()
+
+    def _write_touched(self):
+        if self._touched:
+            self._conn.executemany('UPDATE metadata SET last_access = ? WHERE key = ?',
+                                   [(access, key) for key, access in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        """Delete least recently used entries until both limits are satisfied."""
+        if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        # Recent hits must count before choosing what to evict
+        self._write_touched()
+        while self._count > self.max_entries or self._bytes > self.max_bytes:
+            # Oldest entries first, read through the last_access index; how many entries
+            # free enough bytes is not known in advance, so those are read in small batches
+            limit = EVICT_BATCH_SIZE if self._bytes > self.max_bytes else self._count - self.max_entries
+            rows = self._conn.execute(
+                'SELECT key, size FROM metadata ORDER BY last_access ASC LIMIT ?', (limit,)
+            ).fetchall()
+            if not rows:
+                break
+            to_delete = []
+            for key, size in rows:
+                if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+                    break
+                to_delete.append((key,))
+                self._count -= 1
+                self._bytes -= size
+            self._conn.executemany('DELETE FROM metadata WHERE key = ?', to_delete)
+            self.evictions += len(to_delete)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current cache size."""
+        with self._lock:
+            count, total_size = self._count, self._bytes
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': count,
+            'bytes': total_size,
+        }
+
+    def flush(self):
+        """Write the access times of recent hits."""
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+
+    def close(self):
+        """Write pending access times and close the underlying database connection."""
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+            self._conn.close()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_metadata_cache():
+    """Return the shared metadata cache, or None if caching is disabled in config."""
+    global _default_cache
+    if not config.CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache(config.CACHE_DB_PATH)
+            atexit.register(_default_cache.flush)
+    return _default_cache
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+from file_utils import collect_file_paths, separate_files_by_type, read_file_data
+from text_data_processing import generate_text_metadata, generate_text_metadata_structured
+from image_data_processing import generate_image_metadata, generate_image_metadata_structured
+
+class _NullProgress:
+    """Stand-in for a rich Progress that ignores updates."""
+    def update(self, *args, **kwargs):
+        pass
+
+def _time_call(func, *args):
+    """Run func and return (result, seconds taken)."""
+    start_time = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start_time
+
+def compare_text_latency(text_tuples, text_inference):
+    """Time structured and three-step metadata generation for each text file."""
+    progress = _NullProgress()
+    rows = []
+    for file_path, text in text_tuples:
+        structured, structured_time = _time_call(generate_text_metadata_structured, text, file_path, progress, None, text_inference)
+        _, three_step_time = _time_call(generate_text_metadata, text, file_path, progress, None, text_inference)
+        rows.append({
+            'file_path': file_path,
+            'structured_seconds': structured_time,
+            'three_step_seconds': three_step_time,
+            'structured_parsed': structured is not None,
+        })
+    return rows
+
+def compare_image_latency(image_paths, image_inference, text_inference):
+    """Time structured and three-step metadata generation for each image file."""
+    progress = _NullProgress()
+    rows = []
+    for image_path in image_paths:
+        structured, structured_time = _time_call(generate_image_metadata_structured, image_path, progress, None, image_inference)
+        _, three_step_time = _time_call(generate_image_metadata, image_path, progress, None, image_inference, text_inference)
+        rows.append({
+            'file_path': image_path,
+            'structured_seconds': structured_time,
+            'three_step_seconds': three_step_time,
+            'structured_parsed': structured is not None,
+        })
+    return rows
+
+def print_latency_report(rows):
+    """Print a per-file latency table and the overall speedup."""
+    print(f"{'File':<40} {'Structured':>12} {'Three-step':>12} {'Speedup':>9} {'Parsed':>7}")
+    for row in rows:
+        speedup = row['three_step_seconds'] / row['structured_seconds'] if row['structured_seconds'] else 0.0
+        print(f"{os.path.basename(row['file_path'])[:40]:<40} {row['structured_seconds']:>11.2f}s "
+              f"{row['three_step_seconds']:>11.2f}s {speedup:>8.2f}x {'yes' if row['structured_parsed'] else 'no':>7}")
+    total_structured = sum(row['structured_seconds'] for row in rows)
+    total_three_step = sum(row['three_step_seconds'] for row in rows)
+    if rows and total_structured:
+        print(f"Average per file: structured {total_structured / len(rows):.2f}s, "
+              f"three-step {total_three_step / len(rows):.2f}s ({total_three_step / total_structured:.2f}x)")
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python metadata_latency.py <directory>")
+        sys.exit(1)
+    from main import initialize_local_models
+    models = initialize_local_models()
+    image_files, text_files = separate_files_by_type(collect_file_paths(sys.argv[1]))
+    text_tuples = [(fp, read_file_data(fp)) for fp in text_files]
+    text_tuples = [(fp, text) for fp, text in text_tuples if text is not None]
+    rows = compare_image_latency(image_files, models['image'], models['text'])
+    rows += compare_text_latency(text_tuples, models['text'])
+    print_latency_report(rows)
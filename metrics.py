@@ -0,0 +1,214 @@
+import os
+import json
+import functools
+import time
+import threading
+import config
+
+class _NullSpan:
+    """Span returned while metrics are disabled; every operation is a no-op."""
+
+    seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def record_usage(self, response):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+def usage_from_response(response):
+    """Return (prompt_tokens, completion_tokens) from a llama.cpp or Ollama response, or None."""
+    try:
+        usage = response.get('usage')
+        if usage:
+            return usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0
+        prompt_tokens = response.get('prompt_eval_count')
+        completion_tokens = response.get('eval_count')
+    except AttributeError:
+        return None
+    if prompt_tokens is None and completion_tokens is None:
+        return None
+    return prompt_tokens or 0, completion_tokens or 0
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Span:
+    """Times a block of work and records it under a name and labels."""
+
+    __slots__ = ('registry', 'name', 'labels', 'start', 'seconds')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self.start
+        self.registry.observe(self.name, self.seconds, **self.labels)
+        return False
+
+    def record_usage(self, response):
+        """Count the tokens a model call consumed and produced, labelled with the span's model."""
+        usage = usage_from_response(response)
+        if usage is None:
+            return
+        model = self.labels.get('model', 'unknown')
+        self.registry.increment('tokens_in', usage[0], model=model)
+        self.registry.increment('tokens_out', usage[1], model=model)
+
+class MetricsRegistry:
+    """In-process timing spans and counters with JSON and Prometheus text export.
+
+    While disabled, span() returns a shared no-op span and increment() returns
+    immediately, so instrumented code pays only for a function call.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans = {}  # (name, labels) -> [count, total_seconds, max_seconds]
+        self._counters = {}  # (name, labels) -> value
+        self.started_at = time.time()
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, labels)
+
+    def timed(self, name, **labels):
+        """Decorator recording every call of a function as a span."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Span(self, name, labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration measured elsewhere, e.g. in a worker process."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self._spans.get(key)
+            if entry is None:
+                self._spans[key] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Return all spans and counters, plus tokens per second for each model."""
+        with self._lock:
+            spans = [
+                {'name': name, 'labels': dict(labels), 'count': count, 'total_seconds': total, 'max_seconds': longest}
+                for (name, labels), (count, total, longest) in sorted(self._spans.items())
+            ]
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        model_seconds = {}
+        for span in spans:
+            if span['name'] == 'llm_call':
+                model = span['labels'].get('model', 'unknown')
+                model_seconds[model] = model_seconds.get(model, 0.0) + span['total_seconds']
+        tokens_per_second = {}
+        for counter in counters:
+            if counter['name'] == 'tokens_out':
+                model = counter['labels'].get('model', 'unknown')
+                seconds = model_seconds.get(model)
+                if seconds:
+                    tokens_per_second[model] = counter['value'] / seconds
+        return {
+            'started_at': self.started_at,
+            'uptime_seconds': time.time() - self.started_at,
+            'spans': spans,
+            'counters': counters,
+            'tokens_per_second': tokens_per_second,
+        }
+
+    def to_prometheus(self):
+        """Render the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def labels_text(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items())) + '}'
+
+        if snapshot['spans']:
+            lines.append('# HELP organizer_span_seconds Time spent in each instrumented stage.')
+            lines.append('# TYPE organizer_span_seconds summary')
+            for span in snapshot['spans']:
+                labels = dict(span['labels'], span=span['name'])
+                lines.append(f"organizer_span_seconds_sum{labels_text(labels)} {span['total_seconds']:.6f}")
+                lines.append(f"organizer_span_seconds_count{labels_text(labels)} {span['count']}")
+            lines.append('# HELP organizer_span_seconds_max Longest single duration of each stage.')
+            lines.append('# TYPE organizer_span_seconds_max gauge')
+            for span in snapshot['spans']:
+                labels = dict(span['labels'], span=span['name'])
+                lines.append(f"organizer_span_seconds_max{labels_text(labels)} {span['max_seconds']:.6f}")
+
+        for name in sorted({counter['name'] for counter in snapshot['counters']}):
+            lines.append(f'# TYPE organizer_{name}_total counter')
+            for counter in snapshot['counters']:
+                if counter['name'] == name:
+                    lines.append(f"organizer_{name}_total{labels_text(counter['labels'])} {counter['value']}")
+
+        if snapshot['tokens_per_second']:
+            lines.append('# HELP organizer_model_tokens_per_second Generated tokens per second of model call time.')
+            lines.append('# TYPE organizer_model_tokens_per_second gauge')
+            for model, rate in sorted(snapshot['tokens_per_second'].items()):
+                lines.append(f"organizer_model_tokens_per_second{labels_text({'model': model})} {rate:.3f}")
+        lines.append('# TYPE organizer_uptime_seconds gauge')
+        lines.append(f"organizer_uptime_seconds {snapshot['uptime_seconds']:.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, json_path=None, prometheus_path=None):
+        """Write the metrics as JSON and as a Prometheus text file; does nothing while disabled."""
+        if not self.enabled:
+            return
+        json_path = json_path or config.METRICS_JSON_PATH
+        prometheus_path = prometheus_path or config.METRICS_PROMETHEUS_PATH
+        for path, content in ((json_path, json.dumps(self.snapshot(), indent=2)), (prometheus_path, self.to_prometheus())):
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            # Write and rename so a scraper never reads a half-written file
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+
+metrics = MetricsRegistry(enabled=config.METRICS_ENABLED)
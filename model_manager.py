@@ -0,0 +1,183 @@
+import gc
+import sys
+import time
+import threading
+import contextlib
+from collections import deque
+import config
+from output_filter import filter_specific_output
+from log_writer import log_message
+
+IMAGE_MODEL_PATH = "llava-v1.6-vicuna-7b:q4_0"
+IMAGE_MMPROJ_PATH = f"{IMAGE_MODEL_PATH.split(':')[0]}-mmproj.gguf"
+TEXT_MODEL_PATH = "Llama3.2-3B-Instruct:q3_K_M"
+
+def _proc_status_kib(field):
+    """Read a memory field such as VmRSS from /proc/self/status, in KiB, or None where unavailable."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if it cannot be determined."""
+    kib = _proc_status_kib('VmRSS')
+    return kib * 1024 if kib is not None else None
+
+def peak_rss():
+    """Peak resident set size in bytes since the last reset_peak_rss, or since process start where resets are unsupported."""
+    kib = _proc_status_kib('VmHWM')
+    if kib is not None:
+        return kib * 1024
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter so the next phase is measured on its own. Linux only."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def format_bytes(num_bytes):
+    if num_bytes is None:
+        return 'n/a'
+    return f"{num_bytes / (1024 ** 3):.2f} GB"
+
+class LazyModel:
+    """Stands in for a local model and loads it through the manager the first time it is used.
+
+    model_path is available without loading, so cache keys can be computed for
+    files whose metadata is already cached without ever loading the model.
+    """
+
+    def __init__(self, manager, name, model_path):
+        self._manager = manager
+        self._name = name
+        self.model_path = model_path
+
+    def __getattr__(self, attr):
+        return getattr(self._manager.load(self._name), attr)
+
+class ModelManager:
+    """Loads the local GGUF models on first use and releases them between processing phases.
+
+    Work is run in phases (all images, then all text) so the vision model can be
+    unloaded before the text phase and both models are rarely resident at once.
+    Peak RSS is recorded for every phase; only the most recent phases are kept,
+    so long-running watchers and daemons do not grow the history without bound.
+    """
+
+    def __init__(self, use_mmap=None, use_mlock=None, unload_between_phases=None, silent=False, log_file=None):
+        self.use_mmap = config.MODEL_USE_MMAP if use_mmap is None else use_mmap
+        self.use_mlock = config.MODEL_USE_MLOCK if use_mlock is None else use_mlock
+        if unload_between_phases is None:
+            unload_between_phases = config.MODEL_UNLOAD_BETWEEN_PHASES
+        self.unload_between_phases = unload_between_phases
+        self.silent = silent
+        self.log_file = log_file
+        self._lock = threading.Lock()
+        self._models = {}
+        self.phases = deque(maxlen=config.MODEL_PHASE_HISTORY)
+        self.image = LazyModel(self, 'image', IMAGE_MODEL_PATH)
+        self.text = LazyModel(self, 'text', TEXT_MODEL_PATH)
+
+    def __getitem__(self, name):
+        return {'image': self.image, 'text': self.text}[name]
+
+    def log(self, message):
+        log_message(message, self.silent, self.log_file)
+
+    def loaded(self):
+        """Names of the models currently resident."""
+        with self._lock:
+            return sorted(self._models)
+
+    def load(self, name):
+        """Return the named model, loading it if it is not resident."""
+        with self._lock:
+            if name not in self._models:
+                start_time = time.time()
+                self._models[name] = self._load(name)
+                self.log(f"Loaded {name} model in {time.time() - start_time:.1f}s (RSS {format_bytes(current_rss())})")
+            return self._models[name]
+
+    def _load(self, name):
+        from llama_cpp import Llama
+        with filter_specific_output():
+            if name == 'image':
+                from llama_cpp.llama_chat_format import Llava15ChatHandler
+                chat_handler = Llava15ChatHandler(clip_model_path=IMAGE_MMPROJ_PATH, verbose=True)
+                return Llama(
+                    model_path=IMAGE_MODEL_PATH,
+                    chat_handler=chat_handler,
+                    n_ctx=2048,
+                    n_gpu_layers=0,
+                    use_mmap=self.use_mmap,
+                    use_mlock=self.use_mlock,
+                    verbose=True
+                )
+            return Llama(
+                model_path=TEXT_MODEL_PATH,
+                n_ctx=2048,
+                n_gpu_layers=0,
+                use_mmap=self.use_mmap,
+                use_mlock=self.use_mlock,
+                verbose=True
+            )
+
+    def unload(self, name):
+        """Release the named model if it is resident."""
+        with self._lock:
+            model = self._models.pop(name, None)
+        if model is None:
+            return
+        close = getattr(model, 'close', None)
+        if close is not None:
+            close()
+        del model
+        gc.collect()
+        self.log(f"Unloaded {name} model (RSS {format_bytes(current_rss())})")
+
+    def unload_all(self):
+        for name in self.loaded():
+            self.unload(name)
+
+    @contextlib.contextmanager
+    def phase(self, name, release=()):
+        """Run a block of work as a named phase, then release the given models if configured to."""
+        measured = reset_peak_rss()
+        start_time = time.time()
+        try:
+            yield self
+        finally:
+            record = {
+                'phase': name,
+                'seconds': time.time() - start_time,
+                'peak_rss': peak_rss(),
+                'peak_is_phase_only': measured,
+                'models': self.loaded(),
+            }
+            self.phases.append(record)
+            self.log(self.format_phase(record))
+            if self.unload_between_phases:
+                for model_name in release:
+                    self.unload(model_name)
+
+    @staticmethod
+    def format_phase(record):
+        peak_label = 'peak RSS' if record['peak_is_phase_only'] else 'peak RSS since start'
+        models = ', '.join(record['models']) or 'none'
+        return (f"Phase {record['phase']}: {record['seconds']:.1f}s, {peak_label} {format_bytes(record['peak_rss'])}, "
+                f"models resident: {models}")
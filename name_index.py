@@ -0,0 +1,57 @@
+import os
+import sys
+
+# Names that differ only in case collide on the default macOS and Windows filesystems
+_CASE_INSENSITIVE = sys.platform in ('darwin', 'win32')
+
+def _fold(name):
+    return name.casefold() if _CASE_INSENSITIVE else name
+
+class NameIndex:
+    """Hands out free file names in destination directories.
+
+    The first time a directory is used its existing entries are read with a
+    single os.scandir, so names already on disk are never handed out again.
+    For every stem and extension the next suffix to try is remembered, so n
+    files that all want the same name cost O(n) in total instead of O(n^2).
+    """
+
+    def __init__(self):
+        self._taken = {}  # directory -> names in use (folded for case-insensitive filesystems)
+        self._next_suffix = {}  # (directory, folded stem, folded extension) -> next counter to try
+
+    def _names(self, dir_path):
+        names = self._taken.get(dir_path)
+        if names is None:
+            try:
+                with os.scandir(dir_path) as entries:
+                    names = {_fold(entry.name) for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                names = set()
+            self._taken[dir_path] = names
+        return names
+
+    def reserve(self, file_path):
+        """Mark a path as taken, e.g. one planned by an earlier call."""
+        dir_path, name = os.path.split(file_path)
+        self._names(dir_path).add(_fold(name))
+
+    def release(self, file_path):
+        """Mark a path as free again, e.g. an output that is about to be replaced."""
+        dir_path, name = os.path.split(file_path)
+        self._names(dir_path).discard(_fold(name))
+
+    def claim(self, dir_path, stem, extension):
+        """Return a name in dir_path that is not yet taken, stem + extension if possible, and take it."""
+        names = self._names(dir_path)
+        name = stem + extension
+        if _fold(name) in names:
+            key = (dir_path, _fold(stem), _fold(extension))
+            counter = self._next_suffix.get(key, 1)
+            name = f"{stem}_{counter}{extension}"
+            while _fold(name) in names:
+                counter += 1
+                name = f"{stem}_{counter}{extension}"
+            self._next_suffix[key] = counter + 1
+        names.add(_fold(name))
+        return name
@@ -0,0 +1,104 @@
+import asyncio
+import random
+import config
+from metrics import metrics
+
+def is_retryable(error):
+    """Timeouts, dropped connections, overload and server errors are worth retrying; bad requests are not."""
+    import httpx
+    from ollama import ResponseError
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+class AsyncOllamaRunner:
+    """Runs Ollama requests concurrently on one AsyncClient with a concurrency limit.
+
+    Each attempt holds one of `concurrency` slots and is abandoned after `timeout`
+    seconds. Retryable failures are attempted again after an exponential backoff
+    with jitter; the slot is released while waiting so other requests can use it.
+    map() hands items to `concurrency` workers that each take the next item only
+    when they are free, so reading and encoding files never runs ahead of the
+    requests.
+    """
+
+    def __init__(self, host=None, concurrency=None, timeout=None, retries=None, backoff=None):
+        self.host = host or config.OLLAMA_HOST
+        self.concurrency = concurrency or config.OLLAMA_CONCURRENCY
+        self.timeout = config.OLLAMA_REQUEST_TIMEOUT if timeout is None else timeout
+        self.retries = config.OLLAMA_MAX_RETRIES if retries is None else retries
+        self.backoff = config.OLLAMA_RETRY_BACKOFF if backoff is None else backoff
+        self.client = None
+        self._semaphore = None
+        self.requests = 0
+        self.retried = 0
+
+    async def call(self, method, **kwargs):
+        """Call a client method such as 'chat' or 'generate', retrying retryable failures."""
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    with metrics.span('llm_call', model=kwargs.get('model', 'unknown')) as span:
+                        try:
+                            response = await asyncio.wait_for(getattr(self.client, method)(**kwargs), self.timeout)
+                        except asyncio.TimeoutError:
+                            raise TimeoutError(f"no response within {self.timeout:g}s") from None
+                        span.record_usage(response)
+                        return response
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                metrics.increment('llm_retries', model=kwargs.get('model', 'unknown'))
+            delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            self.retried += 1
+            await asyncio.sleep(delay)
+
+    async def _map(self, func, items, on_done):
+        # Imported here so that startup does not pay for the Ollama client unless it is used
+        from ollama import AsyncClient
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        results = {}
+        iterator = iter(items)
+        # Items may come from a blocking producer such as an extraction pipeline; pull those on a thread
+        blocking = not isinstance(items, (list, tuple))
+        pull_lock = asyncio.Lock()
+        done = object()
+
+        async def worker():
+            # Each worker takes the next item only once it is free, so at most `concurrency`
+            # items are read, encoded or in flight at once and producers keep their backpressure
+            while True:
+                async with pull_lock:
+                    item = await asyncio.to_thread(next, iterator, done) if blocking else next(iterator, done)
+                    if item is done:
+                        return
+                    index = len(results)
+                    results[index] = None
+                try:
+                    result = await func(self, item)
+                except Exception as e:
+                    result = e
+                results[index] = result
+                if on_done is not None:
+                    on_done(item, result)
+
+        self.client = AsyncClient(host=self.host)
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            await self.client.close()
+            self.client = None
+        return [results[index] for index in range(len(results))]
+
+    def map(self, func, items, on_done=None):
+        """
+        Apply the coroutine function func(runner, item) to every item concurrently and
+        return the results in input order. A failed item's result is the exception it
+        raised. on_done(item, result) is called as each item finishes.
+        """
+        return asyncio.run(self._map(func, items, on_done))
@@ -1,78 +1,161 @@
-import ollama
 import base64
+import asyncio
 from tqdm import tqdm
+import config
+from ollama_async import AsyncOllamaRunner
+from image_preprocessing import preprocess_images
 from file_utils import get_new_filename
+from data_processing_common import sanitize_filename, parse_metadata_json
+from log_writer import log_message
 
-def process_text_files_ollama(text_tuples, silent=False, log_file=None):
+TEXT_MODEL = 'llama3'
+IMAGE_MODEL = 'llava'
+
+STRUCTURED_TEXT_PROMPT = """Read the text below and respond with a JSON object with the keys "description" (a concise summary of at most 150 words), "filename" (a descriptive filename of at most 3 words connected with underscores) and "category" (a general category of at most 2 words for the folder name).
+
+Text: {text}"""
+
+STRUCTURED_IMAGE_PROMPT = """Describe this image and respond with a JSON object with the keys "description" (a detailed description of the main subject), "filename" (a descriptive filename of at most 3 words connected with underscores) and "category" (a general category of at most 2 words for the folder name)."""
+
+async def generate_metadata_ollama(runner, model, message):
+    """Request description, filename and category in one JSON-formatted chat call.
+
+    Returns (summary, category, new_filename), or None if the response cannot be parsed.
+    """
+    response = await runner.call('chat', model=model, messages=[message], format='json')
+    parsed = parse_metadata_json(response['message']['content'])
+    if parsed is None:
+        return None
+    category = sanitize_filename(parsed['category'], max_words=2)
+    new_filename = sanitize_filename(parsed['filename'], max_words=3)
+    return parsed['description'], category, new_filename
+
+def read_base64(file_path):
+    """Return a file's contents base64-encoded for an Ollama request."""
+    with open(file_path, "rb") as f:
+        return base64.b64encode(f.read()).decode('utf-8')
+
+def cached_metadata(cache, cache_key, file_path):
+    """Return the cached result for a file, or None on a miss."""
+    cached = cache.get(cache_key)
+    if cached is None:
+        return None
+    return {
+        "file_path": file_path,
+        "category": cached['foldername'],
+        "new_filename": cached['filename'],
+        "summary": cached['description']
+    }
+
+async def request_metadata_ollama(runner, model, file_path, structured_message, fallback_message):
+    """Describe one file, falling back to a free-form chat if there is no structured response to use."""
+    result = None
+    if structured_message is not None:
+        result = await generate_metadata_ollama(runner, model, structured_message)
+    if result is not None:
+        summary, category, new_filename = result
+    else:
+        response = await runner.call('chat', model=model, messages=[fallback_message])
+        summary = response['message']['content']
+        category, new_filename = get_new_filename(summary, file_path)
+    return {
+        "file_path": file_path,
+        "category": category,
+        "new_filename": new_filename,
+        "summary": summary
+    }
+
+async def describe_text_file_ollama(runner, item, cache=None):
+    """Describe one (file_path, text) pair."""
+    file_path, text_content = item
+    structured = config.STRUCTURED_OUTPUT
+    cache_key = None
+    if cache is not None:
+        # Hashing the file and the cache lookup block, so they run off the event loop
+        cache_key = await asyncio.to_thread(cache.make_key, file_path, 'ollama', TEXT_MODEL, 'text-json' if structured else 'text')
+        cached = await asyncio.to_thread(cached_metadata, cache, cache_key, file_path)
+        if cached is not None:
+            return cached
+
+    structured_message = None
+    if structured:
+        structured_message = {
+            'role': 'user',
+            'content': STRUCTURED_TEXT_PROMPT.format(text=text_content),
+        }
+    fallback_message = {
+        'role': 'user',
+        'content': f"Summarize the following text and suggest a file category and a new filename: {text_content}",
+    }
+    data = await request_metadata_ollama(runner, TEXT_MODEL, file_path, structured_message, fallback_message)
+    if cache is not None:
+        await asyncio.to_thread(cache.put, cache_key, data['summary'], data['category'], data['new_filename'])
+    return data
+
+async def describe_image_file_ollama(runner, item, cache=None):
+    """Describe one (file_path, prepared_path) pair, sending the model the prepared copy."""
+    file_path, prepared_path = item
+    structured = config.STRUCTURED_OUTPUT
+    cache_key = None
+    if cache is not None:
+        # Hashing the file and the cache lookup block, so they run off the event loop
+        cache_key = await asyncio.to_thread(cache.make_key, file_path, 'ollama', IMAGE_MODEL, 'image-json' if structured else 'image')
+        cached = await asyncio.to_thread(cached_metadata, cache, cache_key, file_path)
+        if cached is not None:
+            return cached
+
+    image_data = await asyncio.to_thread(read_base64, prepared_path)
+    structured_message = None
+    if structured:
+        structured_message = {
+            'role': 'user',
+            'content': STRUCTURED_IMAGE_PROMPT,
+            'images': [image_data]
+        }
+    fallback_message = {
+        'role': 'user',
+        'content': 'Describe this image and suggest a category and a new filename.',
+        'images': [image_data]
+    }
+    data = await request_metadata_ollama(runner, IMAGE_MODEL, file_path, structured_message, fallback_message)
+    if cache is not None:
+        await asyncio.to_thread(cache.put, cache_key, data['summary'], data['category'], data['new_filename'])
+    return data
+
+def run_ollama_batch(describe, items, desc, silent=False, log_file=None, cache=None, total=None):
+    """Describe items concurrently, keeping input order and logging the files that failed."""
+    runner = AsyncOllamaRunner()
+    if total is None and hasattr(items, '__len__'):
+        total = len(items)
+    progress = tqdm(total=total, desc=desc, disable=silent)
+
+    def on_done(item, result):
+        progress.update(1)
+        if isinstance(result, Exception):
+            file_path = item[0] if isinstance(item, tuple) else item
+            message = f"Error processing {file_path} with Ollama: {result}"
+            log_message(message, silent, log_file, level='error', file_path=file_path)
+
+    results = runner.map(lambda runner, item: describe(runner, item, cache), items, on_done)
+    progress.close()
+    return [result for result in results if not isinstance(result, Exception)]
+
+def process_text_files_ollama(text_tuples, silent=False, log_file=None, cache=None):
     """
     Processes text files using Ollama for summarization and categorization.
+    Requests run concurrently, up to config.OLLAMA_CONCURRENCY at a time.
     """
-    data_texts = []
     if not silent:
         print("Processing text files with Ollama...")
-    for file_path, text_content in tqdm(text_tuples, desc="Processing text files", disable=silent):
-        try:
-            response = ollama.chat(
-                model='llama3',
-                messages=[
-                    {
-                        'role': 'user',
-                        'content': f"Summarize the following text and suggest a file category and a new filename: {text_content}",
-                    },
-                ],
-            )
-            summary = response['message']['content']
-            category, new_filename = get_new_filename(summary, file_path)
-            data_texts.append({
-                "file_path": file_path,
-                "category": category,
-                "new_filename": new_filename,
-                "summary": summary
-            })
-        except Exception as e:
-            message = f"Error processing {file_path} with Ollama: {e}"
-            if silent and log_file:
-                with open(log_file, 'a') as f:
-                    f.write(message + '\n')
-            else:
-                print(message)
-    return data_texts
-
-def process_image_files_ollama(image_files, silent=False, log_file=None):
+    return run_ollama_batch(describe_text_file_ollama, text_tuples, "Processing text files", silent, log_file, cache)
+
+def process_image_files_ollama(image_files, silent=False, log_file=None, cache=None):
     """
     Processes image files using Ollama for summarization and categorization.
+    Requests run concurrently, up to config.OLLAMA_CONCURRENCY at a time.
     """
-    data_images = []
     if not silent:
         print("Processing image files with Ollama...")
-    for file_path in tqdm(image_files, desc="Processing image files", disable=silent):
-        try:
-            with open(file_path, "rb") as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
-
-            response = ollama.chat(
-                model='llava',
-                messages=[
-                    {
-                        'role': 'user',
-                        'content': 'Describe this image and suggest a category and a new filename.',
-                        'images': [image_data]
-                    }
-                ]
-            )
-            summary = response['message']['content']
-            category, new_filename = get_new_filename(summary, file_path)
-            data_images.append({
-                "file_path": file_path,
-                "category": category,
-                "new_filename": new_filename,
-                "summary": summary
-            })
-        except Exception as e:
-            message = f"Error processing {file_path} with Ollama: {e}"
-            if silent and log_file:
-                with open(log_file, 'a') as f:
-                    f.write(message + '\n')
-            else:
-                print(message)
-    return data_images
\ No newline at end of file
+    # A generator, so requests start as soon as each image has been downscaled
+    image_items = preprocess_images(image_files)
+    return run_ollama_batch(describe_image_file_ollama, image_items, "Processing image files", silent, log_file, cache, total=len(image_files))
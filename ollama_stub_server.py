@@ -0,0 +1,142 @@
+import sys
+import json
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubOllamaServer:
+    """Local stand-in for an Ollama server, for exercising the Ollama backend without models.
+
+    Answers /api/generate and /api/chat after `latency` seconds (plus up to
+    `jitter` more). At most `parallel` requests are served at once, like
+    OLLAMA_NUM_PARALLEL; the rest wait. A `failure_rate` fraction of requests
+    fails with 503 so retries can be observed. JSON-formatted chats get a valid
+    metadata object that echoes the request's position in the response.
+    """
+
+    def __init__(self, latency=0.1, jitter=0.0, parallel=4, failure_rate=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._slots = threading.Semaphore(parallel)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path not in ('/api/generate', '/api/chat'):
+                    self._reply(404, {'error': f"unknown endpoint {self.path}"})
+                    return
+                status, payload = stub.respond(self.path, body)
+                self._reply(status, payload)
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request, e.g. after its timeout
+                    pass
+
+        return Handler
+
+    def respond(self, path, body):
+        """Build the (status, payload) for one request after simulating model latency."""
+        with self._slots:
+            with self._lock:
+                self.requests += 1
+                number = self.requests
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                fail = random.random() < self.failure_rate
+            try:
+                time.sleep(self.latency + random.uniform(0, self.jitter))
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        if fail:
+            with self._lock:
+                self.failures += 1
+            return 503, {'error': 'server busy'}
+
+        if path == '/api/chat':
+            prompt = ' '.join(message.get('content', '') for message in body.get('messages', []))
+        else:
+            prompt = body.get('prompt', '')
+        if body.get('format') == 'json':
+            text = json.dumps({
+                'description': f"Stub description of request {number}: {prompt[:80]}",
+                'filename': f"stub_file_{number}",
+                'category': 'stub category',
+            })
+        else:
+            text = f"Stub response {number}. Category: stub category. Filename: stub_file_{number}"
+
+        payload = {
+            'model': body.get('model', ''),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'done': True,
+            'done_reason': 'stop',
+            # Roughly four characters per token, like the real counts Ollama reports
+            'prompt_eval_count': len(prompt) // 4,
+            'eval_count': len(text) // 4,
+        }
+        if path == '/api/chat':
+            payload['message'] = {'role': 'assistant', 'content': text}
+        else:
+            payload['response'] = text
+        return 200, payload
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until stop() is called."""
+        self._server.serve_forever()
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3, 4):
+        print("Usage: python ollama_stub_server.py <port> [latency_seconds] [parallel]")
+        sys.exit(1)
+    server = StubOllamaServer(
+        latency=float(sys.argv[2]) if len(sys.argv) > 2 else 0.1,
+        parallel=int(sys.argv[3]) if len(sys.argv) > 3 else 4,
+        port=int(sys.argv[1]),
+    )
+    print(f"Stub Ollama server listening on {server.url}. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,81 +1,150 @@
 import os
-import base64
-from ollama import Client
+import asyncio
 from file_utils import read_file_data, separate_files_by_type
 from data_processing_common import compute_operations
 from text_data_processing import process_text_files
 from image_data_processing import process_image_files
+from metadata_cache import get_metadata_cache
+from extraction_pipeline import ExtractionPipeline
+from image_preprocessing import preprocess_images
+from log_writer import log_message
+from ollama_data_processing import read_base64
+from text_normalization import sanitize_filename
 
-def get_classification_ollama_image(client, file_path, model_name):
-    """Get classification from Ollama for a single image file."""
+async def get_classification_ollama_image(runner, file_path, model_name, cache=None, prepared_path=None):
+    """
+    Get classification from Ollama for a single image file, sending prepared_path if given.
+    Returns None if the file no longer exists; request errors are raised.
+    """
     if not os.path.exists(file_path):
-        return "File does not exist."
-    try:
-        with open(file_path, 'rb') as f:
-            image_data = f.read()
-
-        encoded_image = base64.b64encode(image_data).decode('utf-8')
-
-        response = client.generate(
-            model=model_name,
-            prompt="Suggest a concise, one or two-word folder name for the provided image.",
-            images=[encoded_image],
-            stream=False,
-        )
-        return response['response'].strip()
-    except Exception as e:
-        return f"Error processing file with Ollama: {e}"
-
-def get_classification_ollama_text(client, file_path, model_name):
-    """Get classification from Ollama for a single text file."""
+        return None
+    cache_key = None
+    if cache is not None:
+        # Hashing the file and the cache lookup block, so they run off the event loop
+        cache_key = await asyncio.to_thread(cache.make_key, file_path, 'ollama', model_name, 'classify-image')
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            return cached['foldername']
+
+    encoded_image = await asyncio.to_thread(read_base64, prepared_path or file_path)
+
+    response = await runner.call(
+        'generate',
+        model=model_name,
+        prompt="Suggest a concise, one or two-word folder name for the provided image.",
+        images=[encoded_image],
+        stream=False,
+    )
+    classification = response['response'].strip()
+    if cache is not None:
+        await asyncio.to_thread(cache.put, cache_key, '', classification, '')
+    return classification
+
+async def get_classification_ollama_text(runner, file_path, model_name, cache=None, text_content=None):
+    """
+    Get classification from Ollama for a single text file, reading it unless text_content is given.
+    Returns None if the file no longer exists or cannot be read; request errors are raised.
+    """
     if not os.path.exists(file_path):
-        return "File does not exist."
-    try:
-        text_content = read_file_data(file_path)
-        if text_content is None:
-            return "Unsupported or unreadable text file."
-
-        response = client.generate(
-            model=model_name,
-            prompt=f"Suggest a concise, one or two-word folder name for a document titled '{os.path.basename(file_path)}' with the following content:\n\n{text_content}",
-            stream=False,
-        )
-        return response['response'].strip()
-    except Exception as e:
-        return f"Error processing file with Ollama: {e}"
-
-def organize_files_with_ai(file_paths, output_path, ai_backend, client_or_model, model_name, silent_mode, log_file):
+        return None
+    cache_key = None
+    if cache is not None:
+        # Hashing the file and the cache lookup block, so they run off the event loop
+        cache_key = await asyncio.to_thread(cache.make_key, file_path, 'ollama', model_name, 'classify-text')
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            return cached['foldername']
+
+    if text_content is None:
+        text_content = await asyncio.to_thread(read_file_data, file_path)
+    if text_content is None:
+        return None
+
+    response = await runner.call(
+        'generate',
+        model=model_name,
+        prompt=f"Suggest a concise, one or two-word folder name for a document titled '{os.path.basename(file_path)}' with the following content:\n\n{text_content}",
+        stream=False,
+    )
+    classification = response['response'].strip()
+    if cache is not None:
+        await asyncio.to_thread(cache.put, cache_key, '', classification, '')
+    return classification
+
+def classification_metadata(file_path, classification):
+    """Metadata for compute_operations from a folder classification; the file keeps its own name."""
+    return {
+        'file_path': file_path,
+        'foldername': sanitize_filename(classification, max_words=2),
+        'filename': os.path.splitext(os.path.basename(file_path))[0],
+        'description': '',
+    }
+
+def organize_files_with_ai(file_paths, output_path, ai_backend, client_or_model, model_name, silent_mode, log_file, journal=None,
+                           name_index=None, extraction_executor=None):
     """
     Organize files using the selected AI backend.
+
+    With a RunJournal, files already placed by an interrupted run are skipped,
+    files it already described reuse their journaled metadata, and metadata for
+    the rest is journaled as each file is described. Callers organizing one
+    job in several batches pass the same NameIndex for every batch, and may
+    share a long-lived extraction_executor between calls.
     """
     all_data = []
+    resumed = []
+    on_result = None
+    if journal is not None:
+        file_paths, resumed = journal.pending(file_paths)
+        on_result = journal.record_result
+        if resumed:
+            log_message(f"Resuming interrupted run: reusing metadata for {len(resumed)} files", silent_mode, log_file)
     image_files, text_files = separate_files_by_type(file_paths)
+    cache = get_metadata_cache()
+
+    # Start extracting text files now so they are ready once image inference is done
+    text_pipeline = ExtractionPipeline(text_files, silent=silent_mode, log_file=log_file, executor=extraction_executor).start()
 
     if ai_backend == 'Ollama':
-        for file_path in image_files:
-            classification = get_classification_ollama_image(client_or_model, file_path, model_name)
-            all_data.append({'file_path': file_path, 'classification': classification})
+        # client_or_model is an AsyncOllamaRunner; requests for all files run concurrently
+        async def classify_image(runner, item):
+            file_path, prepared_path = item
+            classification = await get_classification_ollama_image(runner, file_path, model_name, cache=cache, prepared_path=prepared_path)
+            return None if classification is None else classification_metadata(file_path, classification)
+
+        async def classify_text(runner, item):
+            file_path, text_content = item
+            classification = await get_classification_ollama_text(runner, file_path, model_name, cache=cache, text_content=text_content)
+            return None if classification is None else classification_metadata(file_path, classification)
 
-        for file_path in text_files:
-            classification = get_classification_ollama_text(client_or_model, file_path, model_name)
-            all_data.append({'file_path': file_path, 'classification': classification})
+        def on_done(item, result):
+            if isinstance(result, Exception):
+                message = f"Error processing {item[0]} with Ollama: {result}"
+                log_message(message, silent_mode, log_file, level='error', file_path=item[0])
+            elif result is not None and on_result is not None:
+                # Journaled like the local backend's results, so a resumed run skips the request
+                on_result(result)
+
+        results = client_or_model.map(classify_image, preprocess_images(image_files), on_done)
+        results += client_or_model.map(classify_text, text_pipeline, on_done)
+        # Failed requests are logged by on_done; missing and unreadable files have no result
+        all_data.extend(result for result in results if isinstance(result, dict))
 
     else:  # Local GGUF
-        text_tuples = []
-        for fp in text_files:
-            text_content = read_file_data(fp)
-            if text_content is None:
-                message = f"Unsupported or unreadable text file format: {fp}"
-                if silent_mode:
-                    with open(log_file, 'a') as f:
-                        f.write(message + '\n')
-                else:
-                    print(message)
-                continue
-            text_tuples.append((fp, text_content))
-
-        data_images = process_image_files(image_files, client_or_model['image'], client_or_model['text'], silent=silent_mode, log_file=log_file)
-        data_texts = process_text_files(text_tuples, client_or_model['text'], silent=silent_mode, log_file=log_file)
+        # client_or_model is a ModelManager; run all images, then all text, so the
+        # vision model can be released before the text model is needed
+        data_images = []
+        data_texts = []
+        if image_files:
+            release = ('image',) if text_files else ()
+            with client_or_model.phase('images', release=release):
+                data_images = process_image_files(image_files, client_or_model.image, client_or_model.text, silent=silent_mode, log_file=log_file, cache=cache, on_result=on_result)
+        if text_files:
+            with client_or_model.phase('text'):
+                data_texts = process_text_files(text_pipeline, client_or_model.text, silent=silent_mode, log_file=log_file, cache=cache, on_result=on_result)
         all_data = data_images + data_texts
 
-    return compute_operations(all_data, output_path, set(), set())
\ No newline at end of file
+    if text_files:
+        text_pipeline.report()
+
+    return compute_operations(resumed + all_data, output_path, set(), set(), name_index=name_index)
\ No newline at end of file
@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import errno
+import shutil
+import threading
+from metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; reflinks are skipped there
+    fcntl = None
+
+FICLONE = 0x40049409  # ioctl that shares a file's extents with another (Btrfs, XFS, bcachefs)
+COPY_CHUNK_SIZE = 1024 * 1024  # Bytes per call for copy_file_range, sendfile and buffered copies
+PLACEMENT_TYPES = ('hardlink', 'symlink', 'move')
+
+# Failures meaning "this strategy cannot do this placement", after which the next one is tried
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS, errno.ENOTTY, errno.EINVAL,
+                    errno.EPERM, errno.EMLINK}
+# Of those, the ones that hold for every file between the same two filesystems
+_DEVICE_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS, errno.ENOTTY}
+
+def _reflink(src, dst, size):
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "reflinks are not supported on this platform")
+    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+def _raise_short_copy(copied, size, dst):
+    # The source ended early, e.g. it was truncated mid-copy; never report a partial file as placed
+    raise OSError(errno.EIO, f"source ended after {copied} of {size} bytes", dst.name)
+
+def _copy_file_range(src, dst, size):
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    copied = 0
+    while copied < size:
+        count = os.copy_file_range(src.fileno(), dst.fileno(), min(size - copied, COPY_CHUNK_SIZE * 64))
+        if count == 0:
+            _raise_short_copy(copied, size, dst)
+        copied += count
+
+def _sendfile(src, dst, size):
+    if not sys.platform.startswith('linux'):
+        # Elsewhere sendfile only writes to sockets
+        raise OSError(errno.ENOSYS, "sendfile cannot write to files on this platform")
+    copied = 0
+    while copied < size:
+        count = os.sendfile(dst.fileno(), src.fileno(), copied, min(size - copied, COPY_CHUNK_SIZE * 64))
+        if count == 0:
+            _raise_short_copy(copied, size, dst)
+        copied += count
+
+def _buffered_copy(src, dst, size):
+    shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+    if dst.tell() < size:
+        _raise_short_copy(dst.tell(), size, dst)
+
+# Tried in order for cross-device placements, from cheapest to most expensive
+COPY_STRATEGIES = (
+    ('reflink', _reflink),
+    ('copy_file_range', _copy_file_range),
+    ('sendfile', _sendfile),
+    ('copy', _buffered_copy),
+)
+
+def _copy_with(copier, source, destination, size):
+    """Copy into a newly created destination, removing it again if the copy fails."""
+    with open(source, 'rb') as src:
+        with open(destination, 'xb') as dst:
+            try:
+                copier(src, dst, size)
+            except BaseException:
+                dst.close()
+                os.unlink(destination)
+                raise
+    shutil.copystat(source, destination)
+
+class Placer:
+    """Places files in the output tree with the cheapest strategy that works.
+
+    A hardlink (or a rename, when files are moved) is used when source and
+    destination are on the same device. Otherwise the file is copied, trying a
+    reflink first, then copy_file_range and sendfile, which copy inside the
+    kernel, and a buffered copy last. A strategy that fails because the two
+    filesystems do not support it is not tried again for that pair of devices.
+    Counters of files, bytes and time per strategy are kept for the report.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._unsupported = {}  # (source device, destination device) -> strategies that cannot work
+        self._directory_devices = {}
+        self.stats = {}  # strategy -> [files, bytes, seconds]
+
+    def _device(self, directory):
+        device = self._directory_devices.get(directory)
+        if device is None:
+            device = os.stat(directory).st_dev
+            self._directory_devices[directory] = device
+        return device
+
+    def _record(self, strategy, size, seconds):
+        with self._lock:
+            entry = self.stats.setdefault(strategy, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += size
+            entry[2] += seconds
+        metrics.observe('link', seconds, strategy=strategy)
+        metrics.increment('files_organized', strategy=strategy)
+        metrics.increment('bytes_organized', size, strategy=strategy)
+
+    def place(self, source, destination, link_type='hardlink'):
+        """Place source at destination as link_type requests and return the strategy used.
+
+        Raises the last OSError if no strategy could place the file.
+        """
+        if link_type not in PLACEMENT_TYPES:
+            raise ValueError(f"Unknown link type {link_type!r}; expected one of {', '.join(PLACEMENT_TYPES)}")
+        if link_type == 'symlink':
+            start = time.perf_counter()
+            os.symlink(source, destination)
+            self._record('symlink', 0, time.perf_counter() - start)
+            return 'symlink'
+
+        st = os.stat(source)
+        devices = (st.st_dev, self._device(os.path.dirname(destination)))
+        unsupported = self._unsupported.get(devices, ())
+        strategies = list(COPY_STRATEGIES)
+        if devices[0] == devices[1]:
+            strategies.insert(0, ('rename', None) if link_type == 'move' else ('hardlink', None))
+
+        last_error = None
+        for strategy, copier in strategies:
+            if strategy in unsupported:
+                continue
+            start = time.perf_counter()
+            try:
+                if strategy == 'hardlink':
+                    os.link(source, destination)
+                elif strategy == 'rename':
+                    # os.rename would silently replace an existing destination
+                    if os.path.lexists(destination):
+                        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+                    os.rename(source, destination)
+                else:
+                    _copy_with(copier, source, destination, st.st_size)
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+                if e.errno in _DEVICE_ERRNOS:
+                    with self._lock:
+                        self._unsupported.setdefault(devices, set()).add(strategy)
+                last_error = e
+                continue
+            if link_type == 'move' and strategy != 'rename':
+                os.unlink(source)
+            self._record(strategy, st.st_size, time.perf_counter() - start)
+            return strategy
+        raise last_error or OSError(errno.EXDEV, "no placement strategy could place the file", destination)
+
+    def format_stats(self):
+        """One line per strategy with its file count, bytes and throughput."""
+        lines = []
+        with self._lock:
+            stats = sorted(self.stats.items(), key=lambda item: -item[1][0])
+        for strategy, (files, size, seconds) in stats:
+            line = f"  {strategy}: {files} files, {size / 2**20:.1f} MiB"
+            if seconds > 0:
+                line += f", {files / seconds:.0f} files/s, {size / 2**20 / seconds:.1f} MiB/s"
+            lines.append(line)
+        return lines
@@ -0,0 +1,153 @@
+import os
+import time
+import sqlite3
+import threading
+import config
+
+JOURNAL_FILENAME = '.organizer_journal.sqlite3'
+
+class RunJournal:
+    """Checkpoint journal of an organizing run into one output directory, so an interrupted run can resume.
+
+    The generated metadata of every described file and every placed operation
+    is appended as it happens. Records are committed as one SQLite transaction
+    per batch of commit_every records or commit_interval seconds, whichever
+    comes first, so a crash loses at most one batch and fsync cost stays
+    bounded. A resumed run reuses the metadata of files unchanged since they
+    were described and skips files already placed. finish() clears the journal
+    once the run has completed.
+    """
+
+    def __init__(self, output_path, mode, commit_every=None, commit_interval=None):
+        os.makedirs(output_path, exist_ok=True)
+        self.db_path = os.path.join(output_path, JOURNAL_FILENAME)
+        self.mode = mode
+        self.commit_every = config.JOURNAL_COMMIT_EVERY if commit_every is None else commit_every
+        self.commit_interval = config.JOURNAL_COMMIT_INTERVAL if commit_interval is None else commit_interval
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Commits are batched, so syncing each one is affordable and survives power loss too
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'mode TEXT NOT NULL, '
+            'file_path TEXT NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'mtime_ns INTEGER NOT NULL, '
+            'foldername TEXT NOT NULL, '
+            'filename TEXT NOT NULL, '
+            'description TEXT, '
+            'PRIMARY KEY (mode, file_path))'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS placed ('
+            'mode TEXT NOT NULL, '
+            'source TEXT NOT NULL, '
+            'destination TEXT NOT NULL, '
+            'link_type TEXT NOT NULL, '
+            'PRIMARY KEY (mode, source))'
+        )
+        self._conn.commit()
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+            self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def counts(self):
+        """Return (files described, files placed) recorded for this mode."""
+        with self._lock:
+            described = self._conn.execute('SELECT COUNT(*) FROM results WHERE mode = ?', (self.mode,)).fetchone()[0]
+            placed = self._conn.execute('SELECT COUNT(*) FROM placed WHERE mode = ?', (self.mode,)).fetchone()[0]
+        return described, placed
+
+    def placed_sources(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT source FROM placed WHERE mode = ?', (self.mode,)).fetchall()
+        return {row[0] for row in rows}
+
+    def placed_operations(self):
+        """Operations placed by earlier, interrupted attempts at this run."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT source, destination, link_type FROM placed WHERE mode = ?', (self.mode,)
+            ).fetchall()
+        return [{'source': source, 'destination': destination, 'link_type': link_type} for source, destination, link_type in rows]
+
+    def pending(self, file_paths):
+        """Split file_paths into files still to describe and the journaled metadata of the rest.
+
+        Files already placed are dropped from both, since there is nothing left to do for them.
+        """
+        placed = self.placed_sources()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT file_path, size, mtime_ns, foldername, filename, description FROM results WHERE mode = ?',
+                (self.mode,)
+            ).fetchall()
+        described = {row[0]: row[1:] for row in rows}
+        to_describe = []
+        resumed = []
+        for file_path in file_paths:
+            if file_path in placed:
+                continue
+            row = described.get(file_path)
+            if row is not None:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                if (st.st_size, st.st_mtime_ns) == row[:2]:
+                    resumed.append({'file_path': file_path, 'foldername': row[2], 'filename': row[3], 'description': row[4]})
+                    continue
+            to_describe.append(file_path)
+        return to_describe, resumed
+
+    def record_result(self, data):
+        """Append the generated metadata for one file."""
+        try:
+            st = os.stat(data['file_path'])
+        except OSError:
+            return
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (mode, file_path, size, mtime_ns, foldername, filename, description) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self.mode, data['file_path'], st.st_size, st.st_mtime_ns, data['foldername'], data['filename'], data.get('description'))
+            )
+            self._maybe_commit()
+
+    def record_placed(self, operation):
+        """Append an operation that has been carried out."""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO placed (mode, source, destination, link_type) VALUES (?, ?, ?, ?)',
+                (self.mode, operation['source'], operation['destination'], operation['link_type'])
+            )
+            self._maybe_commit()
+
+    def flush(self):
+        """Commit everything recorded so far."""
+        with self._lock:
+            self._commit()
+
+    def finish(self):
+        """Clear the journal for this mode once the run has completed."""
+        with self._lock:
+            self._conn.execute('DELETE FROM results WHERE mode = ?', (self.mode,))
+            self._conn.execute('DELETE FROM placed WHERE mode = ?', (self.mode,))
+            self._commit()
+
+    def close(self):
+        """Commit outstanding records and close the journal."""
+        with self._lock:
+            self._commit()
+            self._conn.close()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import config
+import directory_watcher
+from watch_snapshot import WatchSnapshot
+
+class OrganizeBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.input_path = os.path.join(self.directory, 'input')
+        os.makedirs(self.input_path)
+        self.snapshot = WatchSnapshot(os.path.join(self.directory, 'snapshot.sqlite3'))
+        self.addCleanup(self.snapshot.close)
+
+    def make_file(self, name):
+        path = os.path.join(self.input_path, name)
+        with open(path, 'w') as f:
+            f.write(name)
+        return path
+
+    def handler(self, mode):
+        with mock.patch.object(config, 'WATCH_CHECK_DUPLICATES', False), mock.patch.object(config, 'WATCH_CATCH_UP', False):
+            handler = directory_watcher.WatcherEventHandler(os.path.join(self.directory, 'output'), mode, True, None)
+        handler.snapshot = self.snapshot
+        return handler
+
+    def test_only_placed_and_skipped_files_are_recorded(self):
+        self.snapshot.reconcile(self.input_path)
+        placed = self.make_file('placed.txt')
+        failed = self.make_file('failed.pdf')
+        hidden = self.make_file('.hidden.txt')
+        handler = self.handler(config.TYPE_MODE)
+
+        def execute(operations, **kwargs):
+            return [operation for operation in operations if operation['source'] != failed]
+
+        with mock.patch.object(directory_watcher, 'execute_operations', side_effect=execute):
+            handler.organize_batch([placed, failed, hidden])
+
+        paths, _ = self.snapshot.reconcile(self.input_path)
+        self.assertEqual(paths, [failed])
+
+    def test_content_mode_retries_supported_files_without_metadata(self):
+        self.snapshot.reconcile(self.input_path)
+        unreadable = self.make_file('unreadable.docx')
+        unsupported = self.make_file('archive.zip')
+        handler = self.handler(config.CONTENT_MODE)
+
+        with mock.patch.object(directory_watcher, 'organize_files_with_ai', return_value=[]), \
+                mock.patch.object(directory_watcher, 'execute_operations', return_value=[]):
+            handler.organize_batch([unreadable, unsupported])
+
+        paths, _ = self.snapshot.reconcile(self.input_path)
+        self.assertEqual(paths, [unreadable])
+
+    def test_deleted_files_leave_the_duplicate_index(self):
+        handler = self.handler(config.TYPE_MODE)
+        handler.hash_index = mock.Mock()
+        path = self.make_file('gone.txt')
+        handler.on_deleted(mock.Mock(is_directory=False, src_path=path))
+        handler.hash_index.remove_path.assert_called_once_with(path)
+
+if __name__ == '__main__':
+    unittest.main()
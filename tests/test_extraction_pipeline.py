@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+import extraction_pipeline
+from extraction_pipeline import ExtractionPipeline
+
+def crash_on_poison(file_path):
+    """Stands in for read_file_timed; the worker dies outright on files named poison."""
+    if os.path.basename(file_path).startswith('poison'):
+        os._exit(1)
+    with open(file_path) as f:
+        return f.read(), 0.0
+
+class ExtractionPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(extraction_pipeline, 'read_file_timed', crash_on_poison)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_files(self, count, poison_at):
+        paths = []
+        for i in range(count):
+            path = os.path.join(self.directory, f"{'poison' if i == poison_at else 'file'}{i}.txt")
+            with open(path, 'w') as f:
+                f.write(f"text {i}")
+            paths.append(path)
+        return paths
+
+    def test_owned_pool_is_replaced_after_a_worker_dies(self):
+        paths = self.make_files(40, poison_at=5)
+        pipeline = ExtractionPipeline(paths, max_workers=2, max_queue_size=4, silent=True)
+        results = dict(pipeline)
+        stats = pipeline.stats()
+        self.assertEqual(stats['extracted'] + stats['unreadable'], len(paths))
+        self.assertNotIn(paths[5], results)
+        # Only the files in flight when the worker died are lost
+        self.assertLessEqual(stats['unreadable'], 4)
+        self.assertEqual(results[paths[-1]], 'text 39')
+
+    def test_shared_pool_failure_does_not_hang_the_consumer(self):
+        paths = self.make_files(20, poison_at=3)
+        executor = ProcessPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown, wait=False)
+        pipeline = ExtractionPipeline(paths, max_queue_size=4, silent=True, executor=executor)
+        results = dict(pipeline)
+        stats = pipeline.stats()
+        self.assertEqual(stats['extracted'] + stats['unreadable'], len(paths))
+        self.assertNotIn(paths[3], results)
+
+if __name__ == '__main__':
+    unittest.main()
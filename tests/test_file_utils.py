@@ -0,0 +1,48 @@
+import os
+import csv
+import shutil
+import tempfile
+import unittest
+from file_utils import _sample_csv
+
+class SampleCsvTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_csv(self, rows, header=('id', 'name', 'notes')):
+        path = os.path.join(self.directory, 'table.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return path
+
+    def test_quoted_multiline_fields_stay_whole(self):
+        path = self.write_csv([(i, f"name{i}", 'line one\nline two, "quoted"\nline three') for i in range(5000)])
+        df, row_count, exact = _sample_csv(path, 20, 10)
+        self.assertEqual(list(df['id']), list(range(20)))
+        self.assertFalse(exact)
+        self.assertAlmostEqual(row_count, 5000, delta=600)
+
+    def test_strided_samples_inside_quoted_fields_are_dropped(self):
+        path = self.write_csv([(i, f"name{i}", 'short' if i < 100 else 'a\nb,c\nd') for i in range(5000)])
+        df, row_count, exact = _sample_csv(path, 20, 10)
+        self.assertEqual(list(df['id']), list(range(20)))
+        self.assertIsNone(row_count)
+
+    def test_strided_samples_of_plain_csv(self):
+        path = self.write_csv([(i, f"name{i}", 'note') for i in range(20000)])
+        df, row_count, exact = _sample_csv(path, 20, 10)
+        self.assertEqual(len(df), 30)
+        self.assertTrue(all(isinstance(value, int) for value in df['id'].tolist()))
+        self.assertAlmostEqual(row_count, 20000, delta=2000)
+
+    def test_small_file_is_counted_exactly(self):
+        path = self.write_csv([(i, f"name{i}", 'x\ny') for i in range(5)])
+        df, row_count, exact = _sample_csv(path, 20, 10)
+        self.assertTrue(exact)
+        self.assertEqual(row_count, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+import config
+import image_preprocessing
+from image_preprocessing import prepare_image, preprocess_images, prune_thumbnail_cache
+
+class ThumbnailCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache_dir = os.path.join(self.directory, 'thumbnails')
+
+    def make_image(self, name, color):
+        path = os.path.join(self.directory, name)
+        Image.new('RGB', (64, 48), color).save(path)
+        return path
+
+    def test_prunes_least_recently_used_thumbnails(self):
+        thumbnails = []
+        for age, color in enumerate(['red', 'green', 'blue']):
+            thumbnail = prepare_image(self.make_image(f"{color}.png", color), cache_dir=self.cache_dir)
+            # Red was used first, blue last
+            os.utime(thumbnail, (1000 + age * 100, 1000 + age * 100))
+            thumbnails.append(thumbnail)
+        red, green, blue = thumbnails
+        # Using the red thumbnail again makes it the most recent
+        self.assertEqual(prepare_image(os.path.join(self.directory, 'red.png'), cache_dir=self.cache_dir), red)
+
+        green_size = os.path.getsize(green)
+        removed = prune_thumbnail_cache(self.cache_dir, max_bytes=os.path.getsize(red) + os.path.getsize(blue))
+
+        self.assertEqual(removed, green_size)
+        self.assertTrue(os.path.exists(red))
+        self.assertFalse(os.path.exists(green))
+        self.assertTrue(os.path.exists(blue))
+
+    def test_cache_within_limit_is_untouched(self):
+        thumbnail = prepare_image(self.make_image('red.png', 'red'), cache_dir=self.cache_dir)
+        self.assertEqual(prune_thumbnail_cache(self.cache_dir, max_bytes=10 ** 9), 0)
+        self.assertTrue(os.path.exists(thumbnail))
+
+    def test_cache_is_scanned_only_when_it_may_be_over_the_limit(self):
+        colors = ['red', 'green', 'blue', 'white', 'black', 'yellow']
+        images = [self.make_image(f"{color}.png", color) for color in colors]
+        thumbnail_size = os.path.getsize(prepare_image(images[0], cache_dir=self.cache_dir))
+        settings = {'THUMBNAIL_CACHE_DIR': self.cache_dir, 'THUMBNAIL_CACHE_MAX_BYTES': thumbnail_size * 4,
+                    'IMAGE_PREPROCESSING': True}
+        with mock.patch.multiple(config, **settings), \
+                mock.patch.object(image_preprocessing, '_scan_cache', wraps=image_preprocessing._scan_cache) as scan:
+            self.addCleanup(image_preprocessing._cache_bytes.pop, self.cache_dir, None)
+            list(preprocess_images(images[:1]))
+            self.assertEqual(scan.call_count, 1)
+            for image in images[1:4]:
+                list(preprocess_images([image]))
+            # Four thumbnails fit, so the running total alone is checked
+            self.assertEqual(scan.call_count, 1)
+            list(preprocess_images(images[4:5]))
+            self.assertEqual(scan.call_count, 2)
+        total, _ = image_preprocessing._scan_cache(self.cache_dir)
+        self.assertLessEqual(total, thumbnail_size * 4)
+        self.assertEqual(image_preprocessing._cache_bytes[self.cache_dir], total)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import config
+from data_processing_common import compute_operations, execute_operations, process_files_by_type
+from manifest import FileManifest, remove_previous_outputs
+from name_index import NameIndex
+
+class IncrementalRerunTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.output_path = os.path.join(self.directory, 'output')
+        self.manifest = FileManifest(self.output_path)
+        self.addCleanup(self.manifest.close)
+        self.source = os.path.join(self.directory, 'notes.txt')
+        self.write('first draft')
+
+    def write(self, text):
+        with open(self.source, 'w') as f:
+            f.write(text)
+
+    def modify(self, text):
+        # Replace the file, as editors do, so the old output no longer shares its inode
+        os.unlink(self.source)
+        self.write(text)
+        st = os.stat(self.source)
+        os.utime(self.source, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    def organize_by_type(self):
+        file_paths, _ = self.manifest.filter_changed([self.source], config.TYPE_MODE)
+        previous = self.manifest.previous_destinations(file_paths, config.TYPE_MODE)
+        operations = process_files_by_type(file_paths, self.output_path, silent=True)
+        remove_previous_outputs(operations, previous)
+        completed = execute_operations(operations, silent=True)
+        self.manifest.record_operations(completed, config.TYPE_MODE)
+        return completed
+
+    def test_modified_file_is_placed_again(self):
+        destination = self.organize_by_type()[0]['destination']
+        self.modify('second draft')
+
+        completed = self.organize_by_type()
+
+        self.assertEqual([operation['destination'] for operation in completed], [destination])
+        with open(destination) as f:
+            self.assertEqual(f.read(), 'second draft')
+        self.assertEqual(self.organize_by_type(), [])
+
+    def test_modified_file_keeps_its_name_in_content_mode(self):
+        data = [{'file_path': self.source, 'foldername': 'drafts', 'filename': 'notes'}]
+        completed = execute_operations(compute_operations(data, self.output_path, set(), set()), silent=True)
+        self.manifest.record_operations(completed, config.CONTENT_MODE)
+        self.modify('second draft')
+
+        file_paths, _ = self.manifest.filter_changed([self.source], config.CONTENT_MODE)
+        previous = self.manifest.previous_destinations(file_paths, config.CONTENT_MODE)
+        name_index = NameIndex()
+        for destination in previous.values():
+            name_index.release(destination)
+        operations = compute_operations(data, self.output_path, set(), set(), name_index=name_index)
+        self.assertEqual(operations[0]['destination'], completed[0]['destination'])
+        remove_previous_outputs(operations, previous)
+        self.assertEqual(len(execute_operations(operations, silent=True)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from metadata_cache import MetadataCache
+
+class MetadataCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db_path = os.path.join(directory, 'cache.sqlite3')
+
+    def table_totals(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM metadata').fetchone()
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = MetadataCache(self.db_path, max_entries=3, max_bytes=10 ** 9)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, 'description', 'folder', 'file')
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', 'description', 'folder', 'file')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.close()
+
+    def test_tracked_totals_match_the_table(self):
+        cache = MetadataCache(self.db_path, max_entries=50, max_bytes=2000)
+        for i in range(200):
+            cache.put(f"key{i % 120}", 'x' * (i % 37), 'folder', 'file')
+        stats = cache.stats()
+        cache.close()
+        self.assertEqual((stats['entries'], stats['bytes']), self.table_totals())
+        self.assertLessEqual(stats['entries'], 50)
+        self.assertLessEqual(stats['bytes'], 2000)
+
+    def test_hit_access_times_survive_reopening(self):
+        cache = MetadataCache(self.db_path, max_entries=2, max_bytes=10 ** 9)
+        cache.put('old', 'description', 'folder', 'file')
+        cache.put('new', 'description', 'folder', 'file')
+        cache.get('old')
+        cache.close()
+        cache = MetadataCache(self.db_path, max_entries=2, max_bytes=10 ** 9)
+        cache.put('newest', 'description', 'folder', 'file')
+        self.assertIsNotNone(cache.get('old'))
+        self.assertIsNone(cache.get('new'))
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import time
+import unittest
+from ollama import ResponseError
+from ollama_async import AsyncOllamaRunner, is_retryable
+from ollama_stub_server import StubOllamaServer
+
+class FailingStubServer(StubOllamaServer):
+    """Stub server whose first `failures_first` requests fail with 503."""
+
+    def __init__(self, failures_first=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures_first = failures_first
+
+    def respond(self, path, body):
+        with self._lock:
+            fail = self.failures_first > 0
+            self.failures_first -= 1
+        if fail:
+            with self._lock:
+                self.requests += 1
+                self.failures += 1
+            return 503, {'error': 'server busy'}
+        return super().respond(path, body)
+
+async def echo(runner, item):
+    """Send item as the prompt and return the prompt the stub echoes back."""
+    response = await runner.call('generate', model='stub', prompt=str(item), format='json', stream=False)
+    return json.loads(response['response'])['description'].split(': ', 1)[1]
+
+class AsyncOllamaRunnerTest(unittest.TestCase):
+    def start_server(self, server):
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_results_keep_input_order_within_concurrency_limit(self):
+        server = self.start_server(StubOllamaServer(latency=0.02, jitter=0.05, parallel=8))
+        runner = AsyncOllamaRunner(host=server.url, concurrency=3, retries=0)
+        items = [f"item-{i}" for i in range(20)]
+        self.assertEqual(runner.map(echo, items), items)
+        self.assertLessEqual(server.max_in_flight, 3)
+        self.assertIsNone(runner.client)
+
+    def test_items_are_pulled_only_when_a_worker_is_free(self):
+        server = self.start_server(StubOllamaServer(latency=0.1, parallel=8))
+        runner = AsyncOllamaRunner(host=server.url, concurrency=2, retries=0)
+        pulled = []
+        pulled_at_first_result = []
+
+        def producer():
+            for i in range(10):
+                pulled.append(i)
+                yield i
+
+        def on_done(item, result):
+            if not pulled_at_first_result:
+                pulled_at_first_result.append(len(pulled))
+
+        results = runner.map(echo, producer(), on_done)
+        self.assertEqual(results, [str(i) for i in range(10)])
+        self.assertEqual(pulled_at_first_result, [2])
+
+    def test_503_is_retried(self):
+        server = self.start_server(FailingStubServer(failures_first=2, latency=0.0))
+        runner = AsyncOllamaRunner(host=server.url, concurrency=1, retries=3, backoff=0.01)
+        self.assertEqual(runner.map(echo, ['a']), ['a'])
+        self.assertEqual(runner.retried, 2)
+        self.assertEqual(server.failures, 2)
+
+    def test_503_fails_once_retries_are_exhausted(self):
+        server = self.start_server(FailingStubServer(failures_first=5, latency=0.0))
+        runner = AsyncOllamaRunner(host=server.url, concurrency=1, retries=1, backoff=0.01)
+        results = runner.map(echo, ['a', 'b', 'c'])
+        self.assertIsInstance(results[0], ResponseError)
+        self.assertIsInstance(results[1], ResponseError)
+        # Two attempts per item, so the fifth failure is the first attempt at 'c'
+        self.assertEqual(results[2], 'c')
+
+    def test_timeouts_are_retried_then_reported(self):
+        server = self.start_server(StubOllamaServer(latency=0.5, parallel=4))
+        runner = AsyncOllamaRunner(host=server.url, concurrency=2, timeout=0.1, retries=1, backoff=0.01)
+        start = time.monotonic()
+        results = runner.map(echo, ['a', 'b'])
+        self.assertLess(time.monotonic() - start, 0.5)
+        for result in results:
+            self.assertIsInstance(result, TimeoutError)
+        self.assertEqual(runner.retried, 2)
+
+    def test_bad_requests_are_not_retried(self):
+        self.assertFalse(is_retryable(ResponseError('bad request', 400)))
+        self.assertTrue(is_retryable(ResponseError('busy', 503)))
+        self.assertTrue(is_retryable(TimeoutError()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+import config
+from ollama_async import AsyncOllamaRunner
+from ollama_stub_server import StubOllamaServer
+from organize_files import organize_files_with_ai
+from run_journal import RunJournal
+
+class OllamaOrganizeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.output_path = os.path.join(self.directory, 'output')
+        for name, value in (('CACHE_ENABLED', False), ('IMAGE_PREPROCESSING', False), ('EXTRACTION_WORKERS', 0)):
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.server = StubOllamaServer(latency=0.01, parallel=4).start()
+        self.addCleanup(self.server.stop)
+
+    def make_files(self):
+        notes = os.path.join(self.directory, 'notes.txt')
+        with open(notes, 'w') as f:
+            f.write('Meeting notes about the quarterly budget.')
+        photo = os.path.join(self.directory, 'photo.png')
+        Image.new('RGB', (16, 16), 'red').save(photo)
+        missing = os.path.join(self.directory, 'missing.txt')
+        return [notes, photo, missing]
+
+    def test_classifications_become_operations(self):
+        notes, photo, missing = self.make_files()
+        runner = AsyncOllamaRunner(host=self.server.url, retries=0)
+        operations = organize_files_with_ai([notes, photo, missing], self.output_path, 'Ollama', runner, 'stub', True, None)
+
+        by_source = {operation['source']: operation for operation in operations}
+        self.assertEqual(sorted(by_source), sorted([notes, photo]))
+        self.assertEqual(by_source[notes]['new_file_name'], 'notes.txt')
+        self.assertEqual(by_source[photo]['new_file_name'], 'photo.png')
+        for operation in operations:
+            self.assertEqual(operation['folder_name'], 'stub_response')
+            self.assertEqual(os.path.dirname(operation['destination']), os.path.join(self.output_path, 'stub_response'))
+
+    def test_resumed_run_reuses_journaled_classifications(self):
+        notes, photo, missing = self.make_files()
+        runner = AsyncOllamaRunner(host=self.server.url, retries=0)
+        journal = RunJournal(self.output_path, config.CONTENT_MODE, commit_every=1)
+        first = organize_files_with_ai([notes, photo], self.output_path, 'Ollama', runner, 'stub', True, None, journal=journal)
+        journal.close()
+        requests = self.server.requests
+
+        journal = RunJournal(self.output_path, config.CONTENT_MODE)
+        self.addCleanup(journal.close)
+        resumed = organize_files_with_ai([notes, photo], self.output_path, 'Ollama', runner, 'stub', True, None, journal=journal)
+
+        self.assertEqual(self.server.requests, requests)
+        self.assertEqual(sorted(operation['destination'] for operation in resumed),
+                         sorted(operation['destination'] for operation in first))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import errno
+import shutil
+import tempfile
+import unittest
+from placement import COPY_STRATEGIES, _copy_with
+
+class ShortCopyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.source = os.path.join(self.directory, 'source.bin')
+        with open(self.source, 'wb') as f:
+            f.write(b'x' * 1000)
+
+    def test_source_shorter_than_expected_is_not_placed(self):
+        for strategy, copier in COPY_STRATEGIES:
+            if strategy == 'reflink':
+                continue
+            with self.subTest(strategy=strategy):
+                destination = os.path.join(self.directory, f"{strategy}.bin")
+                try:
+                    # As if the source was truncated after it was stat'ed at 4000 bytes
+                    _copy_with(copier, self.source, destination, 4000)
+                except OSError as e:
+                    if e.errno == errno.ENOSYS:
+                        self.skipTest(f"{strategy} is not available here")
+                    self.assertEqual(e.errno, errno.EIO)
+                else:
+                    self.fail(f"{strategy} placed a truncated copy")
+                self.assertFalse(os.path.exists(destination))
+
+    def test_complete_copies_succeed(self):
+        for strategy, copier in COPY_STRATEGIES[1:]:
+            with self.subTest(strategy=strategy):
+                destination = os.path.join(self.directory, f"{strategy}.bin")
+                try:
+                    _copy_with(copier, self.source, destination, 1000)
+                except OSError as e:
+                    if e.errno == errno.ENOSYS:
+                        continue
+                    raise
+                self.assertEqual(os.path.getsize(destination), 1000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,17 @@
+import unittest
+from benchmarks import startup
+
+# Generous next to the ~100 ms measured locally, so slow machines do not flake
+STARTUP_BUDGET_SECONDS = 1.0
+
+class StartupBudgetTest(unittest.TestCase):
+    def test_no_heavy_module_is_imported_with_main(self):
+        _, heavy_loaded = startup.import_report()
+        self.assertEqual(heavy_loaded, [])
+
+    def test_main_menu_appears_within_budget(self):
+        best = min(startup.time_to_menu() for _ in range(3))
+        self.assertLessEqual(best, STARTUP_BUDGET_SECONDS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import unittest
+from unittest import mock
+import text_normalization
+from text_normalization import TEXT_NORMALIZER, IMAGE_NORMALIZER
+from text_data_processing import generate_text_metadata_structured
+from image_data_processing import generate_image_metadata_structured
+
+class IdentityLemmatizer:
+    def lemmatize(self, word):
+        return word
+
+class FakeModel:
+    model_path = 'fake.gguf'
+
+    def __init__(self, content):
+        self.content = content
+
+    def create_chat_completion(self, **kwargs):
+        return {'choices': [{'message': {'content': self.content}}]}
+
+class TextNormalizerTest(unittest.TestCase):
+    def setUp(self):
+        # The NLTK corpora may not be installed; the cleanup itself is what is tested
+        for name, value in (('stop_words', lambda: frozenset({'of', 'over'})), ('_lemmatizer', IdentityLemmatizer)):
+            patcher = mock.patch.object(text_normalization, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for normalizer in (TEXT_NORMALIZER, IMAGE_NORMALIZER):
+            self.addCleanup(setattr, normalizer, '_all_unwanted', None)
+            normalizer._all_unwanted = None
+        text_normalization.lemmatize.cache_clear()
+        self.addCleanup(text_normalization.lemmatize.cache_clear)
+
+    def test_underscore_joined_words_are_kept(self):
+        self.assertEqual(TEXT_NORMALIZER.clean('fundamentals_of_string_theory', max_words=3), 'fundamentals_string_theory')
+
+    def test_structured_text_response_keeps_its_filename(self):
+        response = json.dumps({'description': 'A research paper on the fundamentals of string theory.',
+                               'filename': 'fundamentals_of_string_theory', 'category': 'physics'})
+        metadata = generate_text_metadata_structured('text', '/docs/paper.pdf', mock.Mock(), None, FakeModel(response))
+        self.assertEqual(metadata[:2], ('physics', 'fundamentals_string_theory'))
+
+    def test_structured_image_response_keeps_its_filename(self):
+        response = json.dumps({'description': 'A photo of a sunset over the mountains.',
+                               'filename': 'sunset_over_mountains', 'category': 'landscapes'})
+        metadata = generate_image_metadata_structured('/photos/IMG_0001.jpg', mock.Mock(), None, FakeModel(response))
+        self.assertEqual(metadata[:2], ('landscapes', 'sunset_mountains'))
+
+class MissingNltkDataTest(unittest.TestCase):
+    def setUp(self):
+        for cached in (text_normalization.stop_words, text_normalization._lemmatizer, text_normalization.lemmatize):
+            cached.cache_clear()
+            self.addCleanup(cached.cache_clear)
+        text_normalization.TEXT_NORMALIZER._all_unwanted = None
+        self.addCleanup(setattr, text_normalization.TEXT_NORMALIZER, '_all_unwanted', None)
+
+    def test_names_are_cleaned_without_the_corpora(self):
+        missing = mock.Mock(**{'words.side_effect': LookupError, 'lemmatize.side_effect': LookupError})
+        with mock.patch('nltk.corpus.stopwords', missing), mock.patch('nltk.stem.WordNetLemmatizer', return_value=missing):
+            self.assertEqual(text_normalization.TEXT_NORMALIZER.finalize('quarterly_budget_report', 'finance', 'desc', '/x/a.txt'),
+                             ('finance', 'quarterly_budget_report', 'desc'))
+
+if __name__ == '__main__':
+    unittest.main()
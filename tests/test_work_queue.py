@@ -0,0 +1,59 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from work_queue import DebouncedWorkQueue
+
+class DebouncedWorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'report.txt')
+        with open(self.path, 'w') as f:
+            f.write('first')
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("timed out waiting for the queue")
+            time.sleep(0.01)
+
+    def test_change_during_processing_is_processed_again(self):
+        started = threading.Event()
+        release = threading.Event()
+        seen = []
+
+        def process_batch(paths):
+            with open(paths[0]) as f:
+                seen.append(f.read())
+            started.set()
+            release.wait(5)
+
+        queue = DebouncedWorkQueue(process_batch, num_workers=1, batch_size=1, settle_seconds=0.05, poll_interval=0.01).start()
+        self.addCleanup(queue.stop, 5)
+        queue.submit(self.path)
+        self.assertTrue(started.wait(5))
+
+        with open(self.path, 'w') as f:
+            f.write('second')
+        queue.submit(self.path)
+        release.set()
+
+        self.wait_for(lambda: queue.stats()['processed'] == 2)
+        self.assertEqual(seen, ['first', 'second'])
+
+    def test_unchanged_path_is_processed_once(self):
+        seen = []
+        queue = DebouncedWorkQueue(seen.extend, num_workers=1, batch_size=4, settle_seconds=0.05, poll_interval=0.01).start()
+        self.addCleanup(queue.stop, 5)
+        for _ in range(3):
+            queue.submit(self.path)
+        self.wait_for(lambda: queue.stats()['processed'] == 1)
+        time.sleep(0.2)
+        self.assertEqual(seen, [self.path])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,13 @@
 import re
 import os
 import time
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
-from nltk.stem import WordNetLemmatizer
 from rich.progress import Progress, TextColumn, BarColumn, TimeElapsedColumn
-from data_processing_common import sanitize_filename
+import config
+from data_processing_common import parse_metadata_json, METADATA_JSON_SCHEMA
+from text_normalization import TEXT_NORMALIZER
+from metadata_cache import get_model_name
+from metrics import metrics
+from log_writer import log_message
 
 def summarize_text_content(text, text_inference):
     """Summarize the given text content."""
@@ -18,37 +18,61 @@ Text: {text}
 
 Summary:"""
 
-    response = text_inference.create_completion(prompt)
+    with metrics.span('llm_call', model=get_model_name(text_inference)) as span:
+        response = text_inference.create_completion(prompt)
+        span.record_usage(response)
     if response['choices'] and response['choices'][0]['text']:
         summary = response['choices'][0]['text'].strip()
     else:
         summary = ""
     return summary
 
-def process_single_text_file(args, text_inference, silent=False, log_file=None):
+def process_single_text_file(args, text_inference, silent=False, log_file=None, cache=None):
     """Process a single text file to generate metadata."""
     file_path, text = args
     start_time = time.time()
 
-    # Create a Progress instance for this file
-    with Progress(
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TimeElapsedColumn()
-    ) as progress:
-        task_id = progress.add_task(f"Processing {os.path.basename(file_path)}", total=1.0)
-        foldername, filename, description = generate_text_metadata(text, file_path, progress, task_id, text_inference)
+    structured = config.STRUCTURED_OUTPUT
+    method = 'structured' if structured else 'three-step'
+
+    # Reuse metadata generated for identical content on a previous run
+    cache_key = None
+    cached = None
+    if cache is not None:
+        task = 'text-json' if structured else 'text'
+        cache_key = cache.make_key(file_path, 'gguf', get_model_name(text_inference), task)
+        cached = cache.get(cache_key)
+
+    if cached is not None:
+        foldername, filename, description = cached['foldername'], cached['filename'], cached['description']
+        method = 'cached'
+    else:
+        # Create a Progress instance for this file
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TimeElapsedColumn()
+        ) as progress:
+            task_id = progress.add_task(f"Processing {os.path.basename(file_path)}", total=1.0)
+            result = None
+            if structured:
+                result = generate_text_metadata_structured(text, file_path, progress, task_id, text_inference)
+                if result is None:
+                    # The JSON response could not be parsed; fall back to one call per field
+                    method = 'three-step fallback'
+                    progress.update(task_id, completed=0)
+            if result is None:
+                result = generate_text_metadata(text, file_path, progress, task_id, text_inference)
+            foldername, filename, description = result
+        if cache is not None:
+            cache.put(cache_key, description, foldername, filename)
 
     end_time = time.time()
     time_taken = end_time - start_time
 
-    message = f"File: {file_path}\nTime taken: {time_taken:.2f} seconds\nDescription: {description}\nFolder name: {foldername}\nGenerated filename: {filename}\n"
-    if silent:
-        if log_file:
-            with open(log_file, 'a') as f:
-                f.write(message + '\n')
-    else:
-        print(message)
+    message = f"File: {file_path}\nTime taken: {time_taken:.2f} seconds ({method})\nDescription: {description}\nFolder name: {foldername}\nGenerated filename: {filename}\n"
+    log_message(message, silent, log_file, file_path=file_path, seconds=round(time_taken, 3), method=method,
+                description=description, foldername=foldername, filename=filename)
     return {
         'file_path': file_path,
         'foldername': foldername,
@@ -56,14 +80,50 @@ def process_single_text_file(args, text_inference, silent=False, log_file=None):
         'description': description
     }
 
-def process_text_files(text_tuples, text_inference, silent=False, log_file=None):
-    """Process text files sequentially."""
+def process_text_files(text_tuples, text_inference, silent=False, log_file=None, cache=None, on_result=None):
+    """Process text files sequentially, calling on_result(data) as soon as each one has been described."""
     results = []
     for args in text_tuples:
-        data = process_single_text_file(args, text_inference, silent=silent, log_file=log_file)
+        data = process_single_text_file(args, text_inference, silent=silent, log_file=log_file, cache=cache)
         results.append(data)
+        if on_result is not None:
+            on_result(data)
     return results
 
+def generate_text_metadata_structured(input_text, file_path, progress, task_id, text_inference):
+    """Generate description, folder name, and filename for a text document with a single JSON completion.
+
+    Returns None if the response cannot be parsed, so the caller can fall back to generate_text_metadata.
+    """
+    prompt = f"""Read the text below and respond with a JSON object with these keys:
+"description": a concise and accurate summary of the main ideas and key details, limited to 150 words.
+"filename": a specific and descriptive filename of at most 3 words that captures the essence of the document. Use nouns, avoid starting with verbs like 'depicts', 'shows', 'presents', and do not include data type words like 'text', 'document', 'pdf'. Connect words with underscores.
+"category": a general category or theme of at most 2 words that best represents the main subject, used as the folder name. Use nouns and avoid generic terms like 'untitled' or 'unknown'.
+
+Example:
+{{"description": "A research paper on the fundamentals of string theory.", "filename": "fundamentals_of_string_theory", "category": "physics"}}
+
+Text: {input_text}"""
+    with metrics.span('llm_call', model=get_model_name(text_inference)) as span:
+        response = text_inference.create_chat_completion(
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object", "schema": METADATA_JSON_SCHEMA},
+            max_tokens=512,
+            temperature=0.5,
+            top_k=3,
+            top_p=0.3
+        )
+        span.record_usage(response)
+    progress.update(task_id, advance=1.0)
+    try:
+        content = response['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError):
+        return None
+    parsed = parse_metadata_json(content)
+    if parsed is None:
+        return None
+    return finalize_text_metadata(parsed['filename'], parsed['category'], parsed['description'], file_path)
+
 def generate_text_metadata(input_text, file_path, progress, task_id, text_inference):
     """Generate description, folder name, and filename for a text document."""
 
@@ -93,14 +153,16 @@ Now generate the filename.
 Output only the filename, without any additional text.
 
 Filename:"""
-    filename_response = text_inference.create_completion(
-        prompt=filename_prompt,
-        max_tokens=3000,
-        temperature=0.5,
-        top_k=3,
-        top_p=0.3,
-        stop=[]
-    )
+    with metrics.span('llm_call', model=get_model_name(text_inference)) as span:
+        filename_response = text_inference.create_completion(
+            prompt=filename_prompt,
+            max_tokens=3000,
+            temperature=0.5,
+            top_k=3,
+            top_p=0.3,
+            stop=[]
+        )
+        span.record_usage(filename_response)
     filename = filename_response['choices'][0]['text'].strip()
     # Remove 'Filename:' prefix if present
     filename = re.sub(r'^Filename:\s*', '', filename, flags=re.IGNORECASE).strip()
@@ -125,74 +187,24 @@ Now generate the category.
 Output only the category, without any additional text.
 
 Category:"""
-    foldername_response = text_inference.create_completion(
-        prompt=foldername_prompt,
-        max_tokens=3000,
-        temperature=0.5,
-        top_k=3,
-        top_p=0.3,
-        stop=[]
-    )
+    with metrics.span('llm_call', model=get_model_name(text_inference)) as span:
+        foldername_response = text_inference.create_completion(
+            prompt=foldername_prompt,
+            max_tokens=3000,
+            temperature=0.5,
+            top_k=3,
+            top_p=0.3,
+            stop=[]
+        )
+        span.record_usage(foldername_response)
     foldername = foldername_response['choices'][0]['text'].strip()
     # Remove 'Category:' prefix if present
     foldername = re.sub(r'^Category:\s*', '', foldername, flags=re.IGNORECASE).strip()
     progress.update(task_id, advance=1 / total_steps)
 
-    # Remove unwanted words and stopwords
-    unwanted_words = set([
-        'the', 'and', 'based', 'generated', 'this', 'is', 'filename', 'file', 'document', 'text', 'output', 'only', 'below', 'category',
-        'summary', 'key', 'details', 'information', 'note', 'notes', 'main', 'ideas', 'concepts', 'in', 'on', 'of', 'with', 'by', 'for',
-        'to', 'from', 'a', 'an', 'as', 'at', 'i', 'we', 'you', 'they', 'he', 'she', 'it', 'that', 'which', 'are', 'were', 'was', 'be',
-        'have', 'has', 'had', 'do', 'does', 'did', 'but', 'if', 'or', 'because', 'about', 'into', 'through', 'during', 'before', 'after',
-        'above', 'below', 'any', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so',
-        'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now', 'new', 'depicts', 'show', 'shows', 'display',
-        'illustrates', 'presents', 'features', 'provides', 'covers', 'includes', 'discusses', 'demonstrates', 'describes'
-    ])
-    stop_words = set(stopwords.words('english'))
-    all_unwanted_words = unwanted_words.union(stop_words)
-    lemmatizer = WordNetLemmatizer()
-
-    # Function to clean and process the AI output
-    def clean_ai_output(text, max_words):
-        # Remove special characters and numbers
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\d+', '', text)
-        text = text.strip()
-        # Split concatenated words (e.g., 'mathOperations' -> 'math Operations')
-        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
-        # Tokenize and lemmatize words
-        words = word_tokenize(text)
-        words = [word.lower() for word in words if word.isalpha()]
-        words = [lemmatizer.lemmatize(word) for word in words]
-        # Remove unwanted words and duplicates
-        filtered_words = []
-        seen = set()
-        for word in words:
-            if word not in all_unwanted_words and word not in seen:
-                filtered_words.append(word)
-                seen.add(word)
-        # Limit to max words
-        filtered_words = filtered_words[:max_words]
-        return '_'.join(filtered_words)
-
-    # Process filename
-    filename = clean_ai_output(filename, max_words=3)
-    if not filename or filename.lower() in ('untitled', ''):
-        # Use keywords from the description
-        filename = clean_ai_output(description, max_words=3)
-    if not filename:
-        filename = 'document_' + os.path.splitext(os.path.basename(file_path))[0]
-
-    sanitized_filename = sanitize_filename(filename, max_words=3)
-
-    # Process foldername
-    foldername = clean_ai_output(foldername, max_words=2)
-    if not foldername or foldername.lower() in ('untitled', ''):
-        # Attempt to extract keywords from the description
-        foldername = clean_ai_output(description, max_words=2)
-        if not foldername:
-            foldername = 'documents'
-
-    sanitized_foldername = sanitize_filename(foldername, max_words=2)
-
-    return sanitized_foldername, sanitized_filename, description
+    return finalize_text_metadata(filename, foldername, description, file_path)
+
+@metrics.timed('sanitize')
+def finalize_text_metadata(filename, foldername, description, file_path):
+    """Clean raw model output into a sanitized folder name and filename."""
+    return TEXT_NORMALIZER.finalize(filename, foldername, description, file_path)
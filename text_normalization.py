@@ -0,0 +1,180 @@
+import os
+import re
+from functools import lru_cache
+import config
+
+# Words that say nothing about a file's content, on top of NLTK's English stopwords
+TEXT_UNWANTED_WORDS = frozenset([
+    'the', 'and', 'based', 'generated', 'this', 'is', 'filename', 'file', 'document', 'text', 'output', 'only', 'below', 'category',
+    'summary', 'key', 'details', 'information', 'note', 'notes', 'main', 'ideas', 'concepts', 'in', 'on', 'of', 'with', 'by', 'for',
+    'to', 'from', 'a', 'an', 'as', 'at', 'i', 'we', 'you', 'they', 'he', 'she', 'it', 'that', 'which', 'are', 'were', 'was', 'be',
+    'have', 'has', 'had', 'do', 'does', 'did', 'but', 'if', 'or', 'because', 'about', 'into', 'through', 'during', 'before', 'after',
+    'above', 'below', 'any', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so',
+    'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now', 'new', 'depicts', 'show', 'shows', 'display',
+    'illustrates', 'presents', 'features', 'provides', 'covers', 'includes', 'discusses', 'demonstrates', 'describes'
+])
+IMAGE_UNWANTED_WORDS = frozenset([
+    'the', 'and', 'based', 'generated', 'this', 'is', 'filename', 'file', 'image', 'picture', 'photo',
+    'folder', 'category', 'output', 'only', 'below', 'text', 'jpg', 'png', 'jpeg', 'gif', 'bmp', 'svg',
+    'logo', 'in', 'on', 'of', 'with', 'by', 'for', 'to', 'from', 'a', 'an', 'as', 'at', 'red', 'blue',
+    'green', 'color', 'colors', 'colored', 'text', 'graphic', 'graphics', 'main', 'subject', 'important',
+    'details', 'description', 'depicts', 'show', 'shows', 'display', 'illustrates', 'presents', 'features',
+    'provides', 'covers', 'includes', 'demonstrates', 'describes'
+])
+
+_FILE_EXTENSION = re.compile(r'\.\w{1,4}$')
+_NON_WORD = re.compile(r'[^\w\s]')
+# Underscores too, so names the model joined with underscores split into words
+_SEPARATORS_AND_PUNCTUATION = re.compile(r'[^\w\s]|_')
+_DIGITS = re.compile(r'\d+')
+_CAMEL_CASE = re.compile(r'([a-z])([A-Z])')
+# The only splits NLTK's word_tokenize makes in text reduced to letters and spaces
+_CONTRACTIONS = re.compile(r'\b(?:(can)(not)|(gim)(me)|(gon)(na)|(got)(ta)|(lem)(me)|(wan)(na)(?=\s|$))\b', re.IGNORECASE)
+
+_SANITIZE_UNWANTED = re.compile(
+    r'\b(jpg|jpeg|png|gif|bmp|txt|md|pdf|docx|xls|xlsx|csv|ppt|pptx|image|picture|photo|this|that|these|those|here|there|'
+    r'please|note|additional|notes|folder|name|sure|heres|a|an|the|and|of|in|'
+    r'to|for|on|with|your|answer|should|be|only|summary|summarize|text|category)\b',
+    re.IGNORECASE
+)
+_SEPARATORS = re.compile(r'[\s_]+')
+
+def sanitize_filename(name, max_length=50, max_words=5):
+    """Sanitize the filename by removing unwanted words and characters."""
+    # Remove file extension if present
+    name = os.path.splitext(name)[0]
+    # Remove unwanted words and data type words
+    name = _SANITIZE_UNWANTED.sub('', name)
+    # Remove non-word characters except underscores
+    sanitized = _NON_WORD.sub('', name).strip()
+    # Replace multiple underscores or spaces with a single underscore
+    sanitized = _SEPARATORS.sub('_', sanitized)
+    # Convert to lowercase
+    sanitized = sanitized.lower()
+    # Remove leading/trailing underscores
+    sanitized = sanitized.strip('_')
+    # Split into words and limit the number of words
+    words = sanitized.split('_')
+    limited_words = [word for word in words if word]  # Remove empty strings
+    limited_words = limited_words[:max_words]
+    limited_name = '_'.join(limited_words)
+    # Limit length
+    return limited_name[:max_length] if limited_name else 'untitled'
+
+@lru_cache(maxsize=None)
+def stop_words():
+    """
+    NLTK's English stopwords, read from the corpus once per process. Empty if the
+    corpus is not installed, so a run does not fail halfway; main warns about it.
+    """
+    from nltk.corpus import stopwords
+    try:
+        return frozenset(stopwords.words('english'))
+    except LookupError:
+        return frozenset()
+
+@lru_cache(maxsize=None)
+def _lemmatizer():
+    """The WordNet lemmatizer, or None if the WordNet corpus is not installed."""
+    from nltk.stem import WordNetLemmatizer
+    lemmatizer = WordNetLemmatizer()
+    try:
+        # The corpus is only loaded on first use, so check it is there now
+        lemmatizer.lemmatize('files')
+    except LookupError:
+        return None
+    return lemmatizer
+
+@lru_cache(maxsize=config.LEMMA_CACHE_SIZE)
+def lemmatize(word):
+    """WordNet lemma of a lowercase word; model output repeats words a lot, so lemmas are memoized."""
+    lemmatizer = _lemmatizer()
+    return word if lemmatizer is None else lemmatizer.lemmatize(word)
+
+def _split_words(text):
+    return _CONTRACTIONS.sub(lambda match: ' '.join(group for group in match.groups() if group), text).split()
+
+class TextNormalizer:
+    """Cleans raw model output into short folder and file names.
+
+    Regexes are compiled and word sets built once, not per file. The stopword
+    corpus and the lemmatizer are loaded on first use, after NLTK data has been
+    checked, and shared by every normalizer.
+    """
+
+    def __init__(self, unwanted_words, strip_extension=False, fallback_prefix='document_', fallback_folder='documents'):
+        self.unwanted_words = frozenset(unwanted_words)
+        self.strip_extension = strip_extension
+        self.fallback_prefix = fallback_prefix
+        self.fallback_folder = fallback_folder
+        self._all_unwanted = None
+
+    @property
+    def all_unwanted(self):
+        if self._all_unwanted is None:
+            self._all_unwanted = self.unwanted_words | stop_words()
+        return self._all_unwanted
+
+    def clean(self, text, max_words):
+        """Reduce text to at most max_words distinct, lemmatized content words joined by underscores."""
+        if self.strip_extension:
+            text = _FILE_EXTENSION.sub('', text)  # Remove file extensions like .jpg, .png
+        # Remove special characters, underscores and numbers
+        text = _SEPARATORS_AND_PUNCTUATION.sub(' ', text)
+        text = _DIGITS.sub('', text)
+        text = text.strip()
+        # Split concatenated words (e.g., 'mathOperations' -> 'math Operations')
+        text = _CAMEL_CASE.sub(r'\1 \2', text)
+        all_unwanted = self.all_unwanted
+        # Lemmatize words, dropping unwanted words and duplicates
+        filtered_words = []
+        seen = set()
+        for word in _split_words(text):
+            if not word.isalpha():
+                continue
+            word = lemmatize(word.lower())
+            if word not in all_unwanted and word not in seen:
+                filtered_words.append(word)
+                seen.add(word)
+                if len(filtered_words) == max_words:
+                    break
+        return '_'.join(filtered_words)
+
+    def clean_batch(self, texts, max_words):
+        """clean() for many texts at once; repeated texts are only cleaned once."""
+        cleaned = {}
+        for text in texts:
+            if text not in cleaned:
+                cleaned[text] = self.clean(text, max_words)
+        return [cleaned[text] for text in texts]
+
+    def finalize(self, filename, foldername, description, file_path):
+        """Return (foldername, filename, description) sanitized for use in the output tree."""
+        # Process filename
+        filename = self.clean(filename, max_words=3)
+        if not filename or filename.lower() in ('untitled', ''):
+            # Use keywords from the description
+            filename = self.clean(description, max_words=3)
+        if not filename:
+            filename = self.fallback_prefix + os.path.splitext(os.path.basename(file_path))[0]
+
+        sanitized_filename = sanitize_filename(filename, max_words=3)
+
+        # Process foldername
+        foldername = self.clean(foldername, max_words=2)
+        if not foldername or foldername.lower() in ('untitled', ''):
+            # Attempt to extract keywords from the description
+            foldername = self.clean(description, max_words=2)
+            if not foldername:
+                foldername = self.fallback_folder
+
+        sanitized_foldername = sanitize_filename(foldername, max_words=2)
+
+        return sanitized_foldername, sanitized_filename, description
+
+    def finalize_batch(self, items):
+        """finalize() for an iterable of (filename, foldername, description, file_path) tuples."""
+        return [self.finalize(*item) for item in items]
+
+TEXT_NORMALIZER = TextNormalizer(TEXT_UNWANTED_WORDS)
+IMAGE_NORMALIZER = TextNormalizer(IMAGE_UNWANTED_WORDS, strip_extension=True, fallback_prefix='image_', fallback_folder='images')
@@ -0,0 +1,83 @@
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+import config
+from duplicate_finder import DisjointSet
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_word_pattern = re.compile(r'\w+')
+
+def shingle(text, size=None):
+    """Return the set of hashed word shingles (runs of `size` consecutive words) in a text."""
+    size = size or config.TEXT_SHINGLE_SIZE
+    words = _word_pattern.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed family of universal hash functions."""
+
+    def __init__(self, num_perm=None, seed=1):
+        self.num_perm = num_perm or config.TEXT_MINHASH_PERMUTATIONS
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 31, size=self.num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=self.num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        """Return the MinHash signature of a shingle set as a uint64 array."""
+        if not shingles:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # a < 2^31 and values < 2^32 keep the products inside 64 bits
+        hashed = (np.outer(values, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return hashed.min(axis=0)
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+def find_similar_documents(text_tuples, threshold=None, bands=None):
+    """
+    Groups near-identical documents from (file_path, text) pairs such as those
+    produced by read_file_data. Signatures are split into bands and hashed into
+    LSH buckets, so only documents sharing a bucket are compared and grouping
+    runs in roughly linear time. Within a bucket every pair is compared.
+    """
+    threshold = config.TEXT_SIMILARITY_THRESHOLD if threshold is None else threshold
+    bands = bands or config.TEXT_LSH_BANDS
+    hasher = MinHasher()
+    rows = hasher.num_perm // bands
+
+    signatures = {}
+    buckets = defaultdict(list)
+    for file_path, text in text_tuples:
+        shingles = shingle(text or '')
+        if not shingles:
+            continue
+        signature = hasher.signature(shingles)
+        signatures[file_path] = signature
+        for band in range(bands):
+            band_key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            buckets[band_key].append(file_path)
+
+    clusters = DisjointSet(signatures)
+    seen_buckets = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        # Documents that share several bands often fill identical buckets; compare those once
+        key = tuple(members)
+        if key in seen_buckets:
+            continue
+        seen_buckets.add(key)
+        # Compare every pair in the bucket, so the groups do not depend on scan order
+        matrix = np.stack([signatures[member] for member in members])
+        for i in range(len(members) - 1):
+            similarities = np.mean(matrix[i + 1:] == matrix[i], axis=1)
+            for offset in np.nonzero(similarities >= threshold)[0]:
+                clusters.union(members[i], members[i + 1 + offset])
+    return clusters.groups()
@@ -1,4 +1,5 @@
 import os
+from log_writer import log_message
 
 def get_main_menu_selection():
     """Prompt the user to select the main operation mode."""
@@ -44,16 +45,19 @@ def get_main_menu_selection():
         print("Main Menu:")
         print("1. One-time Organization")
         print("2. Watch Folder (Continuous Organization)")
-        print("3. Exit")
-        response = input("Enter 1, 2, or 3: ").strip()
+        print("3. Find and Handle Duplicates")
+        print("4. Exit")
+        response = input("Enter 1, 2, 3, or 4: ").strip()
         if response == '1':
             return 'one-time'
         elif response == '2':
             return 'watch'
         elif response == '3':
+            return 'duplicates'
+        elif response == '4':
             return 'exit'
         else:
-            print("Invalid selection. Please enter 1, 2, or 3.")
+            print("Invalid selection. Please enter 1, 2, 3, or 4.")
 
 def get_ai_backend_selection():
     """Prompt the user to select an AI backend."""
@@ -97,19 +101,11 @@ def get_paths(silent_mode, log_file):
     input_path = input("Enter the path of the directory you want to organize: ").strip()
     while not os.path.exists(input_path):
         message = f"Input path {input_path} does not exist. Please enter a valid path."
-        if silent_mode:
-            with open(log_file, 'a') as f:
-                f.write(message + '\n')
-        else:
-            print(message)
+        log_message(message, silent_mode, log_file)
         input_path = input("Enter the path of the directory you want to organize: ").strip()
 
     message = f"Input path successfully uploaded: {input_path}"
-    if silent_mode:
-        with open(log_file, 'a') as f:
-            f.write(message + '\n')
-    else:
-        print(message)
+    log_message(message, silent_mode, log_file)
     if not silent_mode:
         print("-" * 50)
 
@@ -118,16 +114,20 @@ def get_paths(silent_mode, log_file):
         output_path = os.path.join(os.path.dirname(input_path), 'organized_folder')
 
     message = f"Output path successfully set to: {output_path}"
-    if silent_mode:
-        with open(log_file, 'a') as f:
-            f.write(message + '\n')
-    else:
-        print(message)
+    log_message(message, silent_mode, log_file)
     if not silent_mode:
         print("-" * 50)
 
     return input_path, output_path
 
+def get_directory_path(prompt):
+    """Prompt the user for an existing directory."""
+    path = input(prompt).strip()
+    while not os.path.isdir(path):
+        print(f"Directory {path} does not exist. Please enter a valid path.")
+        path = input(prompt).strip()
+    return path
+
 def print_simulated_tree(tree, prefix=''):
     """Print the simulated directory tree."""
     pointers = ['├── '] * (len(tree) - 1) + ['└── '] if tree else []
@@ -137,14 +137,15 @@ def print_simulated_tree(tree, prefix=''):
             extension = '│   ' if pointer == '├── ' else '    '
             print_simulated_tree(tree[key], prefix + extension)
 
-def display_duplicates(duplicate_sets):
-    """Displays the sets of duplicate files found."""
+def display_duplicates(duplicate_sets, kind="duplicate files"):
+    """Displays the sets of duplicate (or near-duplicate) files found."""
     if not duplicate_sets:
-        print("No duplicate files found.")
+        print(f"No {kind} found.")
         return
 
+    title = f"{kind.upper()} FOUND"
     print("\n" + "="*50)
-    print(" " * 15 + "DUPLICATE FILES FOUND")
+    print(" " * max((50 - len(title)) // 2, 0) + title)
     print("="*50)
     for i, file_set in enumerate(duplicate_sets, 1):
         print(f"\n--- Set {i} ---")
@@ -152,25 +153,30 @@ def display_duplicates(duplicate_sets):
             print(f"  - {file_path}")
     print("\n" + "="*50)
 
-def get_duplicate_handling_choice():
-    """Prompts the user for how to handle duplicates."""
+def get_duplicate_handling_choice(allow_delete_all=True):
+    """Prompts the user for how to handle duplicates.
+
+    Without allow_delete_all, bulk deletion is not offered; similarity sets are
+    chained near matches whose members need not resemble the file that is kept.
+    """
+    choices = [
+        ('delete_all', "Delete all duplicates (keeps one original of each set)"),
+        ('move_all', "Move all duplicates to a separate folder"),
+        ('decide_each', "Decide for each set individually"),
+        ('skip', "Do nothing (skip)"),
+    ]
+    if not allow_delete_all:
+        choices = choices[1:]
+    numbers = [str(i) for i in range(1, len(choices) + 1)]
+    prompt = f"Enter {', '.join(numbers[:-1])}, or {numbers[-1]}"
     while True:
         print("\nHow would you like to handle these duplicates?")
-        print("1. Delete all duplicates (keeps one original of each set)")
-        print("2. Move all duplicates to a separate folder")
-        print("3. Decide for each set individually")
-        print("4. Do nothing (skip)")
-        response = input("Enter 1, 2, 3, or 4: ").strip()
-        if response == '1':
-            return 'delete_all'
-        elif response == '2':
-            return 'move_all'
-        elif response == '3':
-            return 'decide_each'
-        elif response == '4':
-            return 'skip'
-        else:
-            print("Invalid selection. Please enter 1, 2, 3, or 4.")
+        for number, (_, label) in zip(numbers, choices):
+            print(f"{number}. {label}")
+        response = input(f"{prompt}: ").strip()
+        if response in numbers:
+            return choices[numbers.index(response)][0]
+        print(f"Invalid selection. Please {prompt[0].lower()}{prompt[1:]}.")
 
 def get_individual_duplicate_action(file_set):
     """Prompts the user for action on an individual set of duplicates."""
@@ -3,10 +3,8 @@ import os
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-from file_utils import (
-    separate_files_by_type,
-    read_file_data
-)
+import config
+from file_utils import separate_files_by_type
 from data_processing_common import (
     compute_operations,
     execute_operations,
@@ -14,101 +12,158 @@ from data_processing_common import (
 from text_data_processing import process_text_files
 from image_data_processing import process_image_files
 from ollama_data_processing import process_text_files_ollama, process_image_files_ollama
+from metadata_cache import get_metadata_cache
+from extraction_pipeline import ExtractionPipeline
+from hash_index import HashIndex
+from work_queue import DebouncedWorkQueue
+from watch_snapshot import WatchSnapshot, format_catch_up
+from metrics import metrics
+from log_writer import log_message
 
 class FileOrganizerEventHandler(FileSystemEventHandler):
     def __init__(self, output_path, backend, models, silent=False, log_file=None):
         super().__init__()
-        self.output_path = output_path
+        self.output_path = os.path.abspath(output_path)
         self.backend = backend
         self.models = models
         self.silent = silent
         self.log_file = log_file
+        self.hash_index = HashIndex() if config.WATCH_CHECK_DUPLICATES else None
+        self.snapshot = WatchSnapshot() if config.WATCH_CATCH_UP else None
+        # Events only enqueue paths; files are processed by the queue's workers once they stop changing
+        self.work_queue = DebouncedWorkQueue(self.process_files)
+
+    def log(self, message):
+        log_message(message, self.silent, self.log_file)
+
+    def enqueue(self, path):
+        # Links created in the output directory must not be organized again
+        if not os.path.abspath(path).startswith(os.path.join(self.output_path, '')):
+            self.work_queue.submit(path)
 
     def on_created(self, event):
         if not event.is_directory:
-            # Wait a moment to ensure the file is fully written
-            time.sleep(1)
-            self.process_file(event.src_path)
+            self.enqueue(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.enqueue(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.work_queue.discard(event.src_path)
+            if self.snapshot is not None:
+                self.snapshot.remove(event.src_path)
+            self.enqueue(event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.work_queue.discard(event.src_path)
+            if self.snapshot is not None:
+                self.snapshot.remove(event.src_path)
+            if self.hash_index is not None:
+                self.hash_index.remove_path(event.src_path)
+
+    def catch_up(self, input_path, recursive):
+        """Queue files that arrived or changed while the watcher was not running."""
+        if self.snapshot is None:
+            return
+        with metrics.span('scan', mode='watch'):
+            file_paths, stats = self.snapshot.reconcile(input_path, recursive=recursive, exclude=[self.output_path])
+        self.log(format_catch_up(stats))
+        for file_path in file_paths:
+            self.enqueue(file_path)
+
+    def check_duplicates(self, file_path):
+        """Report indexed files with the same content as a newly arrived file."""
+        duplicates = self.hash_index.find_duplicates_of(file_path)
+        if duplicates:
+            self.log(f"File {file_path} duplicates existing files: {', '.join(duplicates)}")
 
     def process_file(self, file_path):
-        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        self.process_files([file_path])
+
+    def process_files(self, file_paths):
+        """Organize a micro-batch of files that have finished arriving."""
+        # Empty files are skipped; writing to them later changes their size, so they are picked up again
+        empty = [fp for fp in file_paths if os.path.exists(fp) and os.path.getsize(fp) == 0]
+        file_paths = [fp for fp in file_paths if os.path.exists(fp) and os.path.getsize(fp) > 0]
+        if not file_paths:
+            if self.snapshot is not None:
+                self.snapshot.record(empty)
             return
+        metrics.increment('files_detected', len(file_paths), mode='watch')
 
-        message = f"New file detected: {file_path}. Processing..."
-        if self.silent:
-            with open(self.log_file, 'a') as f:
-                f.write(message + '\n')
-        else:
-            print(message)
+        for file_path in file_paths:
+            self.log(f"New file detected: {file_path}. Processing...")
+            if self.hash_index is not None:
+                self.check_duplicates(file_path)
 
-        image_files, text_files = separate_files_by_type([file_path])
+        image_files, text_files = separate_files_by_type(file_paths)
         all_data = []
+        cache = get_metadata_cache()
 
         if self.backend == 'local':
             image_inference, text_inference = self.models
             if image_files:
-                data_images = process_image_files(image_files, image_inference, text_inference, silent=self.silent, log_file=self.log_file)
+                data_images = process_image_files(image_files, image_inference, text_inference, silent=self.silent, log_file=self.log_file, cache=cache)
                 all_data.extend(data_images)
             if text_files:
-                text_tuples = []
-                for fp in text_files:
-                    text_content = read_file_data(fp)
-                    if text_content:
-                        text_tuples.append((fp, text_content))
-                data_texts = process_text_files(text_tuples, text_inference, silent=self.silent, log_file=self.log_file)
+                text_tuples = ExtractionPipeline(text_files, silent=self.silent, log_file=self.log_file)
+                data_texts = process_text_files(text_tuples, text_inference, silent=self.silent, log_file=self.log_file, cache=cache)
                 all_data.extend(data_texts)
 
         elif self.backend == 'ollama':
             if image_files:
-                data_images = process_image_files_ollama(image_files, silent=self.silent, log_file=self.log_file)
+                data_images = process_image_files_ollama(image_files, silent=self.silent, log_file=self.log_file, cache=cache)
                 all_data.extend(data_images)
             if text_files:
-                text_tuples = []
-                for fp in text_files:
-                    text_content = read_file_data(fp)
-                    if text_content:
-                        text_tuples.append((fp, text_content))
-                data_texts = process_text_files_ollama(text_tuples, silent=self.silent, log_file=self.log_file)
+                text_tuples = ExtractionPipeline(text_files, silent=self.silent, log_file=self.log_file)
+                data_texts = process_text_files_ollama(text_tuples, silent=self.silent, log_file=self.log_file, cache=cache)
                 all_data.extend(data_texts)
 
+        organized = set()
         if all_data:
             operations = compute_operations(all_data, self.output_path, set(), set())
-            execute_operations(operations, dry_run=False, silent=self.silent, log_file=self.log_file)
-            message = f"File {file_path} organized successfully."
-            if self.silent:
-                with open(self.log_file, 'a') as f:
-                    f.write(message + '\n')
-            else:
-                print(message)
-        else:
-            message = f"Could not process file {file_path}. It might be an unsupported type or empty."
-            if self.silent:
-                with open(self.log_file, 'a') as f:
-                    f.write(message + '\n')
+            completed = execute_operations(operations, dry_run=False, silent=self.silent, log_file=self.log_file)
+            organized = {operation['source'] for operation in completed}
+        for file_path in file_paths:
+            if file_path in organized:
+                self.log(f"File {file_path} organized successfully.")
             else:
-                print(message)
+                self.log(f"Could not process file {file_path}. It might be an unsupported type or empty.")
+        if self.snapshot is not None:
+            # Supported files that could not be organized stay out of the snapshot, so the next catch-up retries them
+            supported = set(image_files) | set(text_files)
+            unsupported = [file_path for file_path in file_paths if file_path not in supported]
+            self.snapshot.record(sorted(organized) + unsupported + empty)
 
 def start_watching(input_path, output_path, backend, models, silent=False, log_file=None):
     event_handler = FileOrganizerEventHandler(output_path, backend, models, silent, log_file)
+    event_handler.work_queue.start()
     observer = Observer()
     observer.schedule(event_handler, input_path, recursive=False)
     observer.start()
-    message = f"Watching directory: {input_path}"
-    if silent:
-        with open(log_file, 'a') as f:
-            f.write(message + '\n')
-    else:
-        print(message)
+    # Start observing first so nothing arriving during the catch-up scan is missed
+    event_handler.catch_up(input_path, recursive=False)
+    event_handler.log(f"Watching directory: {input_path}")
+    if not silent:
         print("Press Ctrl+C to stop.")
+    last_status = last_export = time.monotonic()
     try:
         while True:
             time.sleep(1)
+            if time.monotonic() - last_status >= config.WATCH_STATUS_INTERVAL:
+                last_status = time.monotonic()
+                if event_handler.work_queue.stats()['depth']:
+                    event_handler.log(event_handler.work_queue.format_stats())
+            if time.monotonic() - last_export >= config.METRICS_EXPORT_INTERVAL:
+                last_export = time.monotonic()
+                metrics.export()
     except KeyboardInterrupt:
         observer.stop()
-        message = "\nWatcher stopped by user."
-        if silent:
-            with open(log_file, 'a') as f:
-                f.write(message + '\n')
-        else:
-            print(message)
-    observer.join()
\ No newline at end of file
+        event_handler.log("\nWatcher stopped by user.")
+    observer.join()
+    event_handler.work_queue.stop()
+    event_handler.log(event_handler.work_queue.format_stats())
+    metrics.export()
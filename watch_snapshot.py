@@ -0,0 +1,169 @@
+import os
+import time
+import sqlite3
+import threading
+import config
+
+class WatchSnapshot:
+    """Persisted (path, size, mtime, inode) snapshot of the files a watcher has handled.
+
+    Rows are keyed by (directory, name), so reconciling a directory is a single
+    indexed query and memory use stays bounded by the largest directory rather
+    than the whole tree. Files are recorded once they have been processed, so a
+    file whose processing was cut short by a crash is picked up again on the
+    next start.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.WATCH_SNAPSHOT_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'dir TEXT NOT NULL, '
+            'name TEXT NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'mtime_ns INTEGER NOT NULL, '
+            'inode INTEGER NOT NULL, '
+            'PRIMARY KEY (dir, name)) WITHOUT ROWID'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS roots ('
+            'path TEXT PRIMARY KEY, '
+            'reconciled_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def _scan(self, root, recursive, exclude):
+        """Yield (directory, {name: (size, mtime_ns, inode)}) for every directory under root, skipping hidden files."""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            entries = {}
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive and entry.path not in exclude:
+                                    stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'):
+                                st = entry.stat(follow_symlinks=False)
+                                entries[entry.name] = (st.st_size, st.st_mtime_ns, entry.inode())
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            yield directory, entries
+
+    def _recorded_dirs(self, root, recursive):
+        """Return the recorded directories at or below root."""
+        if not recursive:
+            return {root}
+        prefix = os.path.join(root, '')
+        # The character after os.sep bounds the range, so this matches exactly the paths under prefix
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        rows = self._conn.execute(
+            'SELECT DISTINCT dir FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)',
+            (root, prefix, upper)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def reconcile(self, root, recursive=True, exclude=()):
+        """
+        Compare the tree under root with the snapshot and return (paths, stats), where
+        paths are the files that are new or changed since they were last recorded.
+        Entries for files that no longer exist are dropped. The first time a root is
+        seen its current files are recorded as a baseline and nothing is returned,
+        so starting to watch an existing directory does not reorganize it.
+        """
+        started = time.perf_counter()
+        root = os.path.abspath(root)
+        exclude = {os.path.abspath(path) for path in exclude}
+        with self._lock:
+            baseline = self._conn.execute('SELECT 1 FROM roots WHERE path = ?', (root,)).fetchone() is None
+
+        changed = []
+        visited = set()
+        stats = {'files_seen': 0, 'new': 0, 'changed': 0, 'removed': 0, 'baseline': baseline}
+        for directory, entries in self._scan(root, recursive, exclude):
+            visited.add(directory)
+            stats['files_seen'] += len(entries)
+            with self._lock:
+                if baseline:
+                    self._conn.executemany(
+                        'INSERT OR REPLACE INTO files (dir, name, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)',
+                        [(directory, name) + values for name, values in entries.items()]
+                    )
+                    continue
+                recorded = {
+                    name: (size, mtime_ns, inode)
+                    for name, size, mtime_ns, inode in self._conn.execute(
+                        'SELECT name, size, mtime_ns, inode FROM files WHERE dir = ?', (directory,)
+                    )
+                }
+                removed = [(directory, name) for name in recorded if name not in entries]
+                if removed:
+                    self._conn.executemany('DELETE FROM files WHERE dir = ? AND name = ?', removed)
+                    stats['removed'] += len(removed)
+            for name, values in entries.items():
+                previous = recorded.get(name)
+                if previous is None:
+                    stats['new'] += 1
+                elif previous != values:
+                    stats['changed'] += 1
+                else:
+                    continue
+                changed.append(os.path.join(directory, name))
+
+        with self._lock:
+            for directory in self._recorded_dirs(root, recursive) - visited:
+                cursor = self._conn.execute('DELETE FROM files WHERE dir = ?', (directory,))
+                stats['removed'] += cursor.rowcount
+            self._conn.execute(
+                'INSERT OR REPLACE INTO roots (path, reconciled_at) VALUES (?, ?)', (root, time.time())
+            )
+            self._conn.commit()
+        stats['seconds'] = time.perf_counter() - started
+        return changed, stats
+
+    def record(self, file_paths):
+        """Record the current state of files that have been processed."""
+        rows = []
+        for file_path in file_paths:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            directory, name = os.path.split(os.path.abspath(file_path))
+            rows.append((directory, name, st.st_size, st.st_mtime_ns, st.st_ino))
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO files (dir, name, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def remove(self, file_path):
+        """Forget a file that was deleted or moved away."""
+        directory, name = os.path.split(os.path.abspath(file_path))
+        with self._lock:
+            self._conn.execute('DELETE FROM files WHERE dir = ? AND name = ?', (directory, name))
+            self._conn.commit()
+
+    def close(self):
+        """Commit and close the snapshot."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+def format_catch_up(stats):
+    """Return a one-line summary of a reconciliation pass."""
+    if stats['baseline']:
+        return f"Recorded {stats['files_seen']} existing files as the watch baseline in {stats['seconds']:.1f}s."
+    return (f"Catch-up scanned {stats['files_seen']} files in {stats['seconds']:.1f}s: "
+            f"{stats['new']} new, {stats['changed']} changed, {stats['removed']} removed.")
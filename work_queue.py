@@ -0,0 +1,176 @@
+import os
+import time
+import threading
+from collections import deque
+import config
+
+class DebouncedWorkQueue:
+    """Deduplicating queue that hands file paths to worker threads once the files stop changing.
+
+    submit() only records the path under a lock, so it is safe to call from the
+    watchdog observer thread without ever blocking it. A checker thread stats
+    pending files and marks a file ready once its size and mtime have stayed the
+    same for settle_seconds. Worker threads drain ready files in micro-batches of
+    up to batch_size paths and pass each batch to process_batch. A path that
+    changes again while it is ready or being processed is queued once more
+    after its batch finishes, so the final contents are always processed.
+    """
+
+    def __init__(self, process_batch, num_workers=None, batch_size=None, settle_seconds=None, poll_interval=None):
+        self.process_batch = process_batch
+        self.num_workers = num_workers or config.WATCH_WORKERS
+        self.batch_size = batch_size or config.WATCH_BATCH_SIZE
+        self.settle_seconds = config.WATCH_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        self.poll_interval = poll_interval or config.WATCH_POLL_INTERVAL
+
+        self._lock = threading.Lock()
+        self._ready_condition = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._pending = {}  # path -> [first_seen, size, mtime_ns, stable_since]
+        self._ready = deque()  # (path, first_seen)
+        self._queued = set()  # paths that are ready or being processed
+        self._dirty = {}  # queued path -> time of its first event since it was queued
+        self._threads = []
+
+        self.in_progress = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def submit(self, path):
+        """Queue a path after a file event; repeated events for the same path are merged."""
+        now = time.monotonic()
+        with self._lock:
+            if path in self._queued:
+                # Already ready or in a batch; look at it again once that batch is done
+                self._dirty.setdefault(path, now)
+                return
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [now, None, None, now]
+            else:
+                # A new event means the file may still be changing
+                entry[3] = now
+            self.max_depth = max(self.max_depth, self._depth())
+
+    def discard(self, path):
+        """Forget a pending path, e.g. after the file was deleted."""
+        with self._lock:
+            self._pending.pop(path, None)
+            self._dirty.pop(path, None)
+
+    def _depth(self):
+        return len(self._pending) + len(self._ready) + self.in_progress
+
+    def start(self):
+        """Start the stability checker and worker threads."""
+        checker = threading.Thread(target=self._check_stability, daemon=True)
+        checker.start()
+        self._threads.append(checker)
+        for _ in range(self.num_workers):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._threads.append(worker)
+        return self
+
+    def _check_stability(self):
+        """Move pending files to the ready queue once their size and mtime stop changing."""
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                paths = list(self._pending)
+            observations = {}
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                    observations[path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    observations[path] = None
+            now = time.monotonic()
+            with self._lock:
+                for path, observed in observations.items():
+                    entry = self._pending.get(path)
+                    if entry is None:
+                        continue
+                    if observed is None:
+                        # The file disappeared before it settled
+                        del self._pending[path]
+                        continue
+                    if (entry[1], entry[2]) != observed:
+                        entry[1], entry[2] = observed
+                        entry[3] = now
+                    elif now - entry[3] >= self.settle_seconds:
+                        del self._pending[path]
+                        self._ready.append((path, entry[0]))
+                        self._queued.add(path)
+                if self._ready:
+                    self._ready_condition.notify_all()
+
+    def _work(self):
+        """Process ready files in micro-batches until the queue is stopped."""
+        while True:
+            with self._ready_condition:
+                while not self._ready and not self._stop.is_set():
+                    self._ready_condition.wait()
+                if not self._ready and self._stop.is_set():
+                    return
+                batch = []
+                while self._ready and len(batch) < self.batch_size:
+                    batch.append(self._ready.popleft())
+                self.in_progress += len(batch)
+
+            try:
+                self.process_batch([path for path, _ in batch])
+                failed = False
+            except Exception as e:
+                print(f"Error processing batch of {len(batch)} files: {e}")
+                failed = True
+
+            finished = time.monotonic()
+            with self._lock:
+                self.in_progress -= len(batch)
+                for path, first_seen in batch:
+                    self._queued.discard(path)
+                    changed_at = self._dirty.pop(path, None)
+                    if changed_at is not None:
+                        # The file changed after it was picked up, so let it settle and process it again
+                        self._pending[path] = [changed_at, None, None, finished]
+                    latency = finished - first_seen
+                    self.total_latency += latency
+                    self.max_latency = max(self.max_latency, latency)
+                if failed:
+                    self.failed += len(batch)
+                else:
+                    self.processed += len(batch)
+
+    def stop(self, timeout=None):
+        """Stop the checker and let workers finish the batches already ready."""
+        self._stop.set()
+        with self._ready_condition:
+            self._ready_condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self):
+        """Return queue depth per stage and end-to-end latency from first event to processed."""
+        with self._lock:
+            done = self.processed + self.failed
+            return {
+                'pending': len(self._pending),
+                'ready': len(self._ready),
+                'in_progress': self.in_progress,
+                'depth': self._depth(),
+                'max_depth': self.max_depth,
+                'processed': self.processed,
+                'failed': self.failed,
+                'avg_latency_seconds': self.total_latency / done if done else 0.0,
+                'max_latency_seconds': self.max_latency,
+            }
+
+    def format_stats(self):
+        """Return a one-line status summary."""
+        stats = self.stats()
+        return (f"Watch queue: {stats['pending']} settling, {stats['ready']} ready, {stats['in_progress']} in progress, "
+                f"{stats['processed']} processed, {stats['failed']} failed, "
+                f"latency avg {stats['avg_latency_seconds']:.1f}s / max {stats['max_latency_seconds']:.1f}s")